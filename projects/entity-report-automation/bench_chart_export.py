@@ -0,0 +1,94 @@
+"""
+Benchmark chart export for a 66-slide Full Report.
+
+Runs the whole report pipeline on demo sources and their snapshot in a
+temporary directory:
+    - cold cache, charts rendered in the calling thread (workers=0)
+    - cold cache, charts rendered on the process pool
+    - warm cache, nothing to render
+and prints the wall time of the run and of the two chart stages, with the
+number of charts rendered and taken from the cache.
+
+Usage:
+    python bench_chart_export.py
+    python bench_chart_export.py --workers 8
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from chart_export import ChartExporter
+from data_sources import create_demo_sources
+from report_generation import build_report_pipeline
+from report_slides import ReportOptions
+from settings import CHART_EXPORT_WORKERS
+from snapshot_store import build_snapshot
+
+OPTIONS = ReportOptions(include_charts=True, include_tables=True, include_appendix=True)
+
+
+def run_report(directory, exporter):
+    pipeline = build_report_pipeline(
+        "December 2023",
+        "Full Report",
+        OPTIONS,
+        directory=directory / "sources",
+        output_dir=directory / "reports",
+        exporter=exporter,
+        snapshots_dir=directory / "snapshots",
+    )
+    hits, misses = exporter.hits, exporter.misses
+    started = time.perf_counter()
+    results, timings = pipeline.run()
+    elapsed = time.perf_counter() - started
+    charts = {
+        name: timings[name].finished - timings[name].started
+        for name in ("trend_charts", "portfolio_charts")
+    }
+    return (
+        results["finalize"],
+        elapsed,
+        charts,
+        exporter.misses - misses,
+        exporter.hits - hits,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart export benchmark")
+    parser.add_argument("--workers", type=int, default=CHART_EXPORT_WORKERS)
+    args = parser.parse_args()
+
+    print(
+        f"{'Run':<28} {'Slides':>6} {'Total s':>8} {'Trend s':>8} "
+        f"{'Portfolio s':>11} {'Rendered':>9} {'Cached':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        create_demo_sources(directory / "sources")
+        build_snapshot("December 2023", directory / "sources", directory / "snapshots")
+        runs = [
+            ("cold, in-process", ChartExporter(directory / "cache-serial", workers=0)),
+        ]
+        pooled = ChartExporter(directory / "cache", workers=args.workers)
+        # Start the pool outside the timed runs, as the app keeps it running
+        pooled.start()
+        runs += [
+            (f"cold, {args.workers} processes", pooled),
+            (f"warm, {args.workers} processes", pooled),
+        ]
+        for label, exporter in runs:
+            package, elapsed, charts, rendered, cached = run_report(directory, exporter)
+            print(
+                f"{label:<28} {package.slides:>6} {elapsed:>8.2f} "
+                f"{charts['trend_charts']:>8.2f} {charts['portfolio_charts']:>11.2f} "
+                f"{rendered:>9} {cached:>7}"
+            )
+        pooled.close()
+    print(f"Chart format: {pooled.format}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark the concentration engine at 1M and 10M facilities.
+
+Builds synthetic facility columns (one customer per 3.7 facilities, each in
+one sector) and times:
+    - pandas: a group-by per customer and per sector, a full sort of the
+      names for the top names
+    - build: Concentration.build over the whole portfolio
+    - update: Concentration.update_sector after the exposures of one sector
+      change, against a rebuild with the changed exposures
+and checks that all of them give the same HHIs, top names and KRIs.
+
+Usage:
+    python bench_concentration.py
+    python bench_concentration.py --sizes 1000000 10000000 --seed 7
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from concentration import Concentration
+from data_sources import SECTORS
+from settings import CONCENTRATION_TOP_N
+
+FACILITIES_PER_CUSTOMER = 3.7
+
+
+def synthetic_columns(facilities, seed):
+    rng = np.random.default_rng(seed)
+    customers = int(facilities / FACILITIES_PER_CUSTOMER)
+    sector = rng.integers(0, len(SECTORS), customers).astype(np.int8)
+    customer = rng.integers(0, customers, facilities)
+    return customer, sector[customer], rng.lognormal(0, 1, facilities)
+
+
+def pandas_concentration(customer, sector, exposure):
+    facilities = pd.DataFrame(
+        {"customer": customer, "sector": sector, "exposure": exposure}
+    )
+    total = facilities["exposure"].sum()
+    names = facilities.groupby("customer")["exposure"].sum()
+    sectors = facilities.groupby("sector")["exposure"].sum()
+    top = names.sort_values(ascending=False).head(CONCENTRATION_TOP_N)
+    return {
+        "name_hhi": ((names / total) ** 2).sum() * 10_000,
+        "sector_hhi": ((sectors / total) ** 2).sum() * 10_000,
+        "top": top.to_numpy(),
+        "largest_sector": sectors.max() / total * 100,
+    }
+
+
+def check(expected, engine):
+    np.testing.assert_allclose(engine.name_hhi(), expected["name_hhi"], rtol=1e-9)
+    np.testing.assert_allclose(engine.sector_hhi(), expected["sector_hhi"], rtol=1e-9)
+    np.testing.assert_allclose(
+        engine.top_names()["Exposure"], expected["top"], rtol=1e-9
+    )
+    np.testing.assert_allclose(
+        engine.indicators()["Sector Concentration"],
+        expected["largest_sector"],
+        rtol=1e-9,
+    )
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concentration benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--seed", type=int, default=2023)
+    args = parser.parse_args()
+
+    print(
+        f"{'Facilities':>12} {'pandas s':>9} {'build s':>8} "
+        f"{'rebuild s':>10} {'update s':>9}"
+    )
+    for size in args.sizes:
+        customer, sector, exposure = synthetic_columns(size, args.seed)
+        expected, pandas_s = timed(pandas_concentration, customer, sector, exposure)
+        engine, build_s = timed(Concentration().build, customer, sector, exposure)
+        check(expected, engine)
+
+        # One sector's exposures change
+        changed = sector == 0
+        exposure[changed] *= 1.25
+        _, update_s = timed(
+            engine.update_sector, SECTORS[0], customer[changed], exposure[changed]
+        )
+        rebuilt, rebuild_s = timed(Concentration().build, customer, sector, exposure)
+        check(pandas_concentration(customer, sector, exposure), engine)
+        pd.testing.assert_frame_equal(engine.sectors(), rebuilt.sectors())
+        print(
+            f"{size:>12,} {pandas_s:>9.2f} {build_s:>8.2f} "
+            f"{rebuild_s:>10.2f} {update_s:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the IFRS 9 calculator at 1M and 10M facilities.
+
+Builds synthetic facility columns as codes (the way ifrs9_table passes them
+on) and times ifrs9_sums in one chunk and in chunks of IFRS9_CHUNK_SIZE,
+with the peak memory the calculation allocates (tracemalloc traces numpy's
+allocations); both must give the same sums.
+
+Usage:
+    python bench_ifrs9.py
+    python bench_ifrs9.py --sizes 1000000 10000000 --chunk 500000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from data_sources import RATING_PD, RATING_SHARES, RATINGS, SEGMENT_SHARES, SEGMENTS
+from ifrs9 import ifrs9_sums
+from settings import IFRS9_CHUNK_SIZE
+
+
+def synthetic_columns(facilities, seed):
+    rng = np.random.default_rng(seed)
+    rating = rng.choice(len(RATINGS), facilities, p=RATING_SHARES).astype(np.int8)
+    previous_rating = np.clip(
+        rating + rng.choice([-1, 0, 0, 0, 0, 1], facilities), 0, len(RATINGS) - 1
+    ).astype(np.int8)
+    dpd = np.where(rng.random(facilities) < 0.05, rng.integers(1, 400, facilities), 0)
+    return (
+        rng.choice(len(SEGMENTS), facilities, p=SEGMENT_SHARES).astype(np.int8),
+        rating,
+        previous_rating,
+        dpd,
+        np.array(RATING_PD)[rating],
+        rng.lognormal(0, 1, facilities),
+    )
+
+
+def measured(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IFRS 9 calculator benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--chunk", type=int, default=IFRS9_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=2023)
+    args = parser.parse_args()
+
+    print(
+        f"{'Facilities':>12} {'whole s':>8} {'whole MiB':>10} "
+        f"{'chunked s':>10} {'chunked MiB':>12}"
+    )
+    for size in args.sizes:
+        columns = synthetic_columns(size, args.seed)
+        whole, whole_s, whole_mib = measured(ifrs9_sums, *columns, size)
+        chunked, chunked_s, chunked_mib = measured(ifrs9_sums, *columns, args.chunk)
+        np.testing.assert_allclose(chunked, whole, rtol=1e-9)
+        print(
+            f"{size:>12,} {whole_s:>8.2f} {whole_mib:>10.0f} "
+            f"{chunked_s:>10.2f} {chunked_mib:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
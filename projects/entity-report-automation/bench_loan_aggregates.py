@@ -0,0 +1,178 @@
+"""
+Benchmark the loan-level aggregation engine at 1M and 10M facilities.
+
+Builds a synthetic portfolio in memory (one customer per 3.7 facilities, as
+in the demo sources) and times the Executive Summary tables - overview,
+rating distribution, segment and sector breakdowns, rating mix by segment
+and sector:
+    - pandas: the previous hash group-bys over the facility frame's text
+      columns
+    - engine: loan_aggregates on a LoanBook, plus the one-off conversion of
+      the frame into the LoanBook
+and checks that both give the same tables.
+
+Usage:
+    python bench_loan_aggregates.py
+    python bench_loan_aggregates.py --sizes 1000000 10000000 --seed 7
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_sources import (
+    RATING_PD,
+    RATING_SHARES,
+    RATINGS,
+    SECTORS,
+    SEGMENT_SHARES,
+    SEGMENTS,
+)
+from loan_aggregates import (
+    breakdown,
+    loan_book,
+    overview,
+    rating_distribution,
+    rating_mix,
+)
+
+FACILITIES_PER_CUSTOMER = 3.7
+
+
+def synthetic_facilities(facilities, seed):
+    """Facility frame shaped like report_data.facility_table()."""
+    rng = np.random.default_rng(seed)
+    customers = int(facilities / FACILITIES_PER_CUSTOMER)
+    segment = rng.choice(len(SEGMENTS), customers, p=SEGMENT_SHARES)
+    rating = rng.choice(len(RATINGS), customers, p=RATING_SHARES)
+    sector = rng.integers(0, len(SECTORS), customers)
+    customer_of = rng.integers(0, customers, facilities)
+    size = np.array([12.0, 0.7, 0.17, 1.1, 1.0])[segment[customer_of]]
+    exposure = rng.lognormal(0, 1, facilities) * size
+    npl = rng.random(facilities) < np.array(RATING_PD)[rating[customer_of]] * 1.5
+
+    def text(values, categories):
+        return pd.array(np.array(categories, dtype=object)[values], dtype="str")
+
+    return pd.DataFrame(
+        {
+            "customer_id": customer_of,
+            "segment": text(segment[customer_of], SEGMENTS),
+            "sector": text(sector[customer_of], SECTORS),
+            "rating": text(rating[customer_of], RATINGS),
+            "exposure": exposure,
+            "provision": np.where(npl, exposure * 0.7, exposure * 0.01),
+            "npl": npl,
+        }
+    )
+
+
+def pandas_tables(facilities):
+    """The tables by DataFrame group-bys, as report_data computed them."""
+    facilities = facilities.assign(
+        npl_exposure=facilities["exposure"].where(facilities["npl"], 0.0),
+        npl_provision=facilities["provision"].where(facilities["npl"], 0.0),
+    )
+    tables = {}
+    for column, order in (("segment", SEGMENTS), ("sector", SECTORS)):
+        grouped = facilities.groupby(column).agg(
+            Clients=("customer_id", "nunique"),
+            Exposure=("exposure", "sum"),
+            npl_exposure=("npl_exposure", "sum"),
+            npl_provision=("npl_provision", "sum"),
+        )
+        grouped = grouped.reindex(order, fill_value=0)
+        grouped["NPL_Rate"] = grouped["npl_exposure"] / grouped["Exposure"] * 100
+        grouped["Coverage"] = (
+            grouped["npl_provision"]
+            / grouped["npl_exposure"].where(grouped["npl_exposure"] > 0)
+            * 100
+        ).fillna(0.0)
+        tables[column] = grouped.drop(columns=["npl_exposure", "npl_provision"])
+        tables[f"{column}_mix"] = (
+            facilities.groupby([column, "rating"])["exposure"]
+            .sum()
+            .unstack(fill_value=0.0)
+            .reindex(index=order, columns=RATINGS, fill_value=0.0)
+        )
+    ratings = facilities.groupby("rating").agg(
+        Count=("customer_id", "nunique"), Exposure=("exposure", "sum")
+    )
+    tables["ratings"] = ratings.reindex(RATINGS, fill_value=0)
+    tables["overview"] = (
+        facilities["exposure"].sum(),
+        facilities["npl_exposure"].sum(),
+        facilities["npl_provision"].sum(),
+        facilities["provision"].sum(),
+        facilities["customer_id"].nunique(),
+    )
+    return tables
+
+
+def engine_tables(book):
+    return {
+        "segment": breakdown(book, "segment"),
+        "sector": breakdown(book, "sector"),
+        "segment_mix": rating_mix(book, "segment"),
+        "sector_mix": rating_mix(book, "sector"),
+        "ratings": rating_distribution(book),
+        "overview": overview(book),
+    }
+
+
+def check(expected, actual):
+    for column in ("segment", "sector"):
+        for name in ("Clients", "Exposure", "NPL_Rate", "Coverage"):
+            np.testing.assert_allclose(
+                actual[column][name], expected[column][name], rtol=1e-9
+            )
+        np.testing.assert_allclose(
+            actual[f"{column}_mix"], expected[f"{column}_mix"], rtol=1e-9
+        )
+    for name in ("Count", "Exposure"):
+        np.testing.assert_allclose(
+            actual["ratings"][name], expected["ratings"][name], rtol=1e-9
+        )
+    exposure, npl_exposure, _, provisions, customers = expected["overview"]
+    totals = actual["overview"]
+    np.testing.assert_allclose(
+        [totals["exposure"], totals["npl_exposure"], totals["provisions"]],
+        [exposure, npl_exposure, provisions],
+        rtol=1e-9,
+    )
+    assert totals["customers"] == customers
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loan aggregation benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--seed", type=int, default=2023)
+    args = parser.parse_args()
+
+    print(
+        f"{'Facilities':>12} {'pandas s':>9} {'LoanBook s':>11} "
+        f"{'engine s':>9} {'speed-up':>9}"
+    )
+    for size in args.sizes:
+        facilities = synthetic_facilities(size, args.seed)
+        expected, pandas_s = timed(pandas_tables, facilities)
+        book, convert_s = timed(loan_book, facilities)
+        del facilities
+        actual, engine_s = timed(engine_tables, book)
+        check(expected, actual)
+        print(
+            f"{size:>12,} {pandas_s:>9.2f} {convert_s:>11.2f} "
+            f"{engine_s:>9.2f} {pandas_s / engine_s:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
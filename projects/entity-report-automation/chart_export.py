@@ -0,0 +1,168 @@
+"""
+Chart Export - static images of the report charts, rendered in parallel
+and cached.
+
+Every figure is keyed by a hash of its full JSON spec (layout, traces and
+the data in them) and the export format, so a chart whose data and styling
+are unchanged is found in the cache and never rendered again, across
+report runs and restarts. Missing charts are rendered on a process pool;
+only the JSON spec is sent to the workers (workers=0 renders them in the
+calling thread instead).
+
+Charts are exported as PNG when kaleido is installed. Without it they are
+exported as standalone HTML fragments, which need plotly.js in the deck.
+Cache files unused for CHART_CACHE_RETENTION are purged.
+"""
+
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import plotly
+import plotly.io as pio
+
+from settings import CHART_CACHE_DIR, CHART_CACHE_RETENTION, CHART_EXPORT_WORKERS
+
+PNG, HTML = "png", "html"
+
+# Pixel size of exported images (the slide chart area) and the scale factor
+IMAGE_WIDTH = 1000
+IMAGE_HEIGHT = 450
+IMAGE_SCALE = 2
+
+ChartImage = namedtuple("ChartImage", ["name", "key", "format", "path", "cached"])
+
+
+def default_format():
+    return PNG if importlib.util.find_spec("kaleido") is not None else HTML
+
+
+def chart_key(spec, export_format):
+    """Cache key of a figure: its JSON spec, the format and plotly version."""
+    digest = hashlib.sha256()
+    for part in (plotly.__version__, export_format, spec):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def render(spec, export_format, path, key):
+    """Render one figure spec to path (runs in a worker process)."""
+    fig = pio.from_json(spec)
+    # Sessions share the cache: each render writes its own partial file
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.partial"
+    if export_format == PNG:
+        fig.write_image(
+            tmp_path,
+            format="png",
+            width=IMAGE_WIDTH,
+            height=IMAGE_HEIGHT,
+            scale=IMAGE_SCALE,
+        )
+    else:
+        # Fixed div id, so the same chart always gives the same fragment
+        with open(tmp_path, "w") as f:
+            f.write(
+                fig.to_html(
+                    full_html=False, include_plotlyjs=False, div_id=f"chart-{key[:12]}"
+                )
+            )
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChartExporter:
+    def __init__(
+        self,
+        cache_dir=CHART_CACHE_DIR,
+        workers=CHART_EXPORT_WORKERS,
+        export_format=None,
+        retention=CHART_CACHE_RETENTION,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.format = export_format or default_format()
+        self.retention = retention
+        self.hits = 0
+        self.misses = 0
+        self._pool = None
+        self._lock = threading.Lock()
+        self.purge()
+
+    def path_of(self, key):
+        return self.cache_dir / f"{key}.{self.format}"
+
+    def export(self, figures):
+        """Export {name: figure}; return {name: ChartImage}."""
+        images = {}
+        pending = {}
+        now = time.time()
+        for name, fig in figures.items():
+            spec = fig.to_json()
+            key = chart_key(spec, self.format)
+            path = self.path_of(key)
+            if path.exists():
+                os.utime(path, (now, now))
+                images[name] = ChartImage(name, key, self.format, path, True)
+            elif key in pending:
+                # Same chart under two names: render it once
+                pending[key][1].append(name)
+            else:
+                pending[key] = (spec, [name])
+        with self._lock:
+            self.hits += len(images)
+            self.misses += len(pending)
+
+        if pending and not self.workers:
+            for key, (spec, names) in pending.items():
+                path = Path(render(spec, self.format, self.path_of(key), key))
+                for name in names:
+                    images[name] = ChartImage(name, key, self.format, path, False)
+        elif pending:
+            futures = {
+                key: self._executor().submit(
+                    render, spec, self.format, self.path_of(key), key
+                )
+                for key, (spec, _) in pending.items()
+            }
+            for key, future in futures.items():
+                path = Path(future.result())
+                for name in pending[key][1]:
+                    images[name] = ChartImage(name, key, self.format, path, False)
+        return images
+
+    def start(self):
+        """Start the worker processes ahead of the first export."""
+        if self.workers:
+            list(self._executor().map(time.sleep, [0.2] * self.workers))
+
+    def purge(self):
+        """Delete cached charts unused for longer than the retention."""
+        cutoff = time.time() - self.retention
+        for entry in os.scandir(self.cache_dir):
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _executor(self):
+        # Spawned (not forked) workers: the exporter runs in a threaded
+        # process, the Streamlit server or the pipeline's stage threads
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
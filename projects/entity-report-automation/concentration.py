@@ -0,0 +1,161 @@
+"""
+Concentration - single-name and sector concentration of the portfolio.
+
+A Concentration keeps, for each sector of SECTORS:
+    - its exposure, number of names (customers) and the sum of the squared
+      exposures of its names
+    - its top_n largest names
+Names are grouped with a hash group-by (pd.factorize) of (customer, sector)
+and np.bincount; the largest names are picked with np.argpartition and only
+those are sorted. A customer belongs to one sector, so the portfolio's
+largest names are among the sectors' largest, and the HHIs, the top names
+and the sector shares all follow from these few numbers per sector.
+
+update_sector() recomputes one sector from its facilities alone, so a change
+to the exposures of one sector (a manual adjustment, a reclassified
+customer moved in) does not go through the whole portfolio again. Names
+whose exposure nets to zero are left out of both.
+
+HHIs are in points (0-10,000), shares in % of the exposure.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_sources import SECTORS
+from loan_aggregates import category_codes
+from settings import CONCENTRATION_TOP_N
+
+
+def top_k(values, k):
+    """Positions of the k largest values, largest first."""
+    if len(values) > k:
+        positions = np.argpartition(values, len(values) - k)[len(values) - k :]
+    else:
+        positions = np.arange(len(values))
+    return positions[np.argsort(-values[positions], kind="stable")]
+
+
+class Concentration:
+    """Exposure per name, summarised per sector."""
+
+    def __init__(self, top_n=CONCENTRATION_TOP_N):
+        self.top_n = top_n
+        sectors = len(SECTORS)
+        self.exposure = np.zeros(sectors)
+        self.squares = np.zeros(sectors)
+        self.names = np.zeros(sectors, dtype=np.int64)
+        self.top_customer = [np.zeros(0, dtype=np.int64)] * sectors
+        self.top_exposure = [np.zeros(0)] * sectors
+
+    def build(self, customer, sector, exposure):
+        """Recompute every sector.
+
+        customer: customer ids (non-negative integers), sector: codes into
+        SECTORS (facilities with -1 are left out), exposure: M PLN
+        """
+        customer = np.asarray(customer, dtype=np.int64)
+        sector = np.asarray(sector)
+        exposure = np.asarray(exposure, dtype=float)
+        known = sector >= 0
+        sectors = len(SECTORS)
+        codes, pairs = pd.factorize(customer[known] * sectors + sector[known])
+        sums = np.bincount(codes, exposure[known], minlength=len(pairs))
+        pair_sector = pairs % sectors
+        for code in range(sectors):
+            names = pair_sector == code
+            self._set_sector(code, pairs[names] // sectors, sums[names])
+        return self
+
+    def update_sector(self, sector, customer, exposure):
+        """Recompute one sector (a name of SECTORS) from all its facilities'
+        customer ids and exposures."""
+        codes, customers = pd.factorize(np.asarray(customer, dtype=np.int64))
+        sums = np.bincount(
+            codes, np.asarray(exposure, dtype=float), minlength=len(customers)
+        )
+        self._set_sector(SECTORS.index(sector), customers, sums)
+        return self
+
+    def _set_sector(self, code, customers, sums):
+        # A name whose exposure is gone (repaid, adjusted to zero) is no name
+        held = sums != 0
+        customers, sums = np.asarray(customers)[held], sums[held]
+        self.exposure[code] = sums.sum()
+        self.squares[code] = np.square(sums).sum()
+        self.names[code] = len(sums)
+        top = top_k(sums, self.top_n)
+        self.top_customer[code] = customers[top]
+        self.top_exposure[code] = sums[top]
+
+    def total(self):
+        return self.exposure.sum()
+
+    def name_hhi(self):
+        """HHI of the names' shares of the exposure."""
+        return self.squares.sum() / self.total() ** 2 * 10_000
+
+    def sector_hhi(self):
+        """HHI of the sectors' shares of the exposure."""
+        return np.square(self.exposure).sum() / self.total() ** 2 * 10_000
+
+    def top_names(self, n=None):
+        """customer_id, Sector, Exposure and Share of the n (top_n) largest
+        names."""
+        n = self.top_n if n is None else min(n, self.top_n)
+        sector = np.repeat(
+            np.arange(len(SECTORS)), [len(top) for top in self.top_exposure]
+        )
+        exposure = np.concatenate(self.top_exposure)
+        top = top_k(exposure, n)
+        return pd.DataFrame(
+            {
+                "customer_id": np.concatenate(self.top_customer)[top],
+                "Sector": np.array(SECTORS, dtype=object)[sector[top]],
+                "Exposure": exposure[top],
+                "Share": exposure[top] / self.total() * 100,
+            }
+        )
+
+    def sectors(self):
+        """Exposure, Share, Names, the HHI of the names within the sector
+        and the Top Name share of the sector, per sector."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hhi = np.where(
+                self.exposure > 0,
+                self.squares / np.square(self.exposure) * 10_000,
+                0.0,
+            )
+            largest = np.array(
+                [top[0] if len(top) else 0.0 for top in self.top_exposure]
+            )
+            top_name = np.where(self.exposure > 0, largest / self.exposure * 100, 0.0)
+        return pd.DataFrame(
+            {
+                "Sector": SECTORS,
+                "Exposure": self.exposure,
+                "Share": self.exposure / self.total() * 100,
+                "Names": self.names,
+                "HHI": hhi,
+                "Top_Name": top_name,
+            }
+        )
+
+    def indicators(self):
+        """The concentration KRIs: the largest name's and the largest
+        sector's share of the exposure (%)."""
+        largest = max((top[0] for top in self.top_exposure if len(top)), default=0.0)
+        return {
+            "Single Name Conc.": float(largest / self.total() * 100),
+            "Sector Concentration": float(self.exposure.max() / self.total() * 100),
+        }
+
+
+def concentration(facilities, top_n=CONCENTRATION_TOP_N):
+    """Concentration of a facility-level frame (see
+    report_data.facility_table)."""
+    return Concentration(top_n).build(
+        facilities["customer_id"].to_numpy(),
+        category_codes(facilities["sector"], SECTORS),
+        facilities["exposure"].to_numpy(float),
+    )
@@ -0,0 +1,299 @@
+"""
+Data Sources - the eight inputs of the Entity Report.
+
+The report reads four SQL databases, three Excel files from the team share
+and the pre-built slides in the SharePoint library. Locally they are
+stand-ins under SOURCES_DIR:
+    - SQLite databases with the same tables as the SQL servers
+    - .xlsx files with the same sheets as the share
+    - a directory of .pptx files in place of the SharePoint library
+create_demo_sources() builds a consistent set of them for the mockup.
+"""
+
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+
+from settings import SOURCES_DIR
+
+DATABASE, FILE, SHAREPOINT = "Database", "File", "SharePoint"
+
+# max_age: hours after which the source needs a review before reporting
+Source = namedtuple("Source", ["name", "kind", "path", "table", "max_age"])
+
+SOURCES = [
+    Source("SQL - Risk Database", DATABASE, "risk.db", "ratings", 26),
+    Source("SQL - Portfolio Database", DATABASE, "portfolio.db", "exposures", 26),
+    Source("SQL - Provisions DB", DATABASE, "provisions.db", "provisions", 26),
+    Source("Excel - Market Data", FILE, "market_data.xlsx", "Rates", 72),
+    Source(
+        "Excel - Manual Adjustments",
+        FILE,
+        "manual_adjustments.xlsx",
+        "Adjustments",
+        168,
+    ),
+    Source("SharePoint - Pre-built Slides", SHAREPOINT, "sharepoint", None, 720),
+    Source("Excel - Sector Mapping", FILE, "sector_mapping.xlsx", "Mapping", 720),
+    Source("SQL - Customer Data", DATABASE, "customer.db", "customers", 26),
+]
+
+SEGMENTS = [
+    "Large Corporate",
+    "SME",
+    "Micro Enterprise",
+    "Specialized",
+    "Project Finance",
+]
+RATINGS = ["AAA-AA", "A", "BBB", "BB", "B & Below"]
+SECTORS = [
+    "Manufacturing",
+    "Real Estate",
+    "Construction",
+    "Wholesale Trade",
+    "Retail Trade",
+    "Transport",
+    "Energy",
+    "Agriculture",
+    "Hospitality",
+    "Professional Services",
+    "Information & Communication",
+    "Healthcare",
+]
+
+# Share of customers per segment and per rating grade in the demo data
+SEGMENT_SHARES = [0.02, 0.25, 0.65, 0.05, 0.03]
+RATING_SHARES = [0.12, 0.24, 0.39, 0.17, 0.08]
+RATING_PD = [0.0005, 0.002, 0.008, 0.03, 0.12]
+
+DEMO_CUSTOMERS = 12_456
+DEMO_FACILITIES = 45_892
+# Facilities of the demo portfolio were originated between these dates
+DEMO_FIRST_ORIGINATION = date(2019, 1, 1)
+DEMO_CLOSE = date(2023, 12, 31)
+DEMO_SLIDES = [
+    "01_cover",
+    "02_agenda",
+    "03_macro_outlook",
+    "04_strategy_update",
+    "05_regulatory_changes",
+    "06_capital_position",
+    "07_liquidity",
+    "08_funding_plan",
+    "09_peer_comparison",
+    "10_rating_agency_view",
+    "11_disclaimer",
+    "12_contacts",
+]
+
+
+def source_path(source, directory=SOURCES_DIR):
+    return Path(directory) / source.path
+
+
+def create_demo_sources(directory=SOURCES_DIR, seed=2023):
+    """Build the eight stand-in sources with consistent random data.
+
+    The provisions extract is left two days old and the sector mapping six
+    weeks old, so the Data Validation tab has something to flag.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    segment = rng.choice(len(SEGMENTS), DEMO_CUSTOMERS, p=SEGMENT_SHARES)
+    rating = rng.choice(len(RATINGS), DEMO_CUSTOMERS, p=RATING_SHARES)
+    previous_rating = np.clip(
+        rating + rng.choice([-1, 0, 0, 0, 0, 1], rating.size), 0, 4
+    )
+    sector = rng.integers(0, len(SECTORS), DEMO_CUSTOMERS)
+
+    customer_of = rng.integers(0, DEMO_CUSTOMERS, DEMO_FACILITIES)
+    size = np.array([12.0, 0.7, 0.17, 1.1, 1.0])[segment[customer_of]]
+    exposure = np.round(rng.lognormal(0, 1, DEMO_FACILITIES) * size * 1e6, 2)
+    pd_of = np.array(RATING_PD)[rating[customer_of]]
+    defaulted = rng.random(DEMO_FACILITIES) < pd_of * 1.5
+    dpd = np.where(defaulted, rng.integers(91, 400, DEMO_FACILITIES), 0)
+    late = ~defaulted & (rng.random(DEMO_FACILITIES) < 0.05)
+    dpd[late] = rng.integers(1, 91, late.sum())
+
+    # Origination and first default dates come from a generator of their
+    # own, so the rest of the demo data does not change with them. Defaults
+    # arrive at the annual PD of the rating; a facility over 90 days past
+    # due defaulted when it crossed 90 days, and one that defaulted earlier
+    # and is performing now has cured.
+    history = np.random.default_rng([seed, 1])
+    days = (DEMO_CLOSE - DEMO_FIRST_ORIGINATION).days
+    originated = np.datetime64(DEMO_FIRST_ORIGINATION) + history.integers(
+        0, days + 1, DEMO_FACILITIES
+    ).astype("timedelta64[D]")
+    to_default = (history.exponential(1 / pd_of) * 365).astype("timedelta64[D]")
+    defaulted = np.where(
+        originated + to_default <= np.datetime64(DEMO_CLOSE),
+        originated + to_default,
+        np.datetime64("NaT"),
+    )
+    crossed_90 = np.datetime64(DEMO_CLOSE) - (dpd - 90).astype("timedelta64[D]")
+    defaulted = np.where(
+        dpd > 90,
+        np.maximum(originated, np.fmin(defaulted, crossed_90)),
+        defaulted,
+    )
+
+    loaded_at = (now - timedelta(hours=3)).isoformat(sep=" ")
+    _write_table(
+        directory / "customer.db",
+        "customers",
+        "customer_id INTEGER PRIMARY KEY, name TEXT, segment TEXT, sector TEXT,"
+        " updated_at TEXT",
+        (
+            (
+                i,
+                f"Customer {i:05d}",
+                SEGMENTS[segment[i]],
+                SECTORS[sector[i]],
+                loaded_at,
+            )
+            for i in range(DEMO_CUSTOMERS)
+        ),
+    )
+    _write_table(
+        directory / "risk.db",
+        "ratings",
+        "customer_id INTEGER PRIMARY KEY, rating TEXT, previous_rating TEXT,"
+        " pd REAL, updated_at TEXT",
+        (
+            (
+                i,
+                RATINGS[rating[i]],
+                RATINGS[previous_rating[i]],
+                RATING_PD[rating[i]],
+                loaded_at,
+            )
+            for i in range(DEMO_CUSTOMERS)
+        ),
+    )
+    _write_table(
+        directory / "portfolio.db",
+        "exposures",
+        "facility_id INTEGER PRIMARY KEY, customer_id INTEGER, segment TEXT,"
+        " exposure REAL, dpd INTEGER, originated TEXT, defaulted TEXT,"
+        " updated_at TEXT",
+        (
+            (
+                i,
+                int(customer_of[i]),
+                SEGMENTS[segment[customer_of[i]]],
+                float(exposure[i]),
+                int(dpd[i]),
+                str(originated[i]),
+                None if np.isnat(defaulted[i]) else str(defaulted[i]),
+                loaded_at,
+            )
+            for i in range(DEMO_FACILITIES)
+        ),
+    )
+    provisioned = np.flatnonzero(dpd > 0)
+    coverage = np.where(
+        dpd > 90, rng.uniform(0.5, 0.85, dpd.size), rng.uniform(0.02, 0.1, dpd.size)
+    )
+    stale_at = (now - timedelta(days=2)).isoformat(sep=" ")
+    _write_table(
+        directory / "provisions.db",
+        "provisions",
+        "facility_id INTEGER PRIMARY KEY, stage INTEGER, provision REAL,"
+        " updated_at TEXT",
+        (
+            (
+                int(i),
+                3 if dpd[i] > 90 else 2,
+                round(float(exposure[i] * coverage[i]), 2),
+                stale_at,
+            )
+            for i in provisioned
+        ),
+    )
+
+    _write_workbook(
+        directory / "market_data.xlsx",
+        "Rates",
+        ["Date", "Currency", "Rate"],
+        (
+            [
+                (now - timedelta(days=day)).date(),
+                currency,
+                round(rate * rng.uniform(0.98, 1.02), 4),
+            ]
+            for day in range(39)
+            for currency, rate in (
+                ("EUR", 4.35),
+                ("USD", 4.02),
+                ("CHF", 4.55),
+                ("GBP", 5.05),
+            )
+        ),
+        now - timedelta(hours=20),
+    )
+    _write_workbook(
+        directory / "manual_adjustments.xlsx",
+        "Adjustments",
+        ["Facility", "Adjustment (PLN)", "Reason", "Approved By"],
+        (
+            [
+                int(rng.integers(0, DEMO_FACILITIES)),
+                round(float(rng.normal(0, 250_000)), 2),
+                "Post-close correction",
+                "Credit Risk Control",
+            ]
+            for _ in range(23)
+        ),
+        now - timedelta(hours=2),
+    )
+    _write_workbook(
+        directory / "sector_mapping.xlsx",
+        "Mapping",
+        ["NACE Code", "Sector"],
+        ([f"{code:02d}", SECTORS[code % len(SECTORS)]] for code in range(1, 90)),
+        now - timedelta(days=42),
+    )
+
+    library = directory / "sharepoint"
+    library.mkdir(exist_ok=True)
+    published = (now - timedelta(days=5)).timestamp()
+    for name in DEMO_SLIDES:
+        path = library / f"{name}.pptx"
+        path.write_bytes(b"")
+        os.utime(path, (published, published))
+
+
+def _write_table(path, table, columns, rows):
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    with conn:
+        conn.execute(f"CREATE TABLE {table} ({columns})")
+        placeholders = ", ".join("?" * (columns.count(",") + 1))
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    conn.close()
+    os.replace(tmp_path, path)
+
+
+def _write_workbook(path, sheet, headers, rows, modified):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    tmp_path = f"{path}.tmp"
+    wb.save(tmp_path)
+    os.replace(tmp_path, path)
+    stamp = time.mktime(modified.timetuple())
+    os.utime(path, (stamp, stamp))
@@ -2,16 +2,45 @@
 Entity Report Control Panel - Streamlit Mockup
 A Streamlit-based UI for the Entity Report generation process.
 Shows data source validation, chart previews, and report generation.
+
+Only the selected view is run, each as a fragment, so its buttons rerun
+just that view. Report tables and preview charts of a period come from its
+snapshot (see snapshot_store) and are cached by the snapshot's version, so
+switching the Reporting Period or the view does not query the sources or
+redraw a chart. KRI statuses are coloured like the Excel report's (see
+risk_indicators).
 """
 
 import time
 from datetime import datetime
 
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 
+from chart_export import ChartExporter
+from data_sources import SOURCES, create_demo_sources
+from report_charts import (
+    exposure_trend_chart,
+    npl_trend_chart,
+    period_comparison_chart,
+    rating_chart,
+    segment_exposure_chart,
+    segment_matrix_chart,
+)
+from report_data import sources_current
+from report_generation import build_report_pipeline
+from report_pipeline import RUNNING, StageFailed
+from report_slides import ReportOptions, plan_slides
+from risk_indicators import KRI_RULES, STATUS_HIGHLIGHT, evaluate, threshold_text
+from settings import SOURCES_DIR
+from snapshot_store import (
+    create_demo_snapshots,
+    read_meta,
+    snapshot_dir,
+    snapshot_tables,
+)
+from source_probes import make_probes, run_probes
+
 st.set_page_config(
     page_title="Entity Report - Control Panel",
     page_icon="📊",
@@ -57,159 +86,192 @@ st.markdown(
 )
 
 
-def get_validation_data():
-    """Generate mock validation data for data sources."""
-    return pd.DataFrame(
-        {
-            "Source": [
-                "SQL - Risk Database",
-                "SQL - Portfolio Database",
-                "SQL - Provisions DB",
-                "Excel - Market Data",
-                "Excel - Manual Adjustments",
-                "SharePoint - Pre-built Slides",
-                "Excel - Sector Mapping",
-                "SQL - Customer Data",
-            ],
-            "Type": [
-                "Database",
-                "Database",
-                "Database",
-                "File",
-                "File",
-                "SharePoint",
-                "File",
-                "Database",
-            ],
-            "Status": [
-                "Available",
-                "Unavailable",
-                "Pending Review",
-                "Available",
-                "Available",
-                "Available",
-                "Pending Review",
-                "Available",
-            ],
-            "Last Updated": [
-                "2023-12-15 08:30",
-                "2023-12-15 08:30",
-                "2023-12-15 09:15",
-                "2023-12-14 16:45",
-                "2023-12-15 10:00",
-                "2023-12-13 14:20",
-                "2023-12-10 11:30",
-                "2023-12-15 08:30",
-            ],
-            "Records": [
-                "2,145",
-                "45,892",
-                "8,234",
-                "156",
-                "23",
-                "12 slides",
-                "89",
-                "12,456",
-            ],
-        }
-    )
+# Status shown while a source's probe is still running
+CHECKING = "Checking..."
 
+VIEWS = ["Data Validation", "Chart Preview", "Period Comparison", "Generate Report"]
 
-def get_portfolio_data():
-    """Generate mock portfolio exposure data."""
-    return pd.DataFrame(
-        {
-            "Segment": [
-                "Large Corporate",
-                "SME",
-                "Micro Enterprise",
-                "Specialized",
-                "Project Finance",
-            ],
-            "Exposure": [18450, 12890, 8234, 4120, 2198],
-            "NPL_Rate": [1.2, 3.8, 4.5, 2.1, 0.8],
-            "Coverage": [72.5, 65.2, 58.9, 78.3, 82.1],
-        }
-    )
+# Cell styles of the highlights shared with the Excel report
+HIGHLIGHT_CSS = {
+    "green": "background-color: #c6f6d5; color: #22543d",
+    "yellow": "background-color: #fefcbf; color: #744210",
+    "red": "background-color: #fed7d7; color: #822727",
+}
 
+# Reporting periods, latest first
+PERIODS = ["December 2023", "November 2023", "October 2023"]
 
-def get_rating_data():
-    """Generate mock rating distribution data."""
-    return pd.DataFrame(
-        {
-            "Rating": ["AAA-AA", "A", "BBB", "BB", "B & Below"],
-            "Exposure": [8920, 12450, 15670, 6234, 2618],
-            "Percentage": [19.4, 27.1, 34.2, 13.6, 5.7],
-        }
-    )
+# Overview metrics shown side by side in the Period Comparison view
+COMPARED_METRICS = [
+    "Total Exposure (M PLN)",
+    "NPL Ratio (%)",
+    "Coverage Ratio (%)",
+    "Provisions (M PLN)",
+]
 
 
-def get_trend_data():
-    """Generate mock monthly trend data."""
-    return pd.DataFrame(
-        {
-            "Month": ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
-            "Exposure": [42890, 43120, 43567, 44230, 45120, 45892],
-            "NPL": [3.1, 3.0, 2.9, 2.9, 2.8, 2.8],
-        }
-    )
+def ensure_sources():
+    """Build the local stand-in sources on first use, or again when they were
+    built by an older version."""
+    if not SOURCES_DIR.exists() or not sources_current(SOURCES_DIR):
+        with st.spinner("Creating demo data sources..."):
+            create_demo_sources(SOURCES_DIR)
 
 
-def style_status(val):
-    """Apply color styling to status column."""
-    if val == "Available":
-        return "background-color: #c6f6d5; color: #22543d"
-    elif val == "Pending Review":
-        return "background-color: #fefcbf; color: #744210"
-    else:
-        return "background-color: #fed7d7; color: #822727"
+@st.cache_resource
+def get_chart_exporter():
+    """Chart image cache and render processes, shared by all sessions."""
+    return ChartExporter()
 
 
-def main():
-    # Sidebar
-    with st.sidebar:
-        st.image("https://via.placeholder.com/200x60?text=Entity+Report", width=200)
-        st.markdown("---")
-        st.markdown("### Report Settings")
+def ensure_snapshots():
+    """Snapshot the periods that have no snapshot yet."""
+    ensure_sources()
+    if any(read_meta(period) is None for period in PERIODS):
+        with st.spinner("Building period snapshots..."):
+            create_demo_snapshots(PERIODS)
 
-        report_month = st.selectbox(
-            "Reporting Period", ["December 2023", "November 2023", "October 2023"]
-        )
 
-        report_type = st.radio(
-            "Report Type", ["Full Report", "Executive Summary", "Risk Appendix"]
-        )
+def snapshot_version(period):
+    """Changes whenever the period's snapshot is rebuilt."""
+    return (snapshot_dir(period) / "meta.json").stat().st_mtime_ns
 
-        st.markdown("---")
-        st.markdown("### Generation Options")
 
-        include_charts = st.checkbox("Include Charts", value=True)
-        include_tables = st.checkbox("Include Data Tables", value=True)
-        include_appendix = st.checkbox("Include Appendix", value=True)
+@st.cache_data(show_spinner="Loading report data...")
+def get_period_tables(period, version):
+    """Report tables of a period from its snapshot (version is the cache key)."""
+    return snapshot_tables(period)
 
-        st.markdown("---")
-        st.markdown("**Last Generated:** 2023-12-01")
-        st.markdown("**Version:** v3.2.1")
 
-    # Main content
-    st.title("Entity Report Control Panel")
-    st.markdown(
-        f"**Report Period:** {report_month} | **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    )
+@st.cache_data(show_spinner=False)
+def get_preview_charts(period, version):
+    """Figures of the Chart Preview view, drawn once per snapshot."""
+    tables = get_period_tables(period, version)
+    return {
+        "segment_exposure": segment_exposure_chart(tables["segments"]),
+        "ratings": rating_chart(tables["ratings"]),
+        "exposure_trend": exposure_trend_chart(tables["trend"]),
+        "npl_trend": npl_trend_chart(tables["trend"]),
+        "segment_matrix": segment_matrix_chart(tables["segments"]),
+    }
+
 
-    # Tab layout
-    tab1, tab2, tab3 = st.tabs(["Data Validation", "Chart Preview", "Generate Report"])
+def get_comparison_data(period, other):
+    """Overview metrics and segments of two periods, with the change."""
+    tables = get_period_tables(period, snapshot_version(period))
+    other_tables = get_period_tables(other, snapshot_version(other))
 
-    # ===== TAB 1: Data Validation =====
-    with tab1:
-        st.header("Data Source Validation")
-        st.markdown(
-            "Check availability and freshness of all data sources before generating the report."
+    overview = tables["overview"].set_index("Metric")["Value"]
+    other_overview = other_tables["overview"].set_index("Metric")["Value"]
+    metrics = pd.DataFrame(
+        {
+            period: overview[COMPARED_METRICS],
+            other: other_overview[COMPARED_METRICS],
+        }
+    )
+    metrics["Change"] = metrics[period] - metrics[other]
+
+    segments = tables["segments"].set_index("Segment")
+    other_segments = other_tables["segments"].set_index("Segment")
+    comparison = pd.DataFrame(
+        {
+            f"Exposure {period}": segments["Exposure"],
+            f"Exposure {other}": other_segments["Exposure"],
+            "Exposure Change (%)": (
+                segments["Exposure"] / other_segments["Exposure"] * 100 - 100
+            ).round(1),
+            f"NPL Rate {period}": segments["NPL_Rate"],
+            f"NPL Rate {other}": other_segments["NPL_Rate"],
+        }
+    ).reset_index()
+    return metrics, comparison
+
+
+@st.cache_data(show_spinner=False)
+def get_kri_results(versions):
+    """NPL and coverage KRIs of the portfolio and each segment in every
+    period, rated in one evaluation; versions is ((period, version), ...)."""
+    rows = []
+    for period, version in versions:
+        tables = get_period_tables(period, version)
+        overview = tables["overview"].set_index("Metric")["Value"]
+        rows.append((period, "Portfolio", "NPL Ratio", overview["NPL Ratio (%)"]))
+        rows.append(
+            (period, "Portfolio", "Coverage Ratio", overview["Coverage Ratio (%)"])
+        )
+        for segment in tables["segments"].itertuples():
+            rows.append((period, segment.Segment, "NPL Ratio", segment.NPL_Rate))
+            rows.append((period, segment.Segment, "Coverage Ratio", segment.Coverage))
+    results = pd.DataFrame(rows, columns=["Period", "Entity", "Indicator", "Value"])
+    results["Status"] = evaluate(results["Indicator"], results["Value"])
+    return results
+
+
+def show_kri(results, indicator):
+    """Values of one KRI by entity and period, coloured by status."""
+    rows = results[results["Indicator"] == indicator]
+    values = rows.pivot(index="Entity", columns="Period", values="Value")
+    statuses = rows.pivot(index="Entity", columns="Period", values="Status")
+    order = list(dict.fromkeys(rows["Entity"]))
+    values = values.reindex(index=order, columns=PERIODS)
+    statuses = statuses.reindex(index=order, columns=PERIODS)
+    styled = values.style.apply(
+        lambda _: statuses.map(style_kri_status), axis=None
+    ).format("{:.1f}%")
+    st.markdown(f"**{indicator}** ({threshold_text(KRI_RULES[indicator])})")
+    st.dataframe(styled, use_container_width=True)
+
+
+@st.cache_data(show_spinner=False)
+def get_comparison_chart(period, version, other, other_version):
+    """Exposure by segment of two periods, drawn once per pair of snapshots."""
+    segments = [
+        get_period_tables(p, v)["segments"].assign(Period=p)
+        for p, v in ((period, version), (other, other_version))
+    ]
+    return period_comparison_chart(pd.concat(segments, ignore_index=True))
+
+
+def get_validation_data(results):
+    """Validation table of the data sources from the probe results so far."""
+    rows = []
+    for source in SOURCES:
+        result = results.get(source.name)
+        if result is None:
+            rows.append([source.name, source.kind, CHECKING, "", "", ""])
+            continue
+        if result.records is None:
+            records = "-"
+        elif result.unit == "slides":
+            records = f"{result.records} slides"
+        else:
+            records = f"{result.records:,}"
+        last_updated = (
+            result.last_updated.strftime("%Y-%m-%d %H:%M")
+            if result.last_updated
+            else "-"
         )
+        rows.append(
+            [
+                source.name,
+                source.kind,
+                result.status,
+                last_updated,
+                records,
+                result.detail,
+            ]
+        )
+    return pd.DataFrame(
+        rows,
+        columns=["Source", "Type", "Status", "Last Updated", "Records", "Detail"],
+    )
 
-        validation_df = get_validation_data()
 
-        # Summary metrics
+def show_validation(metrics_area, table_area, results):
+    """Render the summary metrics and the styled validation table."""
+    validation_df = get_validation_data(results)
+
+    with metrics_area.container():
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             available_count = len(validation_df[validation_df["Status"] == "Available"])
@@ -229,220 +291,326 @@ def main():
                 "File Sources", len(validation_df[validation_df["Type"] != "Database"])
             )
 
-        st.markdown("---")
+    styled_df = validation_df.style.map(style_status, subset=["Status"]).set_properties(
+        **{
+            "text-align": "left",
+            "font-size": "14px",
+        }
+    )
+    table_area.dataframe(
+        styled_df, use_container_width=True, hide_index=True, height=350
+    )
 
-        # Styled validation table
-        styled_df = validation_df.style.applymap(
-            style_status, subset=["Status"]
-        ).set_properties(
-            **{
-                "text-align": "left",
-                "font-size": "14px",
-            }
-        )
 
-        st.dataframe(styled_df, use_container_width=True, hide_index=True, height=350)
+def style_status(val):
+    """Apply color styling to status column."""
+    if val == "Available":
+        return HIGHLIGHT_CSS["green"]
+    elif val == "Pending Review":
+        return HIGHLIGHT_CSS["yellow"]
+    elif val == CHECKING:
+        return "background-color: #edf2f7; color: #4a5568"
+    else:
+        return HIGHLIGHT_CSS["red"]
 
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            if st.button("Refresh All Sources", type="secondary"):
-                with st.spinner("Refreshing data sources..."):
-                    time.sleep(1)
-                st.success("All sources refreshed!")
 
-    # ===== TAB 2: Chart Preview =====
-    with tab2:
-        st.header("Chart Preview")
-        st.markdown("Preview charts that will be included in the final report.")
+def style_kri_status(status):
+    """Cell style of a KRI status, the highlight of the Excel report."""
+    return HIGHLIGHT_CSS.get(STATUS_HIGHLIGHT.get(status), "")
 
-        col1, col2 = st.columns(2)
 
-        with col1:
-            st.subheader("Exposure by Segment")
-            portfolio_df = get_portfolio_data()
-            fig_bar = px.bar(
-                portfolio_df,
-                x="Segment",
-                y="Exposure",
-                color="Segment",
-                title="Portfolio Exposure by Segment (M PLN)",
-                color_discrete_sequence=px.colors.qualitative.Set2,
-            )
-            fig_bar.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig_bar, use_container_width=True)
+@st.fragment
+def data_validation():
+    st.header("Data Source Validation")
+    st.markdown(
+        "Check availability and freshness of all data sources before generating the report."
+    )
 
-        with col2:
-            st.subheader("Rating Distribution")
-            rating_df = get_rating_data()
-            fig_pie = px.pie(
-                rating_df,
-                values="Exposure",
-                names="Rating",
-                title="Exposure by Risk Rating",
-                color_discrete_sequence=px.colors.qualitative.Pastel,
-            )
-            fig_pie.update_traces(textposition="inside", textinfo="percent+label")
-            fig_pie.update_layout(height=400)
-            st.plotly_chart(fig_pie, use_container_width=True)
+    ensure_sources()
+    metrics_area = st.empty()
+    st.markdown("---")
+    table_area = st.empty()
+
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        refresh = st.button("Refresh All Sources", type="secondary")
+
+    results = st.session_state.get("probe_results")
+    if refresh or results is None:
+        # Show every source as being checked, then fill in each row as
+        # its probe completes
+        results = {}
+        show_validation(metrics_area, table_area, results)
+        started = time.perf_counter()
+        for result in run_probes(make_probes()):
+            results[result.source.name] = result
+            show_validation(metrics_area, table_area, results)
+        st.session_state["probe_results"] = results
+        if refresh:
+            with col2:
+                st.success(
+                    f"All sources refreshed in {time.perf_counter() - started:.1f}s"
+                )
+    else:
+        show_validation(metrics_area, table_area, results)
 
-        st.markdown("---")
 
-        col1, col2 = st.columns(2)
+@st.fragment
+def chart_preview(report_month):
+    st.header("Chart Preview")
+    st.markdown(
+        f"Preview charts that will be included in the final report for {report_month}."
+    )
 
-        with col1:
-            st.subheader("Monthly Exposure Trend")
-            trend_df = get_trend_data()
-            fig_line = go.Figure()
-            fig_line.add_trace(
-                go.Scatter(
-                    x=trend_df["Month"],
-                    y=trend_df["Exposure"],
-                    mode="lines+markers",
-                    name="Exposure",
-                    line=dict(color="#3182ce", width=3),
-                    marker=dict(size=8),
-                )
-            )
-            fig_line.update_layout(
-                title="Total Portfolio Exposure (M PLN)",
-                xaxis_title="Month",
-                yaxis_title="Exposure (M PLN)",
-                height=350,
-            )
-            st.plotly_chart(fig_line, use_container_width=True)
+    ensure_snapshots()
+    figures = get_preview_charts(report_month, snapshot_version(report_month))
 
-        with col2:
-            st.subheader("NPL Ratio Trend")
-            fig_npl = go.Figure()
-            fig_npl.add_trace(
-                go.Scatter(
-                    x=trend_df["Month"],
-                    y=trend_df["NPL"],
-                    mode="lines+markers",
-                    name="NPL Ratio",
-                    line=dict(color="#e53e3e", width=3),
-                    marker=dict(size=8),
-                    fill="tozeroy",
-                    fillcolor="rgba(229, 62, 62, 0.1)",
-                )
-            )
-            fig_npl.add_hline(
-                y=4.0,
-                line_dash="dash",
-                line_color="gray",
-                annotation_text="Threshold (4.0%)",
-            )
-            fig_npl.update_layout(
-                title="NPL Ratio (%)",
-                xaxis_title="Month",
-                yaxis_title="NPL Ratio (%)",
-                height=350,
-            )
-            st.plotly_chart(fig_npl, use_container_width=True)
+    col1, col2 = st.columns(2)
 
-        st.markdown("---")
+    with col1:
+        st.subheader("Exposure by Segment")
+        st.plotly_chart(figures["segment_exposure"], use_container_width=True)
 
-        st.subheader("Segment Performance Matrix")
-        portfolio_df = get_portfolio_data()
-        fig_scatter = px.scatter(
-            portfolio_df,
-            x="NPL_Rate",
-            y="Coverage",
-            size="Exposure",
-            color="Segment",
-            title="NPL Rate vs Coverage by Segment",
-            labels={"NPL_Rate": "NPL Rate (%)", "Coverage": "Coverage Ratio (%)"},
-            color_discrete_sequence=px.colors.qualitative.Set2,
-        )
-        fig_scatter.update_layout(height=400)
-        st.plotly_chart(fig_scatter, use_container_width=True)
+    with col2:
+        st.subheader("Rating Distribution")
+        st.plotly_chart(figures["ratings"], use_container_width=True)
 
-    # ===== TAB 3: Generate Report =====
-    with tab3:
-        st.header("Generate Report")
+    st.markdown("---")
 
-        # Pre-generation checklist
-        st.subheader("Pre-Generation Checklist")
+    col1, col2 = st.columns(2)
 
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("#### Data Sources")
-            st.checkbox("All SQL connections verified", value=True, disabled=True)
-            st.checkbox("Excel files available", value=True, disabled=True)
-            st.checkbox("SharePoint slides downloaded", value=True, disabled=True)
-            st.checkbox("Manual adjustments reviewed", value=False, disabled=True)
+    with col1:
+        st.subheader("Monthly Exposure Trend")
+        st.plotly_chart(figures["exposure_trend"], use_container_width=True)
 
-        with col2:
-            st.markdown("#### Report Components")
-            st.checkbox("Executive Summary", value=include_charts, disabled=True)
-            st.checkbox("Portfolio Analysis", value=include_tables, disabled=True)
-            st.checkbox("Risk Indicators", value=True, disabled=True)
-            st.checkbox("Appendix & Notes", value=include_appendix, disabled=True)
+    with col2:
+        st.subheader("NPL Ratio Trend")
+        st.plotly_chart(figures["npl_trend"], use_container_width=True)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # Generation summary
-        st.subheader("Generation Summary")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.info(f"**Report Type:** {report_type}")
-        with col2:
-            st.info(f"**Period:** {report_month}")
-        with col3:
-            estimated_slides = (
-                66
-                if report_type == "Full Report"
-                else 15
-                if report_type == "Executive Summary"
-                else 25
+    st.subheader("Segment Performance Matrix")
+    st.plotly_chart(figures["segment_matrix"], use_container_width=True)
+
+
+@st.fragment
+def period_comparison(report_month):
+    st.header("Period Comparison")
+    st.markdown("Compare the reporting period with another closed period.")
+
+    ensure_snapshots()
+    others = [period for period in PERIODS if period != report_month]
+    # Default to the period before, or the latest one for the earliest period
+    default = PERIODS.index(report_month) % len(others)
+    other = st.selectbox("Compare with", others, index=default)
+
+    metrics, comparison = get_comparison_data(report_month, other)
+    for col, (metric, row) in zip(st.columns(len(metrics)), metrics.iterrows()):
+        with col:
+            st.metric(
+                metric,
+                f"{row[report_month]:,.1f}",
+                f"{row['Change']:+,.1f} vs {other}",
+                delta_color="inverse" if metric == "NPL Ratio (%)" else "normal",
             )
-            st.info(f"**Estimated Slides:** {estimated_slides}")
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # Generate button
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button(
-                "Generate Entity Report", type="primary", use_container_width=True
-            ):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                steps = [
-                    ("Connecting to databases...", 10),
-                    ("Loading portfolio data...", 25),
-                    ("Processing risk metrics...", 40),
-                    ("Generating charts...", 55),
-                    ("Building PowerPoint slides...", 70),
-                    ("Merging SharePoint content...", 85),
-                    ("Finalizing report...", 95),
-                    ("Complete!", 100),
-                ]
-
-                for step_text, progress in steps:
-                    status_text.text(step_text)
-                    progress_bar.progress(progress)
-                    time.sleep(0.5)
+    st.plotly_chart(
+        get_comparison_chart(
+            report_month,
+            snapshot_version(report_month),
+            other,
+            snapshot_version(other),
+        ),
+        use_container_width=True,
+    )
+    st.dataframe(comparison, use_container_width=True, hide_index=True)
+
+    st.markdown("---")
 
+    st.subheader("Key Risk Indicators")
+    results = get_kri_results(
+        tuple((period, snapshot_version(period)) for period in PERIODS)
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        show_kri(results, "NPL Ratio")
+    with col2:
+        show_kri(results, "Coverage Ratio")
+
+
+@st.fragment
+def generate_report(report_month, report_type, options):
+    st.header("Generate Report")
+
+    # Pre-generation checklist
+    st.subheader("Pre-Generation Checklist")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Data Sources")
+        st.checkbox("All SQL connections verified", value=True, disabled=True)
+        st.checkbox("Excel files available", value=True, disabled=True)
+        st.checkbox("SharePoint slides downloaded", value=True, disabled=True)
+        st.checkbox("Manual adjustments reviewed", value=False, disabled=True)
+
+    with col2:
+        st.markdown("#### Report Components")
+        st.checkbox("Executive Summary", value=options.include_charts, disabled=True)
+        st.checkbox("Portfolio Analysis", value=options.include_tables, disabled=True)
+        st.checkbox("Risk Indicators", value=True, disabled=True)
+        st.checkbox("Appendix & Notes", value=options.include_appendix, disabled=True)
+
+    st.markdown("---")
+
+    # Generation summary
+    st.subheader("Generation Summary")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.info(f"**Report Type:** {report_type}")
+    with col2:
+        st.info(f"**Period:** {report_month}")
+    with col3:
+        estimated_slides = len(plan_slides(report_type, options.include_appendix))
+        st.info(f"**Estimated Slides:** {estimated_slides}")
+
+    st.markdown("---")
+
+    # Generate button
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.button(
+            "Generate Entity Report", type="primary", use_container_width=True
+        ):
+            ensure_snapshots()
+            pipeline = build_report_pipeline(
+                report_month,
+                report_type,
+                options,
+                exporter=get_chart_exporter(),
+            )
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            running = []
+            finished = []
+
+            def show_progress(stage, state):
+                if state == RUNNING:
+                    running.append(stage.label)
+                else:
+                    running.remove(stage.label)
+                    finished.append(stage.label)
+                    progress_bar.progress(len(finished) / len(pipeline))
+                status_text.text(" | ".join(running) or "Complete!")
+
+            try:
+                results, timings = pipeline.run(show_progress)
+            except StageFailed as e:
+                status_text.empty()
+                st.error(str(e))
+            else:
+                package = results["finalize"]
                 st.success("Report generated successfully!")
                 st.balloons()
 
                 st.markdown("---")
                 st.markdown("### Generated Report")
+                st.markdown(f"**Filename:** {package.path.name}")
+                st.markdown(f"**Size:** {package.size / 1024 / 1024:.1f} MB")
+                build = results["build_slides"]
+                st.markdown(
+                    f"**Slides:** {package.slides} ({build.rebuilt} rebuilt, "
+                    f"{build.reused} unchanged, "
+                    f"{package.slides - build.rebuilt - build.reused} pre-built)"
+                )
+                cached = sum(image.cached for image in build.images)
                 st.markdown(
-                    f"**Filename:** Entity_Report_{report_month.replace(' ', '_')}.pptx"
+                    f"**Charts:** {len(build.images) - cached} rendered, "
+                    f"{cached} from cache"
                 )
-                st.markdown("**Size:** 12.4 MB")
-                st.markdown(f"**Slides:** {estimated_slides}")
 
                 st.download_button(
                     label="Download Report",
-                    data=b"Mock PowerPoint content",
-                    file_name=f"Entity_Report_{report_month.replace(' ', '_')}.pptx",
-                    mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                    data=package.path.read_bytes(),
+                    file_name=package.path.name,
+                    mime="application/zip",
                 )
 
+                # Per-stage timings; stages that overlapped ran in parallel
+                total = max(timing.finished for timing in timings.values())
+                busy = sum(
+                    timing.finished - timing.started for timing in timings.values()
+                )
+                st.markdown("#### Stage Timings")
+                st.caption(f"Total {total:.2f}s for {busy:.2f}s of stage work")
+                st.dataframe(
+                    pd.DataFrame(
+                        {
+                            "Stage": [t.stage.label for t in timings.values()],
+                            "Start (s)": [t.started for t in timings.values()],
+                            "Duration (s)": [
+                                t.finished - t.started for t in timings.values()
+                            ],
+                        }
+                    ).sort_values("Start (s)"),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "Start (s)": st.column_config.NumberColumn(format="%.2f"),
+                        "Duration (s)": st.column_config.NumberColumn(format="%.2f"),
+                    },
+                )
+
+
+def main():
+    # Sidebar
+    with st.sidebar:
+        st.image("https://via.placeholder.com/200x60?text=Entity+Report", width=200)
+        st.markdown("---")
+        st.markdown("### Report Settings")
+
+        report_month = st.selectbox("Reporting Period", PERIODS)
+
+        report_type = st.radio(
+            "Report Type", ["Full Report", "Executive Summary", "Risk Appendix"]
+        )
+
+        st.markdown("---")
+        st.markdown("### Generation Options")
+
+        include_charts = st.checkbox("Include Charts", value=True)
+        include_tables = st.checkbox("Include Data Tables", value=True)
+        include_appendix = st.checkbox("Include Appendix", value=True)
+
+        st.markdown("---")
+        st.markdown("**Last Generated:** 2023-12-01")
+        st.markdown("**Version:** v3.2.1")
+
+    # Main content
+    st.title("Entity Report Control Panel")
+    st.markdown(
+        f"**Report Period:** {report_month} | **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    )
+
+    # Only the selected view is run
+    view = st.radio(
+        "View", VIEWS, horizontal=True, label_visibility="collapsed", key="view"
+    )
+    st.markdown("---")
+    if view == "Data Validation":
+        data_validation()
+    elif view == "Chart Preview":
+        chart_preview(report_month)
+    elif view == "Period Comparison":
+        period_comparison(report_month)
+    else:
+        generate_report(
+            report_month,
+            report_type,
+            ReportOptions(include_charts, include_tables, include_appendix),
+        )
+
 
 if __name__ == "__main__":
     main()
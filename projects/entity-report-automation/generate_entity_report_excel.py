@@ -2,6 +2,16 @@
 Generate a mock Excel file representing a convoluted Credit Risk Entity Report.
 This creates multiple small tables with formatting, pie charts, and bar charts,
 plus additional empty sheets to show the complexity of the original process.
+
+Portfolio Overview, Risk Rating Distribution and Segment Breakdown are
+computed from the loan-level data of the period snapshots (see
+snapshot_store and loan_aggregates), Vintage Analysis from the period's
+vintage triangle (see vintage_analysis), the IFRS9 Staging sheet and the
+Expected Loss of the overview by the IFRS 9 calculator (see ifrs9), the
+Concentration Risk sheet and the concentration KRIs by the concentration
+engine (see concentration); Key Risk Indicator statuses are evaluated
+against the limits in settings (see risk_indicators). The other tables are
+still mock data.
 """
 
 import openpyxl
@@ -11,8 +21,27 @@ from openpyxl.chart import PieChart, BarChart, Reference
 from openpyxl.chart.label import DataLabelList
 import random
 
+import pandas as pd
+
+from concentration import concentration
+from data_sources import SEGMENTS, create_demo_sources
+from ifrs9 import STAGES, ifrs9_table, stage_summary
+from loan_aggregates import breakdown, loan_book, overview, rating_distribution
+from report_data import sources_current
+from risk_indicators import STATUS_HIGHLIGHT, kri_table
+from settings import SOURCES_DIR
+from snapshot_store import create_demo_snapshots, load_vintages, snapshot_facilities
+from vintage_analysis import month_number, period_month, seasoning_exposure
+
 OUTPUT_FILE = "entity_report_q4_2023.xlsx"
 
+# Period of the report and the one it is compared with
+PERIOD = "December 2023"
+PREVIOUS_PERIOD = "November 2023"
+
+# Annual vintages in the Vintage Analysis table
+VINTAGES = 5
+
 # Color scheme for formatting
 COLORS = {
     "header_dark": "1a365d",
@@ -59,8 +88,30 @@ def apply_data_style(cell, is_number=False, highlight=None):
         cell.fill = PatternFill(start_color="fefcbf", end_color="fefcbf", fill_type="solid")
 
 
-def create_main_sheet(wb):
-    """Create the main sheet with multiple convoluted tables and charts."""
+def customer_names(facilities):
+    """Customer name by customer_id, from the facility frame of a period."""
+    return facilities.drop_duplicates("customer_id").set_index("customer_id")["name"]
+
+
+def vintage_table(period, facilities, vintages=VINTAGES):
+    """Cumulative default rates (%) of the last annual vintages by year of
+    seasoning, with the exposure now in each year of seasoning (facilities:
+    the period's snapshot_facilities())."""
+    rates = load_vintages(period).rates().iloc[:, -vintages:]
+    rates["Total Exp"] = seasoning_exposure(
+        month_number(facilities["originated"]), facilities["exposure"], period_month(period)
+    )
+    return rates
+
+
+def create_main_sheet(wb, current, previous, vintages, ifrs9, previous_ifrs9, concentration_risk):
+    """Create the main sheet with multiple convoluted tables and charts.
+
+    current and previous are the LoanBooks of the period and the one before,
+    vintages the vintage_table() of the period, ifrs9 and previous_ifrs9 the
+    ifrs9_table() of both periods, concentration_risk the period's
+    Concentration.
+    """
     ws = wb.active
     ws.title = "Executive Summary"
 
@@ -70,13 +121,17 @@ def create_main_sheet(wb):
     apply_header_style(ws['B2'])
 
     overview_headers = ["Metric", "Current", "Previous", "Change %"]
+    totals, previous_totals = overview(current), overview(previous)
     overview_data = [
-        ["Total Exposure (M PLN)", 45_892, 43_567, 5.3],
-        ["NPL Ratio (%)", 2.8, 3.1, -9.7],
-        ["Coverage Ratio (%)", 68.5, 65.2, 5.1],
-        ["RWA (M PLN)", 28_456, 27_890, 2.0],
-        ["Expected Loss (M PLN)", 892, 945, -5.6],
+        ["Total Exposure (M PLN)", round(totals["exposure"]), round(previous_totals["exposure"])],
+        ["NPL Ratio (%)", round(totals["npl_ratio"], 1), round(previous_totals["npl_ratio"], 1)],
+        ["Coverage Ratio (%)", round(totals["coverage"], 1), round(previous_totals["coverage"], 1)],
+        ["Expected Loss (M PLN)", round(ifrs9["ECL"].sum()), round(previous_ifrs9["ECL"].sum())],
+        # Not in the loan-level data
+        ["RWA (M PLN)", 28_456, 27_890],
     ]
+    for row_data in overview_data:
+        row_data.append(round((row_data[1] / row_data[2] - 1) * 100, 1))
 
     for col, header in enumerate(overview_headers, 2):
         cell = ws.cell(row=3, column=col, value=header)
@@ -102,11 +157,8 @@ def create_main_sheet(wb):
 
     rating_headers = ["Rating", "Count", "Exposure (M)", "% Total"]
     rating_data = [
-        ["AAA-AA", 245, 8_920, 19.4],
-        ["A", 512, 12_450, 27.1],
-        ["BBB", 834, 15_670, 34.2],
-        ["BB", 356, 6_234, 13.6],
-        ["B & Below", 189, 2_618, 5.7],
+        [row.Rating, row.Count, round(row.Exposure), round(row.Percentage, 1)]
+        for row in rating_distribution(current).itertuples()
     ]
 
     for col, header in enumerate(rating_headers, 7):
@@ -143,11 +195,8 @@ def create_main_sheet(wb):
 
     segment_headers = ["Segment", "Clients", "Exposure", "NPL", "Coverage"]
     segment_data = [
-        ["Large Corporate", 156, 18_450, 1.2, 72.5],
-        ["SME", 1_245, 12_890, 3.8, 65.2],
-        ["Micro Enterprise", 3_567, 8_234, 4.5, 58.9],
-        ["Specialized Lending", 89, 4_120, 2.1, 78.3],
-        ["Project Finance", 34, 2_198, 0.8, 82.1],
+        [row.segment, row.Clients, round(row.Exposure), round(row.NPL_Rate, 1), round(row.Coverage, 1)]
+        for row in breakdown(current, "segment").itertuples()
     ]
 
     for col, header in enumerate(segment_headers, 2):
@@ -184,14 +233,18 @@ def create_main_sheet(wb):
     apply_header_style(ws['B20'])
 
     kri_headers = ["Indicator", "Threshold", "Actual", "Status"]
-    kri_data = [
-        ["NPL Ratio", "< 4.0%", "2.8%", "OK"],
-        ["LTV > 100%", "< 5.0%", "3.2%", "OK"],
-        ["Single Name Conc.", "< 3.0%", "2.1%", "OK"],
-        ["Sector Concentration", "< 15.0%", "14.8%", "WARN"],
-        ["FX Exposure", "< 25.0%", "18.5%", "OK"],
-        ["Covenant Breaches", "< 2.0%", "2.3%", "BREACH"],
-    ]
+    concentration_kris = concentration_risk.indicators()
+    kri_values = {
+        "NPL Ratio": totals["npl_ratio"],
+        # Not in the loan-level data
+        "LTV > 100%": 3.2,
+        "Single Name Conc.": concentration_kris["Single Name Conc."],
+        "Sector Concentration": concentration_kris["Sector Concentration"],
+        # Not in the loan-level data
+        "FX Exposure": 18.5,
+        "Covenant Breaches": 2.3,
+    }
+    kri_data = kri_table(kri_values).values.tolist()
 
     for col, header in enumerate(kri_headers, 2):
         cell = ws.cell(row=21, column=col, value=header)
@@ -200,14 +253,7 @@ def create_main_sheet(wb):
     for row_idx, row_data in enumerate(kri_data, 22):
         for col_idx, value in enumerate(row_data, 2):
             cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            highlight = None
-            if col_idx == 5:
-                if value == "OK":
-                    highlight = "green"
-                elif value == "WARN":
-                    highlight = "yellow"
-                elif value == "BREACH":
-                    highlight = "red"
+            highlight = STATUS_HIGHLIGHT.get(value) if col_idx == 5 else None
             apply_data_style(cell, is_number=False, highlight=highlight)
 
     # ===== TABLE 5: Monthly Trend (Bottom-left) =====
@@ -232,14 +278,11 @@ def create_main_sheet(wb):
     ws['B30'] = "Vintage Analysis - Default Rates by Origination Year"
     apply_header_style(ws['B30'])
 
-    vintage_headers = ["Vintage", "2019", "2020", "2021", "2022", "2023", "Total Exp"]
-    vintage_data = [
-        ["Year 1", 0.5, 0.8, 0.4, 0.6, 0.3, 8_920],
-        ["Year 2", 1.2, 1.5, 1.1, 0.9, "-", 12_450],
-        ["Year 3", 2.1, 2.4, 1.8, "-", "-", 15_670],
-        ["Year 4", 2.8, 2.9, "-", "-", "-", 6_234],
-        ["Year 5+", 3.2, "-", "-", "-", "-", 2_618],
-    ]
+    vintage_headers = ["Vintage", *vintages.columns]
+    vintage_data = []
+    for seasoning, row in zip(vintages.index, vintages.to_numpy()):
+        rates = ["-" if pd.isna(rate) else round(float(rate), 1) for rate in row[:-1]]
+        vintage_data.append([seasoning, *rates, int(round(row[-1]))])
 
     for col, header in enumerate(vintage_headers, 2):
         cell = ws.cell(row=31, column=col, value=header)
@@ -286,8 +329,133 @@ def create_main_sheet(wb):
         ws.column_dimensions[get_column_letter(col)].width = 14
 
 
-def create_additional_sheets(wb):
-    """Create additional empty sheets to show complexity."""
+def create_ifrs9_sheet(ws, ifrs9):
+    """Fill the IFRS9 Staging sheet from the ifrs9_table(): totals per
+    stage, then the loss allowance per segment and stage."""
+    ws['B3'] = "Source: Period snapshot - staging by rating migration and days past due"
+
+    ws.merge_cells('B5:H5')
+    ws['B5'] = "Stage Summary"
+    apply_header_style(ws['B5'])
+    stage_headers = ["Stage", "Facilities", "EAD (M PLN)", "12M EL", "Lifetime EL", "ECL", "Coverage %"]
+    for col, header in enumerate(stage_headers, 2):
+        apply_header_style(ws.cell(row=6, column=col, value=header), "header_mid")
+
+    stages = stage_summary(ifrs9)
+    for row_idx, row in enumerate(stages.itertuples(index=False), 7):
+        stage = row.Stage if row.Stage == "Total" else f"Stage {row.Stage}"
+        row_data = [stage, row.Facilities, row.EAD, row.EL_12M, row.EL_Lifetime, row.ECL, row.Coverage]
+        for col_idx, value in enumerate(row_data, 2):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            apply_data_style(cell, is_number=col_idx > 2)
+            if row.Stage == "Total":
+                cell.font = Font(bold=True, size=9)
+            if col_idx in [3, 4]:
+                cell.number_format = '#,##0'
+            elif col_idx > 4:
+                cell.number_format = '#,##0.0' if col_idx < 8 else '0.00'
+
+    # Facilities without a rating have no PD, so no expected loss above
+    unrated = stages.loc[stages["Stage"] == "Total", "Unrated"].iloc[0]
+    ws['B11'] = f"Unrated facilities (no PD, no expected loss counted): {unrated:,}"
+    ws['B11'].font = Font(italic=True, size=9, color="c53030" if unrated else "a0aec0")
+
+    ws.merge_cells('B13:G13')
+    ws['B13'] = "ECL by Segment (M PLN)"
+    apply_header_style(ws['B13'])
+    segment_headers = ["Segment"] + [f"Stage {stage}" for stage in STAGES] + ["Total", "Coverage %"]
+    for col, header in enumerate(segment_headers, 2):
+        apply_header_style(ws.cell(row=14, column=col, value=header), "header_mid")
+
+    ecl = ifrs9.pivot(index="Segment", columns="Stage", values="ECL").reindex(SEGMENTS)
+    ead = ifrs9.groupby("Segment")["EAD"].sum().reindex(SEGMENTS)
+    for row_idx, segment in enumerate(SEGMENTS, 15):
+        total = ecl.loc[segment].sum()
+        coverage = total / ead[segment] * 100 if ead[segment] else 0.0
+        row_data = [segment, *ecl.loc[segment, STAGES], total, coverage]
+        for col_idx, value in enumerate(row_data, 2):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            apply_data_style(cell, is_number=col_idx > 2)
+            if col_idx > 2:
+                cell.number_format = '#,##0.0' if col_idx < 7 else '0.00'
+
+    ws.column_dimensions['B'].width = 18
+    for col in range(3, 9):
+        ws.column_dimensions[get_column_letter(col)].width = 13
+
+
+def create_concentration_sheet(ws, concentration_risk, names):
+    """Fill the Concentration Risk sheet from the period's Concentration:
+    summary, largest names and sectors. names maps customer_id to name."""
+    ws['B3'] = "Source: Period snapshot - exposure by customer and sector"
+    total = concentration_risk.total()
+    top_names = concentration_risk.top_names()
+    sectors = concentration_risk.sectors()
+    indicators = concentration_risk.indicators()
+
+    ws.merge_cells('B5:C5')
+    ws['B5'] = "Concentration Summary"
+    apply_header_style(ws['B5'])
+    for col, header in enumerate(["Metric", "Value"], 2):
+        apply_header_style(ws.cell(row=6, column=col, value=header), "header_mid")
+    summary_data = [
+        ["Name HHI (pts)", concentration_risk.name_hhi(), '#,##0.0'],
+        ["Sector HHI (pts)", concentration_risk.sector_hhi(), '#,##0.0'],
+        ["Largest Name (%)", indicators["Single Name Conc."], '0.00'],
+        [f"Top {len(top_names)} Names (%)", top_names["Exposure"].sum() / total * 100, '0.00'],
+        ["Largest Sector (%)", indicators["Sector Concentration"], '0.00'],
+        ["Names", int(concentration_risk.names.sum()), '#,##0'],
+    ]
+    for row_idx, (metric, value, number_format) in enumerate(summary_data, 7):
+        apply_data_style(ws.cell(row=row_idx, column=2, value=metric))
+        cell = ws.cell(row=row_idx, column=3, value=value)
+        apply_data_style(cell, is_number=True)
+        cell.number_format = number_format
+
+    ws.merge_cells(start_row=15, start_column=2, end_row=15, end_column=6)
+    ws['B15'] = f"Top {len(top_names)} Names"
+    apply_header_style(ws['B15'])
+    for col, header in enumerate(["Rank", "Customer", "Sector", "Exposure", "Share %"], 2):
+        apply_header_style(ws.cell(row=16, column=col, value=header), "header_mid")
+    for rank, row in enumerate(top_names.itertuples(index=False), 1):
+        row_data = [rank, names.get(row.customer_id, row.customer_id), row.Sector, row.Exposure, row.Share]
+        for col_idx, value in enumerate(row_data, 2):
+            cell = ws.cell(row=16 + rank, column=col_idx, value=value)
+            apply_data_style(cell, is_number=col_idx in [2, 5, 6])
+            if col_idx == 5:
+                cell.number_format = '#,##0.0'
+            elif col_idx == 6:
+                cell.number_format = '0.00'
+
+    ws.merge_cells('H5:M5')
+    ws['H5'] = "Sector Concentration"
+    apply_header_style(ws['H5'])
+    for col, header in enumerate(["Sector", "Exposure", "Share %", "Names", "HHI (pts)", "Top Name %"], 8):
+        apply_header_style(ws.cell(row=6, column=col, value=header), "header_mid")
+    for row_idx, row in enumerate(sectors.itertuples(index=False), 7):
+        row_data = [row.Sector, row.Exposure, row.Share, row.Names, row.HHI, row.Top_Name]
+        for col_idx, value in enumerate(row_data, 8):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            apply_data_style(cell, is_number=col_idx > 8)
+            if col_idx in [9, 12]:
+                cell.number_format = '#,##0.0'
+            elif col_idx == 11:
+                cell.number_format = '#,##0'
+            elif col_idx > 8:
+                cell.number_format = '0.00'
+
+    for col in range(2, 14):
+        ws.column_dimensions[get_column_letter(col)].width = 13
+    ws.column_dimensions['C'].width = 16
+    ws.column_dimensions['D'].width = 24
+    ws.column_dimensions['H'].width = 24
+
+
+def create_additional_sheets(wb, ifrs9, concentration_risk, names):
+    """Create additional empty sheets to show complexity; the IFRS9 Staging
+    sheet is filled from the period's ifrs9_table() and the
+    Concentration Risk sheet from its Concentration (names: customer name by
+    customer_id)."""
     sheet_names = [
         "Large Corporate",
         "SME Portfolio",
@@ -314,12 +482,25 @@ def create_additional_sheets(wb):
         ws['B3'] = "Source: Multiple SQL queries and Excel files"
         ws['B3'].font = Font(italic=True, size=9, color="a0aec0")
 
+    create_ifrs9_sheet(wb["IFRS9 Staging"], ifrs9)
+    create_concentration_sheet(wb["Concentration Risk"], concentration_risk, names)
+
 
 def main():
+    if not SOURCES_DIR.exists() or not sources_current():
+        create_demo_sources()
+    create_demo_snapshots([PERIOD, PREVIOUS_PERIOD])
+
     wb = openpyxl.Workbook()
 
-    create_main_sheet(wb)
-    create_additional_sheets(wb)
+    # Loan-level data of both periods, loaded once and shared by every table
+    facilities = snapshot_facilities(PERIOD)
+    previous_facilities = snapshot_facilities(PREVIOUS_PERIOD)
+
+    ifrs9 = ifrs9_table(facilities)
+    concentration_risk = concentration(facilities)
+    create_main_sheet(wb, loan_book(facilities), loan_book(previous_facilities), vintage_table(PERIOD, facilities), ifrs9, ifrs9_table(previous_facilities), concentration_risk)
+    create_additional_sheets(wb, ifrs9, concentration_risk, customer_names(facilities))
 
     wb.save(OUTPUT_FILE)
     print(f"Excel file generated: {OUTPUT_FILE}")
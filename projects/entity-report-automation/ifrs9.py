@@ -0,0 +1,132 @@
+"""
+IFRS 9 - staging and expected credit loss of every facility.
+
+Staging (also the stage of report_data.facility_table, so every output of
+the report stages facilities the same way):
+    - stage 3: credit-impaired, more than NPL_DPD days past due
+    - stage 2: significant increase in credit risk - downgraded by at least
+      IFRS9_SICR_NOTCHES rating bands since the previous rating, or more
+      than IFRS9_STAGE2_DPD days past due
+    - stage 1: the rest
+Expected loss is PD x LGD x EAD: the 12-month EL with the rating's one-year
+PD, the lifetime EL with the PD compounded over IFRS9_LIFETIME_YEARS, and a
+PD of 1 in stage 3. The loss allowance (ECL) is the 12-month EL in stage 1
+and the lifetime EL in stages 2 and 3. LGD is set per segment. Facilities
+without a rating have no PD and count no expected loss; they are counted
+as "Unrated" so the gap shows.
+
+The calculation runs over IFRS9_CHUNK_SIZE facilities at a time and keeps
+only sums per segment and stage, so its memory does not grow with the
+portfolio; the inputs can be memory-mapped snapshot columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_sources import RATINGS, SEGMENTS
+from loan_aggregates import category_codes
+from settings import (
+    IFRS9_CHUNK_SIZE,
+    IFRS9_LGD,
+    IFRS9_LIFETIME_YEARS,
+    IFRS9_SICR_NOTCHES,
+    IFRS9_STAGE2_DPD,
+    NPL_DPD,
+)
+
+STAGES = [1, 2, 3]
+
+# Sums kept per (segment, stage)
+MEASURES = ["Facilities", "Unrated", "EAD", "EL_12M", "EL_Lifetime", "ECL"]
+
+# Measures that count facilities
+COUNTS = ["Facilities", "Unrated"]
+
+
+def stage_of(dpd, rating, previous_rating):
+    """IFRS 9 stage (1-3) of each facility; ratings as codes into RATINGS
+    (higher is worse), -1 when unknown."""
+    downgrade = np.where(
+        (rating >= 0) & (previous_rating >= 0), rating - previous_rating, 0
+    )
+    sicr = (downgrade >= IFRS9_SICR_NOTCHES) | (dpd > IFRS9_STAGE2_DPD)
+    return np.where(dpd > NPL_DPD, 3, np.where(sicr, 2, 1)).astype(np.int8)
+
+
+def expected_loss(ead, pd_12m, lgd, stage, lifetime_years=IFRS9_LIFETIME_YEARS):
+    """12-month EL, lifetime EL and ECL of each facility."""
+    impaired = stage == 3
+    pd_12m = np.where(impaired, 1.0, pd_12m)
+    pd_lifetime = np.where(impaired, 1.0, 1 - (1 - pd_12m) ** lifetime_years)
+    loss = lgd * ead
+    el_12m = pd_12m * loss
+    el_lifetime = pd_lifetime * loss
+    return el_12m, el_lifetime, np.where(stage == 1, el_12m, el_lifetime)
+
+
+def ifrs9_sums(
+    segment, rating, previous_rating, dpd, pd_12m, ead, chunk_size=IFRS9_CHUNK_SIZE
+):
+    """Array of MEASURES summed per (segment, stage), shape
+    (segments, stages, measures); segment and ratings as codes."""
+    lgd_of = np.array([IFRS9_LGD[name] for name in SEGMENTS])
+    cells = len(SEGMENTS) * len(STAGES)
+    sums = np.zeros((len(MEASURES), cells))
+    for start in range(0, len(ead), chunk_size):
+        part = slice(start, start + chunk_size)
+        codes = np.asarray(segment[part])
+        known = codes >= 0
+        stage = stage_of(
+            np.asarray(dpd[part]),
+            np.asarray(rating[part]),
+            np.asarray(previous_rating[part]),
+        )
+        exposure = np.asarray(ead[part], dtype=float)
+        pd_part = np.asarray(pd_12m[part], dtype=float)
+        unrated = np.isnan(pd_part)
+        losses = expected_loss(
+            exposure,
+            np.where(unrated, 0.0, pd_part),
+            lgd_of[np.where(known, codes, 0)],
+            stage,
+        )
+        cell = (codes.astype(np.int64) * len(STAGES) + stage - 1)[known]
+        weights_of = (None, unrated.astype(float), exposure, *losses)
+        for row, weights in enumerate(weights_of):
+            sums[row] += np.bincount(
+                cell, None if weights is None else weights[known], minlength=cells
+            )
+    return sums.T.reshape(len(SEGMENTS), len(STAGES), len(MEASURES))
+
+
+def ifrs9_table(facilities, chunk_size=IFRS9_CHUNK_SIZE):
+    """Facilities, EAD and EL (M PLN) per segment and stage, with a
+    "Coverage" of ECL over EAD (%); from a facility-level frame (see
+    report_data.facility_table)."""
+    sums = ifrs9_sums(
+        category_codes(facilities["segment"], SEGMENTS),
+        category_codes(facilities["rating"], RATINGS),
+        category_codes(facilities["previous_rating"], RATINGS),
+        facilities["dpd"].to_numpy(),
+        facilities["pd"].to_numpy(float),
+        facilities["exposure"].to_numpy(float),
+        chunk_size,
+    )
+    table = pd.DataFrame(
+        sums.reshape(-1, len(MEASURES)),
+        columns=MEASURES,
+        index=pd.MultiIndex.from_product(
+            [SEGMENTS, STAGES], names=["Segment", "Stage"]
+        ),
+    ).reset_index()
+    table[COUNTS] = table[COUNTS].astype(np.int64)
+    return table
+
+
+def stage_summary(table):
+    """The ifrs9_table() per stage, with a "Total" row."""
+    stages = table.groupby("Stage")[MEASURES].sum()
+    stages.loc["Total"] = stages.sum()
+    stages[COUNTS] = stages[COUNTS].astype(np.int64)
+    stages["Coverage"] = (stages["ECL"] / stages["EAD"] * 100).fillna(0.0)
+    return stages.rename_axis("Stage").reset_index()
@@ -0,0 +1,132 @@
+"""
+Report Charts - the Plotly figures of the Entity Report.
+
+The same builders draw the Chart Preview tab and the report slides, so a
+chart looks the same in both. Each takes the DataFrame of one report table
+(see report_data) and returns a go.Figure. period_comparison_chart() draws
+the Period Comparison view only.
+"""
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from report_data import NPL_LIMIT
+
+
+def segment_exposure_chart(portfolio_df):
+    fig = px.bar(
+        portfolio_df,
+        x="Segment",
+        y="Exposure",
+        color="Segment",
+        title="Portfolio Exposure by Segment (M PLN)",
+        color_discrete_sequence=px.colors.qualitative.Set2,
+    )
+    fig.update_layout(showlegend=False, height=400)
+    return fig
+
+
+def rating_chart(rating_df, title="Exposure by Risk Rating"):
+    fig = px.pie(
+        rating_df,
+        values="Exposure",
+        names="Rating",
+        title=title,
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+    )
+    fig.update_traces(textposition="inside", textinfo="percent+label")
+    fig.update_layout(height=400)
+    return fig
+
+
+def exposure_trend_chart(trend_df):
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=trend_df["Month"],
+            y=trend_df["Exposure"],
+            mode="lines+markers",
+            name="Exposure",
+            line=dict(color="#3182ce", width=3),
+            marker=dict(size=8),
+        )
+    )
+    fig.update_layout(
+        title="Total Portfolio Exposure (M PLN)",
+        xaxis_title="Month",
+        yaxis_title="Exposure (M PLN)",
+        height=350,
+    )
+    return fig
+
+
+def npl_trend_chart(trend_df):
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=trend_df["Month"],
+            y=trend_df["NPL"],
+            mode="lines+markers",
+            name="NPL Ratio",
+            line=dict(color="#e53e3e", width=3),
+            marker=dict(size=8),
+            fill="tozeroy",
+            fillcolor="rgba(229, 62, 62, 0.1)",
+        )
+    )
+    fig.add_hline(
+        y=NPL_LIMIT,
+        line_dash="dash",
+        line_color="gray",
+        annotation_text=f"Threshold ({NPL_LIMIT:.1f}%)",
+    )
+    fig.update_layout(
+        title="NPL Ratio (%)",
+        xaxis_title="Month",
+        yaxis_title="NPL Ratio (%)",
+        height=350,
+    )
+    return fig
+
+
+def segment_matrix_chart(portfolio_df):
+    fig = px.scatter(
+        portfolio_df,
+        x="NPL_Rate",
+        y="Coverage",
+        size="Exposure",
+        color="Segment",
+        title="NPL Rate vs Coverage by Segment",
+        labels={"NPL_Rate": "NPL Rate (%)", "Coverage": "Coverage Ratio (%)"},
+        color_discrete_sequence=px.colors.qualitative.Set2,
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def sector_exposure_chart(sector_df):
+    fig = px.bar(
+        sector_df.sort_values("Exposure"),
+        x="Exposure",
+        y="Sector",
+        orientation="h",
+        title="Exposure by Sector (M PLN)",
+        color_discrete_sequence=["#2c5282"],
+    )
+    fig.update_layout(height=450)
+    return fig
+
+
+def period_comparison_chart(segments_by_period):
+    """Exposure by segment of two periods (a "Period" column tells them apart)."""
+    fig = px.bar(
+        segments_by_period,
+        x="Segment",
+        y="Exposure",
+        color="Period",
+        barmode="group",
+        title="Exposure by Segment (M PLN)",
+        color_discrete_sequence=["#2c5282", "#a0aec0"],
+    )
+    fig.update_layout(height=400)
+    return fig
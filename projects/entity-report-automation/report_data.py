@@ -0,0 +1,280 @@
+"""
+Report Data - loads the report sources and derives the report tables.
+
+Each load_* function reads one source into a DataFrame. facility_table()
+applies the manual adjustments and joins the sources at facility level;
+report_tables() computes from it (mostly through loan_aggregates) every
+table the slides and charts need, keyed by name:
+    - "overview", "segments", "ratings", "sectors", "stages", "kri"
+    - "segment:<name>", "segment_ratings:<name>", "top_exposures:<name>"
+    - "sector_ratings:<name>", "sector_top_exposures:<name>"
+Amounts are in M PLN. A facility is non-performing (NPL) at more than 90
+days past due; coverage is provisions on NPLs over NPL exposure.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from data_sources import RATINGS, SECTORS, SEGMENTS, SOURCES, source_path
+from ifrs9 import stage_of
+from loan_aggregates import (
+    breakdown,
+    category_codes,
+    group_sums,
+    loan_book,
+    overview,
+    rating_distribution,
+    rating_mix,
+)
+from risk_indicators import KRI_RULES, kri_table
+from settings import NPL_DPD, SOURCES_DIR
+
+NPL_LIMIT = KRI_RULES["NPL Ratio"].limit
+TOP_EXPOSURES = 10
+
+# Closed months from the month-end archive (M PLN, NPL ratio in %)
+MONTHLY_CLOSES = {
+    "Month": ["Jul 2023", "Aug 2023", "Sep 2023", "Oct 2023", "Nov 2023", "Dec 2023"],
+    "Exposure": [42890, 43120, 43567, 44230, 45120, 45892],
+    "NPL": [3.1, 3.0, 2.9, 2.9, 2.8, 2.8],
+}
+
+
+# Columns the loaders read from each SQL source
+SOURCE_COLUMNS = {
+    "SQL - Risk Database": ["customer_id", "rating", "previous_rating", "pd"],
+    "SQL - Portfolio Database": [
+        "facility_id",
+        "customer_id",
+        "segment",
+        "exposure",
+        "dpd",
+        "originated",
+        "defaulted",
+    ],
+    "SQL - Provisions DB": ["facility_id", "provision"],
+    "SQL - Customer Data": ["customer_id", "name", "sector"],
+}
+
+
+def sources_current(directory=SOURCES_DIR):
+    """Whether every SQL source exists with the columns the loaders read;
+    sources built by an older create_demo_sources lack some."""
+    for name, columns in SOURCE_COLUMNS.items():
+        source = next(source for source in SOURCES if source.name == name)
+        path = source_path(source, directory)
+        if not path.exists():
+            return False
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            present = {
+                row[1] for row in conn.execute(f"PRAGMA table_info({source.table})")
+            }
+        finally:
+            conn.close()
+        if not present.issuperset(columns):
+            return False
+    return True
+
+
+def load_source(name, columns, directory=SOURCES_DIR):
+    """Read the columns of one SQL source's table."""
+    source = next(source for source in SOURCES if source.name == name)
+    path = source_path(source, directory)
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM {source.table}", conn
+        )
+    finally:
+        conn.close()
+
+
+def load_risk(directory=SOURCES_DIR):
+    return load_source(
+        "SQL - Risk Database", SOURCE_COLUMNS["SQL - Risk Database"], directory
+    )
+
+
+def load_portfolio(directory=SOURCES_DIR):
+    exposures = load_source(
+        "SQL - Portfolio Database",
+        SOURCE_COLUMNS["SQL - Portfolio Database"],
+        directory,
+    )
+    # First default date; empty for facilities that never defaulted
+    for column in ("originated", "defaulted"):
+        exposures[column] = pd.to_datetime(exposures[column])
+    return exposures
+
+
+def load_provisions(directory=SOURCES_DIR):
+    return load_source(
+        "SQL - Provisions DB", SOURCE_COLUMNS["SQL - Provisions DB"], directory
+    )
+
+
+def load_customers(directory=SOURCES_DIR):
+    return load_source(
+        "SQL - Customer Data", SOURCE_COLUMNS["SQL - Customer Data"], directory
+    )
+
+
+def load_adjustments(directory=SOURCES_DIR):
+    """Post-close exposure adjustments per facility (PLN)."""
+    source = next(s for s in SOURCES if s.name == "Excel - Manual Adjustments")
+    adjustments = pd.read_excel(
+        source_path(source, directory),
+        sheet_name=source.table,
+        usecols=["Facility", "Adjustment (PLN)"],
+    )
+    return adjustments.rename(
+        columns={"Facility": "facility_id", "Adjustment (PLN)": "adjustment"}
+    )
+
+
+def get_trend_data():
+    """Monthly exposure and NPL ratio of the closed months."""
+    return pd.DataFrame(MONTHLY_CLOSES)
+
+
+def facility_table(exposures, customers, ratings, provisions, adjustments=None):
+    """One row per facility with its customer, rating, PD, IFRS 9 stage (see
+    ifrs9.stage_of) and provision (M PLN)."""
+    if adjustments is not None and len(adjustments):
+        exposures = exposures.copy()
+        delta = adjustments.groupby("facility_id")["adjustment"].sum()
+        exposures["exposure"] += (
+            exposures["facility_id"].map(delta).fillna(0.0).to_numpy()
+        )
+    facilities = (
+        exposures.merge(customers, on="customer_id", how="left")
+        .merge(
+            ratings[["customer_id", "rating", "previous_rating", "pd"]],
+            on="customer_id",
+            how="left",
+        )
+        .merge(provisions, on="facility_id", how="left")
+    )
+    facilities["stage"] = stage_of(
+        facilities["dpd"].to_numpy(),
+        category_codes(facilities["rating"], RATINGS),
+        category_codes(facilities["previous_rating"], RATINGS),
+    ).astype(int)
+    facilities["provision"] = facilities["provision"].fillna(0.0)
+    facilities["exposure"] = facilities["exposure"] / 1e6
+    facilities["provision"] = facilities["provision"] / 1e6
+    facilities["npl"] = facilities["dpd"] > NPL_DPD
+    return facilities
+
+
+def report_tables(exposures, customers, ratings, provisions, adjustments=None):
+    """Every table of the report, from the loaded sources."""
+    facilities = facility_table(exposures, customers, ratings, provisions, adjustments)
+    book = loan_book(facilities)
+
+    tables = {}
+    segments = _rounded(breakdown(book, "segment")).rename(
+        columns={"segment": "Segment"}
+    )
+    tables["segments"] = segments
+    tables["ratings"] = _rounded(rating_distribution(book))
+    tables["sectors"] = _rounded(breakdown(book, "sector")).rename(
+        columns={"sector": "Sector"}
+    )
+    stages = facilities.groupby("stage").agg(
+        Facilities=("facility_id", "count"),
+        Exposure=("exposure", "sum"),
+        Provisions=("provision", "sum"),
+    )
+    stages["Coverage"] = stages["Provisions"] / stages["Exposure"] * 100
+    tables["stages"] = _rounded(
+        stages.reindex([1, 2, 3], fill_value=0).rename_axis("Stage").reset_index()
+    )
+
+    totals = overview(book)
+    npl_ratio = totals["npl_ratio"]
+    coverage = totals["coverage"]
+    tables["overview"] = pd.DataFrame(
+        {
+            "Metric": [
+                "Total Exposure (M PLN)",
+                "NPL Exposure (M PLN)",
+                "NPL Ratio (%)",
+                "Coverage Ratio (%)",
+                "Provisions (M PLN)",
+                "Customers",
+                "Facilities",
+            ],
+            "Value": [
+                round(totals["exposure"]),
+                round(totals["npl_exposure"]),
+                round(npl_ratio, 1),
+                round(coverage, 1),
+                round(totals["provisions"]),
+                totals["customers"],
+                totals["facilities"],
+            ],
+        }
+    )
+
+    tables["kri"] = kri_table({"NPL Ratio": npl_ratio, "Coverage Ratio": coverage})
+
+    # Per segment and sector tables, for those that have facilities
+    segment_mix = rating_mix(book, "segment")
+    segment_facilities = group_sums(book.segment, len(SEGMENTS))
+    for code, segment in enumerate(SEGMENTS):
+        if not segment_facilities[code]:
+            continue
+        group = facilities[book.segment == code]
+        tables[f"segment:{segment}"] = segments[segments["Segment"] == segment]
+        tables[f"segment_ratings:{segment}"] = _rating_mix(segment_mix[code])
+        tables[f"top_exposures:{segment}"] = _top_exposures(group)
+    sector_mix = rating_mix(book, "sector")
+    sector_facilities = group_sums(book.sector, len(SECTORS))
+    for code, sector in enumerate(SECTORS):
+        if not sector_facilities[code]:
+            continue
+        group = facilities[book.sector == code]
+        tables[f"sector_ratings:{sector}"] = _rating_mix(sector_mix[code])
+        tables[f"sector_top_exposures:{sector}"] = _top_exposures(group)
+    return tables
+
+
+def _rating_mix(mix):
+    """Rating mix table of one row of loan_aggregates.rating_mix()."""
+    return _rounded(
+        pd.DataFrame(
+            {
+                "Rating": RATINGS,
+                "Exposure": mix,
+                "Percentage": mix / mix.sum() * 100,
+            }
+        )
+    )
+
+
+def _top_exposures(facilities):
+    by_customer = (
+        facilities.groupby(["customer_id", "name", "rating"])["exposure"]
+        .sum()
+        .nlargest(TOP_EXPOSURES)
+        .reset_index()
+    )
+    return _rounded(
+        by_customer.rename(
+            columns={
+                "customer_id": "Customer ID",
+                "name": "Customer",
+                "rating": "Rating",
+                "exposure": "Exposure",
+            }
+        )
+    )
+
+
+def _rounded(df):
+    return df.round(
+        {"Exposure": 1, "Provisions": 1, "NPL_Rate": 1, "Coverage": 1, "Percentage": 1}
+    )
@@ -0,0 +1,325 @@
+"""
+Report Generation - the Entity Report as a pipeline of stages.
+
+The report is built from the period's snapshot (see snapshot_store), the
+same data the preview and the period comparison show.
+
+Stages and what they wait for:
+    - connect: probe every source for the data sources table; fails if a
+      required one is unavailable
+    - load_snapshot: nothing; memory-maps the period's snapshot
+    - trend_charts: load_snapshot, so the trend charts render while the
+      sources are probed
+    - risk_metrics: connect and load_snapshot
+    - plan_rebuild: risk_metrics, trend_charts; compares the fingerprint of
+      every slide with the last build (see slide_manifest)
+    - portfolio_charts: plan_rebuild; only charts of changed slides
+    - build_slides: plan_rebuild, portfolio_charts, trend_charts; renders
+      changed slides and reuses the others
+    - merge_sharepoint: connect
+    - finalize: build_slides, merge_sharepoint
+Charts are exported through a ChartExporter (see chart_export), which only
+renders the ones not already in its cache.
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+from chart_export import HTML, PNG, ChartExporter
+from data_sources import SOURCES, source_path
+from report_charts import (
+    exposure_trend_chart,
+    npl_trend_chart,
+    rating_chart,
+    sector_exposure_chart,
+    segment_exposure_chart,
+    segment_matrix_chart,
+)
+from report_data import report_tables
+from report_pipeline import Pipeline, Stage
+from report_slides import (
+    TEMPLATE_VERSION,
+    ReportPackage,
+    plan_slides,
+    render_deck,
+    render_slide,
+    write_package,
+)
+from settings import BUILDS_DIR, REPORTS_DIR, SNAPSHOTS_DIR, SOURCES_DIR
+from slide_manifest import SlideManifest, slide_fingerprint, table_hash
+from snapshot_store import load_snapshot
+from source_probes import UNAVAILABLE, make_probes, run_probes
+
+TREND_CHARTS = {"exposure_trend", "npl_trend"}
+
+# Table each chart is drawn from; a segment or sector rating mix chart has
+# the name of its table
+CHART_TABLES = {
+    "segment_exposure": "segments",
+    "ratings": "ratings",
+    "segment_matrix": "segments",
+    "sectors": "sectors",
+    "exposure_trend": "trend",
+    "npl_trend": "trend",
+}
+
+# Result of build_slides: bodies by slide_id, chart files the deck uses,
+# slides rendered and reused, charts exported in this run
+SlideBuild = namedtuple(
+    "SlideBuild", ["bodies", "charts", "rebuilt", "reused", "images"]
+)
+
+# Sources the report cannot be built without; the data of the tables and
+# charts comes from the period's snapshot
+REQUIRED_SOURCES = {"SharePoint - Pre-built Slides"}
+
+
+def chart_table(chart):
+    return CHART_TABLES.get(chart, chart)
+
+
+def report_file_name(period):
+    return f"Entity_Report_{period.replace(' ', '_')}.zip"
+
+
+def chart_html(image):
+    """How an exported chart appears in the deck."""
+    if image.format == PNG:
+        return f'<img src="charts/{image.path.name}" width="100%">'
+    return image.path.read_text()
+
+
+def build_report_pipeline(
+    period,
+    report_type,
+    options,
+    directory=SOURCES_DIR,
+    output_dir=REPORTS_DIR,
+    exporter=None,
+    builds_dir=BUILDS_DIR,
+    snapshots_dir=SNAPSHOTS_DIR,
+):
+    """Pipeline producing the report package of one period and report type."""
+    slides = plan_slides(report_type, options.include_appendix)
+    exporter = exporter or ChartExporter()
+    manifest = SlideManifest(period, report_type, builds_dir)
+
+    def chart_exists(name):
+        return (exporter.cache_dir / name).exists()
+
+    def connect(inputs):
+        # In source order, not completion order, so the table is stable
+        results = sorted(
+            run_probes(make_probes(directory=directory)),
+            key=lambda result: SOURCES.index(result.source),
+        )
+        missing = [
+            result.source.name
+            for result in results
+            if result.status == UNAVAILABLE and result.source.name in REQUIRED_SOURCES
+        ]
+        if missing:
+            raise RuntimeError(f"Unavailable: {', '.join(sorted(missing))}")
+        return pd.DataFrame(
+            {
+                "Source": [result.source.name for result in results],
+                "Status": [result.status for result in results],
+                "Last Updated": [
+                    (
+                        result.last_updated.strftime("%Y-%m-%d %H:%M")
+                        if result.last_updated
+                        else "-"
+                    )
+                    for result in results
+                ],
+                "Records": [result.records for result in results],
+            }
+        )
+
+    def risk_metrics(inputs):
+        snapshot = inputs["load_snapshot"]
+        tables = report_tables(
+            snapshot["exposures"],
+            snapshot["customers"],
+            snapshot["ratings"],
+            snapshot["provisions"],
+            snapshot["adjustments"],
+        )
+        tables["sources"] = inputs["connect"]
+        return tables
+
+    def trend_charts(inputs):
+        trend_df = inputs["load_snapshot"]["trend"]
+        if not options.include_charts:
+            return {}, trend_df
+        figures = {
+            "exposure_trend": exposure_trend_chart(trend_df),
+            "npl_trend": npl_trend_chart(trend_df),
+        }
+        return exporter.export(figures), trend_df
+
+    def plan_rebuild(inputs):
+        _, trend_df = inputs["trend_charts"]
+        tables = {**inputs["risk_metrics"], "trend": trend_df}
+        hashes = {name: table_hash(df) for name, df in tables.items()}
+        fingerprints = {
+            slide.slide_id: slide_fingerprint(
+                slide, hashes, chart_table(slide.chart), options, TEMPLATE_VERSION
+            )
+            for slide in slides
+            if not slide.prebuilt
+        }
+        stale = {
+            slide_id
+            for slide_id, fingerprint in fingerprints.items()
+            if not manifest.is_current(slide_id, fingerprint, chart_exists)
+        }
+        return tables, fingerprints, stale
+
+    def portfolio_charts(inputs):
+        if not options.include_charts:
+            return {}
+        tables, _, stale = inputs["plan_rebuild"]
+        builders = {
+            "segment_exposure": lambda: segment_exposure_chart(tables["segments"]),
+            "ratings": lambda: rating_chart(tables["ratings"]),
+            "segment_matrix": lambda: segment_matrix_chart(tables["segments"]),
+            "sectors": lambda: sector_exposure_chart(tables["sectors"]),
+        }
+        figures = {}
+        for slide in slides:
+            # Charts of slides that are reused are not even built
+            if slide.chart is None or slide.chart in TREND_CHARTS:
+                continue
+            if slide.slide_id not in stale:
+                continue
+            if slide.chart in builders:
+                figures[slide.chart] = builders[slide.chart]()
+            else:
+                # Rating mix of one segment or sector
+                figures[slide.chart] = rating_chart(
+                    tables[slide.chart], title=slide.title
+                )
+        return exporter.export(figures)
+
+    def build_slides(inputs):
+        tables, fingerprints, stale = inputs["plan_rebuild"]
+        trend_images, _ = inputs["trend_charts"]
+        images = {**trend_images, **inputs["portfolio_charts"]}
+        charts = {name: chart_html(image) for name, image in images.items()}
+        rebuilt = {}
+        chart_files = {}
+        bodies = {}
+        for slide in slides:
+            if slide.prebuilt:
+                continue
+            if slide.slide_id in stale:
+                body = render_slide(slide, charts, tables, options)
+                rebuilt[slide.slide_id] = body
+                chart_files[slide.slide_id] = (
+                    images[slide.chart].path.name
+                    if slide.chart and options.include_charts
+                    else None
+                )
+            else:
+                body = manifest.body(slide.slide_id)
+            bodies[slide.slide_id] = body
+        manifest.save(fingerprints, rebuilt, chart_files)
+        return SlideBuild(
+            bodies=bodies,
+            charts=[
+                exporter.cache_dir / name
+                for name in {manifest.chart_of(slide_id) for slide_id in bodies}
+                if name
+            ],
+            rebuilt=len(rebuilt),
+            reused=len(bodies) - len(rebuilt),
+            images=list(images.values()),
+        )
+
+    def merge_sharepoint(inputs):
+        library = source_path(
+            next(source for source in SOURCES if source.kind == "SharePoint"),
+            directory,
+        )
+        files = []
+        for slide in slides:
+            if slide.prebuilt:
+                path = library / slide.prebuilt
+                if not path.exists():
+                    raise FileNotFoundError(f"{slide.prebuilt} not in the library")
+                files.append(path)
+        return files
+
+    def finalize(inputs):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / report_file_name(period)
+        build = inputs["build_slides"]
+        deck = render_deck(
+            f"Entity Report - {period} - {report_type}",
+            slides,
+            build.bodies,
+            plotlyjs=options.include_charts and exporter.format == HTML,
+        )
+        size = write_package(
+            path,
+            deck,
+            inputs["merge_sharepoint"],
+            build.charts if exporter.format == PNG else [],
+        )
+        return ReportPackage(path, len(slides), size)
+
+    return Pipeline(
+        [
+            Stage("connect", "Connecting to data sources", [], connect),
+            Stage(
+                "load_snapshot",
+                f"Loading the {period} snapshot",
+                [],
+                lambda inputs: load_snapshot(period, snapshots_dir),
+            ),
+            Stage(
+                "trend_charts",
+                "Rendering trend charts",
+                ["load_snapshot"],
+                trend_charts,
+            ),
+            Stage(
+                "risk_metrics",
+                "Processing risk metrics",
+                ["connect", "load_snapshot"],
+                risk_metrics,
+            ),
+            Stage(
+                "plan_rebuild",
+                "Checking slides for changes",
+                ["risk_metrics", "trend_charts"],
+                plan_rebuild,
+            ),
+            Stage(
+                "portfolio_charts",
+                "Rendering portfolio charts",
+                ["plan_rebuild"],
+                portfolio_charts,
+            ),
+            Stage(
+                "build_slides",
+                "Building slides",
+                ["plan_rebuild", "portfolio_charts", "trend_charts"],
+                build_slides,
+            ),
+            Stage(
+                "merge_sharepoint",
+                "Merging SharePoint content",
+                ["connect"],
+                merge_sharepoint,
+            ),
+            Stage(
+                "finalize",
+                "Finalizing report",
+                ["build_slides", "merge_sharepoint"],
+                finalize,
+            ),
+        ]
+    )
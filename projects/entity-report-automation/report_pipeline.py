@@ -0,0 +1,117 @@
+"""
+Report Pipeline - runs report generation stages as a dependency graph.
+
+A stage declares the stages it needs; it starts as soon as all of them have
+finished, on a small thread pool, so independent stages (loading separate
+sources, rendering charts) run side by side instead of one after another.
+A stage function receives a dict with the results of its dependencies and
+returns its own result.
+
+Progress is reported from the calling thread: progress(stage, state) is
+called when a stage starts and when it finishes, which lets a Streamlit
+page update its widgets directly. Per-stage start and end times are kept
+on the run for the timing breakdown.
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from settings import PIPELINE_WORKERS
+
+RUNNING, DONE = "running", "done"
+
+Stage = namedtuple("Stage", ["name", "label", "deps", "func"])
+
+# Seconds since the start of the run
+StageTiming = namedtuple("StageTiming", ["stage", "started", "finished"])
+
+
+class StageFailed(Exception):
+    """A stage raised; the run was stopped."""
+
+    def __init__(self, stage, error):
+        super().__init__(f"{stage.label} failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Pipeline:
+    def __init__(self, stages, workers=PIPELINE_WORKERS):
+        self.stages = {stage.name: stage for stage in stages}
+        self.workers = workers
+        self._check_graph()
+
+    def __len__(self):
+        return len(self.stages)
+
+    def run(self, progress=None):
+        """Run every stage; return (results, timings) keyed by stage name."""
+        results = {}
+        timings = {}
+        waiting = dict(self.stages)
+        running = {}
+        started = time.perf_counter()
+
+        def notify(stage, state):
+            if progress is not None:
+                progress(stage, state)
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="report-stage"
+        ) as executor:
+            while waiting or running:
+                for stage in [
+                    stage
+                    for stage in waiting.values()
+                    if all(dep in results for dep in stage.deps)
+                ]:
+                    del waiting[stage.name]
+                    inputs = {dep: results[dep] for dep in stage.deps}
+                    running[executor.submit(self._call, stage, inputs)] = stage
+                    timings[stage.name] = StageTiming(
+                        stage, time.perf_counter() - started, None
+                    )
+                    notify(stage, RUNNING)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    timings[stage.name] = timings[stage.name]._replace(
+                        finished=time.perf_counter() - started
+                    )
+                    try:
+                        results[stage.name] = future.result()
+                    except Exception as e:
+                        for pending in running:
+                            pending.cancel()
+                        raise StageFailed(stage, e) from e
+                    notify(stage, DONE)
+        return results, timings
+
+    @staticmethod
+    def _call(stage, inputs):
+        return stage.func(inputs)
+
+    def _check_graph(self):
+        """Reject unknown dependencies and cycles before anything runs."""
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"{stage.name} depends on unknown stage {dep}")
+
+        resolved = set()
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [
+                name
+                for name, stage in remaining.items()
+                if all(dep in resolved for dep in stage.deps)
+            ]
+            if not ready:
+                raise ValueError(
+                    f"Dependency cycle between: {', '.join(sorted(remaining))}"
+                )
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
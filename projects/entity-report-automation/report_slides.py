@@ -0,0 +1,309 @@
+"""
+Report Slides - slide plan, slide rendering and the report package.
+
+plan_slides() lists the slides of a report type in order. A slide shows a
+chart and/or a table (by name, see report_data and report_generation), a
+block of text, or is one of the pre-built slides from the SharePoint
+library, which are copied into the package as they are.
+
+The deck is a single HTML file with one section per slide (python-pptx is
+not part of the environment); write_package() zips it together with the
+pre-built .pptx slides and the chart images.
+"""
+
+import html
+import os
+import zipfile
+from collections import namedtuple
+
+import plotly.offline
+
+from data_sources import SECTORS, SEGMENTS
+
+# Bump when render_slide() output changes, so every slide is rebuilt
+TEMPLATE_VERSION = 1
+
+ReportOptions = namedtuple(
+    "ReportOptions", ["include_charts", "include_tables", "include_appendix"]
+)
+
+Slide = namedtuple(
+    "Slide",
+    ["slide_id", "title", "section", "chart", "table", "text", "prebuilt"],
+    defaults=(None, None, None, None),
+)
+
+ReportPackage = namedtuple("ReportPackage", ["path", "slides", "size"])
+
+TEXT = {
+    "calculation_notes": (
+        "Exposure is the on-balance amount at month-end in M PLN. A facility is "
+        "non-performing above 90 days past due. Coverage is the provisions held "
+        "against non-performing facilities over their exposure."
+    ),
+    "methodology": (
+        "Ratings are the latest internal grades from the Risk Database, grouped "
+        "into five bands. Stages and provisions come from the Provisions DB as "
+        "of the reporting date."
+    ),
+    "glossary": (
+        "NPL - non-performing loan. EAD - exposure at default. PD - probability "
+        "of default. LGD - loss given default. KRI - key risk indicator."
+    ),
+    "version_history": (
+        "v3.2 - generated from the source systems. v3.1 - manual Excel process."
+    ),
+}
+
+
+def prebuilt(name, title):
+    return Slide(name, title, "SharePoint", prebuilt=f"{name}.pptx")
+
+
+def executive_summary_slides():
+    return [
+        Slide("overview", "Portfolio Overview", "Executive Summary", table="overview"),
+        Slide(
+            "segment_exposure",
+            "Exposure by Segment",
+            "Executive Summary",
+            chart="segment_exposure",
+            table="segments",
+        ),
+        Slide(
+            "ratings",
+            "Rating Distribution",
+            "Executive Summary",
+            chart="ratings",
+            table="ratings",
+        ),
+        Slide(
+            "exposure_trend",
+            "Monthly Exposure Trend",
+            "Executive Summary",
+            chart="exposure_trend",
+            table="trend",
+        ),
+        Slide(
+            "npl_trend",
+            "NPL Ratio Trend",
+            "Executive Summary",
+            chart="npl_trend",
+            table="trend",
+        ),
+        Slide(
+            "segment_matrix",
+            "Segment Performance Matrix",
+            "Executive Summary",
+            chart="segment_matrix",
+            table="segments",
+        ),
+        Slide("kri", "Key Risk Indicators", "Executive Summary", table="kri"),
+    ]
+
+
+def segment_slides(segment, overview_only=False):
+    slides = [
+        Slide(
+            f"segment:{segment}",
+            f"{segment} - Overview",
+            "Segments",
+            table=f"segment:{segment}",
+        )
+    ]
+    if not overview_only:
+        slides += [
+            Slide(
+                f"segment_ratings:{segment}",
+                f"{segment} - Rating Mix",
+                "Segments",
+                chart=f"segment_ratings:{segment}",
+                table=f"segment_ratings:{segment}",
+            ),
+            Slide(
+                f"top_exposures:{segment}",
+                f"{segment} - Top Exposures",
+                "Segments",
+                table=f"top_exposures:{segment}",
+            ),
+        ]
+    return slides
+
+
+def sector_slides(ratings_only=False):
+    slides = [
+        Slide(
+            "sectors", "Exposure by Sector", "Sectors", chart="sectors", table="sectors"
+        )
+    ]
+    for sector in SECTORS:
+        slides.append(
+            Slide(
+                f"sector_ratings:{sector}",
+                f"{sector} - Rating Mix",
+                "Sectors",
+                chart=f"sector_ratings:{sector}",
+                table=f"sector_ratings:{sector}",
+            )
+        )
+        if not ratings_only:
+            slides.append(
+                Slide(
+                    f"sector_top_exposures:{sector}",
+                    f"{sector} - Top Exposures",
+                    "Sectors",
+                    table=f"sector_top_exposures:{sector}",
+                )
+            )
+    return slides
+
+
+def appendix_slides():
+    return [
+        Slide("stages", "Provisions by Stage", "Appendix", table="stages"),
+        Slide("sector_npl", "NPL and Coverage by Sector", "Appendix", table="sectors"),
+        Slide("sources", "Data Sources", "Appendix", table="sources"),
+        Slide(
+            "calculation_notes",
+            "Calculation Notes",
+            "Appendix",
+            text=TEXT["calculation_notes"],
+        ),
+        Slide("methodology", "Methodology", "Appendix", text=TEXT["methodology"]),
+        Slide("glossary", "Glossary", "Appendix", text=TEXT["glossary"]),
+        Slide(
+            "version_history",
+            "Version History",
+            "Appendix",
+            text=TEXT["version_history"],
+        ),
+    ]
+
+
+def plan_slides(report_type, include_appendix=True):
+    """The slides of a report type, in order."""
+    appendix = appendix_slides() if include_appendix else []
+    if report_type == "Executive Summary":
+        return (
+            [prebuilt("01_cover", "Cover"), prebuilt("02_agenda", "Agenda")]
+            + executive_summary_slides()
+            + [s for segment in SEGMENTS for s in segment_slides(segment, True)]
+            + [prebuilt("12_contacts", "Contacts")]
+        )
+    if report_type == "Risk Appendix":
+        summary = {slide.slide_id: slide for slide in executive_summary_slides()}
+        return (
+            [prebuilt("01_cover", "Cover")]
+            + [summary["kri"], summary["segment_matrix"], summary["npl_trend"]]
+            + sector_slides(ratings_only=True)
+            + appendix
+            + [prebuilt("11_disclaimer", "Disclaimer")]
+        )
+    return (
+        [prebuilt("01_cover", "Cover"), prebuilt("02_agenda", "Agenda")]
+        + executive_summary_slides()
+        + [
+            prebuilt("03_macro_outlook", "Macro Outlook"),
+            prebuilt("04_strategy_update", "Strategy Update"),
+            prebuilt("05_regulatory_changes", "Regulatory Changes"),
+            prebuilt("06_capital_position", "Capital Position"),
+            prebuilt("07_liquidity", "Liquidity"),
+            prebuilt("08_funding_plan", "Funding Plan"),
+            prebuilt("09_peer_comparison", "Peer Comparison"),
+            prebuilt("10_rating_agency_view", "Rating Agency View"),
+        ]
+        + [s for segment in SEGMENTS for s in segment_slides(segment)]
+        + sector_slides()
+        + appendix
+        + [
+            prebuilt("11_disclaimer", "Disclaimer"),
+            prebuilt("12_contacts", "Contacts"),
+        ]
+    )
+
+
+def render_slide(slide, charts, tables, options):
+    """HTML body of one content slide."""
+    parts = []
+    if slide.text:
+        parts.append(f"<p>{html.escape(slide.text)}</p>")
+    if slide.chart and options.include_charts:
+        parts.append(f'<div class="chart">{charts[slide.chart]}</div>')
+    if slide.table and (options.include_tables or not slide.chart):
+        # A slide that is only a table keeps it even without data tables
+        parts.append(
+            tables[slide.table].to_html(
+                index=False, classes="data", float_format="{:,.1f}".format
+            )
+        )
+    if not parts:
+        parts.append('<p class="note">Chart omitted (charts disabled).</p>')
+    return "\n".join(parts)
+
+
+def render_deck(title, slides, bodies, plotlyjs=True):
+    """The full HTML deck; bodies maps slide_id to the rendered body.
+
+    plotly.js is embedded only when interactive charts are in the deck.
+    """
+    sections = []
+    for number, slide in enumerate(slides, 1):
+        if slide.prebuilt:
+            body = (
+                f'<p class="note">Pre-built slide <b>{html.escape(slide.prebuilt)}'
+                "</b> from the SharePoint library (prebuilt/ in this package).</p>"
+            )
+        else:
+            body = bodies[slide.slide_id]
+        sections.append(
+            f'<section class="slide"><div class="section">{html.escape(slide.section)}'
+            f"</div><h2>{html.escape(slide.title)}</h2>{body}"
+            f'<div class="number">{number}</div></section>'
+        )
+    return DECK_TEMPLATE.format(
+        title=html.escape(title),
+        plotly=(
+            f"<script>{plotly.offline.get_plotlyjs()}</script>" if plotlyjs else ""
+        ),
+        slides="\n".join(sections),
+    )
+
+
+def write_package(path, deck, prebuilt_files, chart_files=()):
+    """Zip the deck, the pre-built slides and chart images; return the size."""
+    tmp_path = f"{path}.partial"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("report.html", deck)
+        for prebuilt_file in prebuilt_files:
+            package.write(prebuilt_file, f"prebuilt/{os.path.basename(prebuilt_file)}")
+        for chart_file in chart_files:
+            package.write(chart_file, f"charts/{os.path.basename(chart_file)}")
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+DECK_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{plotly}
+<style>
+    body {{ font-family: Arial, sans-serif; background: #edf2f7; margin: 0; }}
+    .slide {{ background: #ffffff; width: 1100px; min-height: 620px;
+        margin: 24px auto; padding: 32px 48px; position: relative;
+        box-shadow: 0 2px 6px rgba(0, 0, 0, 0.15); page-break-after: always; }}
+    .section {{ color: #3182ce; font-size: 12px; text-transform: uppercase; }}
+    h2 {{ color: #1a365d; margin-top: 4px; }}
+    .number {{ position: absolute; right: 24px; bottom: 16px; color: #a0aec0; }}
+    .note {{ color: #718096; font-style: italic; }}
+    table.data {{ border-collapse: collapse; font-size: 13px; margin-top: 12px; }}
+    table.data th {{ background: #2c5282; color: #ffffff; padding: 4px 10px; }}
+    table.data td {{ border: 1px solid #a0aec0; padding: 4px 10px; }}
+</style>
+</head>
+<body>
+{slides}
+</body>
+</html>
+"""
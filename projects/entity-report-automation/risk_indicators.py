@@ -0,0 +1,99 @@
+"""
+Risk Indicators - key risk indicator (KRI) limits and their evaluation.
+
+Limits are written the way the report shows them ("< 4.0%": breached at
+4.0% or more, "> 60.0%": breached at 60.0% or less) in KRI_THRESHOLDS and
+parsed once into Rules. evaluate() rates any number of values at once -
+every indicator of every entity and period in one set of array operations:
+    - BREACH: the limit is crossed
+    - WARN: within the warning margin of the limit (a share of the limit)
+    - OK: otherwise; N/A for a missing value
+STATUS_HIGHLIGHT maps a status to the highlight of the Excel report and the
+control panel, so both colour the same result the same way.
+"""
+
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from settings import KRI_THRESHOLDS, KRI_WARNING_MARGIN
+
+OK, WARN, BREACH, NO_DATA = "OK", "WARN", "BREACH", "N/A"
+
+STATUS_HIGHLIGHT = {OK: "green", WARN: "yellow", BREACH: "red"}
+
+# operator: "<" or "<=" (upper limit), ">" or ">=" (lower limit)
+Rule = namedtuple("Rule", ["indicator", "operator", "limit", "unit"])
+
+THRESHOLD_PATTERN = re.compile(r"^\s*(<=|>=|<|>)\s*(-?\d+(?:\.\d+)?)\s*(%?)\s*$")
+
+
+def parse_threshold(indicator, threshold):
+    """Rule of a threshold such as "< 4.0%"."""
+    match = THRESHOLD_PATTERN.match(threshold)
+    if match is None:
+        raise ValueError(f"{indicator}: cannot parse threshold {threshold!r}")
+    operator, limit, unit = match.groups()
+    return Rule(indicator, operator, float(limit), unit)
+
+
+def parse_rules(thresholds):
+    return {
+        indicator: parse_threshold(indicator, threshold)
+        for indicator, threshold in thresholds.items()
+    }
+
+
+KRI_RULES = parse_rules(KRI_THRESHOLDS)
+
+
+def threshold_text(rule):
+    return f"{rule.operator} {rule.limit:.1f}{rule.unit}"
+
+
+def evaluate(indicators, values, rules=KRI_RULES, margin=KRI_WARNING_MARGIN):
+    """Status of each value of the indicator at the same position.
+
+    indicators and values are array-likes of the same shape; returns an
+    array of statuses of that shape.
+    """
+    indicators = np.asarray(indicators)
+    values = np.asarray(values, dtype=float)
+    names = pd.Index(list(rules))
+    index = names.get_indexer(indicators.ravel())
+    if (index < 0).any():
+        unknown = sorted(set(indicators.ravel()[index < 0]))
+        raise ValueError(f"No threshold for {', '.join(map(str, unknown))}")
+    index = index.reshape(indicators.shape)
+
+    ordered = [rules[name] for name in names]
+    limit = np.array([rule.limit for rule in ordered])[index]
+    # +1 for upper limits, -1 for lower ones: headroom > 0 inside the limit
+    direction = np.array([1.0 if rule.operator[0] == "<" else -1.0 for rule in ordered])
+    strict = np.array([len(rule.operator) == 1 for rule in ordered])[index]
+    headroom = direction[index] * (limit - values)
+
+    breach = np.where(strict, headroom <= 0, headroom < 0)
+    warn = headroom < margin * np.abs(limit)
+    return np.select(
+        [np.isnan(values), breach, warn], [NO_DATA, BREACH, WARN], default=OK
+    )
+
+
+def kri_table(values, rules=KRI_RULES, margin=KRI_WARNING_MARGIN):
+    """Indicator, Threshold, Actual and Status of {indicator: value}."""
+    indicators = list(values)
+    actual = np.array([values[indicator] for indicator in indicators], dtype=float)
+    return pd.DataFrame(
+        {
+            "Indicator": indicators,
+            "Threshold": [threshold_text(rules[name]) for name in indicators],
+            "Actual": [
+                f"{value:.1f}{rules[name].unit}" if not np.isnan(value) else "-"
+                for name, value in zip(indicators, actual)
+            ],
+            "Status": evaluate(indicators, actual, rules, margin),
+        }
+    )
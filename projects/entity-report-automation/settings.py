@@ -0,0 +1,66 @@
+"""
+Shared settings for the Entity Report control panel and its batch scripts.
+"""
+
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+DATA_DIR = APP_DIR / "data"
+
+# Report data sources (local stand-ins for the SQL servers, the Excel files
+# on the team share and the SharePoint slide library)
+SOURCES_DIR = DATA_DIR / "sources"
+
+# Data Validation probes (seconds before a source counts as unavailable)
+SOURCE_PROBE_TIMEOUT = 5.0
+
+# Report generation (stages run at once, generated report packages, slide
+# manifests and rendered slides of the last build of each report)
+PIPELINE_WORKERS = 4
+REPORTS_DIR = DATA_DIR / "reports"
+BUILDS_DIR = DATA_DIR / "builds"
+
+# Report inputs of each closed period (see snapshot_store)
+SNAPSHOTS_DIR = DATA_DIR / "snapshots"
+
+# Chart images for the report (render processes, seconds an unused image is
+# kept in the cache)
+CHART_CACHE_DIR = DATA_DIR / "chart_cache"
+CHART_EXPORT_WORKERS = 4
+CHART_CACHE_RETENTION = 30 * 24 * 60 * 60
+
+# Key risk indicator limits as the report shows them ("< 4.0%": breached at
+# 4.0% or more) and the share of a limit within which a KRI is a warning
+KRI_THRESHOLDS = {
+    "NPL Ratio": "< 4.0%",
+    "Coverage Ratio": "> 60.0%",
+    "LTV > 100%": "< 5.0%",
+    "Single Name Conc.": "< 3.0%",
+    "Sector Concentration": "< 15.0%",
+    "FX Exposure": "< 25.0%",
+    "Covenant Breaches": "< 2.0%",
+}
+KRI_WARNING_MARGIN = 0.1
+
+# Days past due after which a facility is non-performing (NPL) and, under
+# IFRS 9, credit-impaired (stage 3)
+NPL_DPD = 90
+
+# IFRS 9 staging and expected loss (see ifrs9): rating bands of downgrade
+# and days past due that move a facility to stage 2, loss given default per
+# segment, years of the lifetime PD and facilities per chunk of the
+# calculation
+IFRS9_SICR_NOTCHES = 1
+IFRS9_STAGE2_DPD = 30
+IFRS9_LGD = {
+    "Large Corporate": 0.40,
+    "SME": 0.45,
+    "Micro Enterprise": 0.55,
+    "Specialized": 0.35,
+    "Project Finance": 0.30,
+}
+IFRS9_LIFETIME_YEARS = 5
+IFRS9_CHUNK_SIZE = 1_000_000
+
+# Largest names kept per sector and listed in the report (see concentration)
+CONCENTRATION_TOP_N = 20
@@ -0,0 +1,141 @@
+"""
+Slide Manifest - incremental slide builds.
+
+Every slide has a fingerprint of its inputs:
+    - the slide definition (title, chart, table, text)
+    - a hash of the data of the table it shows and of the table behind its
+      chart, counted only when tables or charts are included
+    - the slide template version and the include_charts/include_tables
+      options
+The manifest of the last build of a period and report type records the
+fingerprint of every slide and keeps its rendered body. A new build renders
+only the slides whose fingerprint changed (or whose chart image is no
+longer in the chart cache) and reuses the rest, so a late manual adjustment
+rebuilds only the slides it touches.
+
+Builds of the same period and report type from several sessions share the
+directory: saves are serialized by a lock per directory and every file is
+written through its own temporary file.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from settings import BUILDS_DIR
+
+_save_locks = {}  # build directory -> lock held while saving into it
+_save_locks_lock = threading.Lock()
+
+
+def table_hash(df):
+    """Hash of a table's columns and values (row order matters)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, df.columns))).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def slide_fingerprint(slide, table_hashes, chart_table, options, template_version):
+    """Fingerprint of everything one content slide is rendered from."""
+    inputs = {
+        "template": template_version,
+        "slide": slide._asdict(),
+        "include_charts": options.include_charts,
+        "include_tables": options.include_tables,
+    }
+    if slide.chart and options.include_charts:
+        inputs["chart_data"] = table_hashes[chart_table]
+    if slide.table:
+        inputs["table_data"] = table_hashes[slide.table]
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class SlideManifest:
+    """Fingerprints and rendered bodies of the last build of one report."""
+
+    def __init__(self, period, report_type, builds_dir=BUILDS_DIR):
+        self.directory = (
+            Path(builds_dir)
+            / period.replace(" ", "_")
+            / report_type.lower().replace(" ", "_")
+        )
+        self.slides_dir = self.directory / "slides"
+        self.slides_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / "manifest.json"
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def body_path(self, slide_id):
+        name = hashlib.sha256(slide_id.encode()).hexdigest()[:16]
+        return self.slides_dir / f"{name}.html"
+
+    def is_current(self, slide_id, fingerprint, chart_exists):
+        """Whether the stored body of the slide can be reused as it is."""
+        entry = self.entries.get(slide_id)
+        return (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            and self.body_path(slide_id).exists()
+            and (entry["chart"] is None or chart_exists(entry["chart"]))
+        )
+
+    def chart_of(self, slide_id):
+        return self.entries[slide_id]["chart"]
+
+    def body(self, slide_id):
+        return self.body_path(slide_id).read_text()
+
+    def save(self, fingerprints, rebuilt, charts):
+        """Store the rebuilt bodies and the new manifest.
+
+        fingerprints: {slide_id: fingerprint} of every content slide
+        rebuilt: {slide_id: body} of the slides rendered in this build
+        charts: {slide_id: chart file name or None} of the rebuilt slides
+        """
+        with _save_lock(self.directory):
+            self._save(fingerprints, rebuilt, charts)
+
+    def _save(self, fingerprints, rebuilt, charts):
+        for slide_id, body in rebuilt.items():
+            _write_atomic(self.body_path(slide_id), body)
+        entries = {
+            slide_id: {
+                "fingerprint": fingerprint,
+                "chart": (
+                    charts[slide_id]
+                    if slide_id in rebuilt
+                    else self.entries[slide_id]["chart"]
+                ),
+            }
+            for slide_id, fingerprint in fingerprints.items()
+        }
+        _write_atomic(self.path, json.dumps(entries, indent=1))
+        self.entries = entries
+
+        # Bodies of slides no longer in the report
+        keep = {self.body_path(slide_id).name for slide_id in entries}
+        for path in self.slides_dir.glob("*.html"):
+            if path.name not in keep:
+                path.unlink()
+
+
+def _save_lock(directory):
+    with _save_locks_lock:
+        return _save_locks.setdefault(directory, threading.Lock())
+
+
+def _write_atomic(path, text):
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    ) as f:
+        f.write(text)
+    os.replace(f.name, path)
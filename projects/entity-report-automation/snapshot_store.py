@@ -0,0 +1,264 @@
+"""
+Snapshot Store - the report inputs of each closed period, frozen in compact
+columnar files.
+
+A snapshot is built once after month-end close from the sources of the
+period and holds everything the report tables and charts are derived from:
+    - exposures, customers, ratings, provisions, adjustments: the loaded
+      source tables (see report_data)
+    - trend: the monthly closes up to and including the period
+    - vintages.annual.npz, vintages.monthly.npz: the vintage triangles (see
+      vintage_analysis), carried forward from the previous month's
+      snapshot when it was built from the same history of events
+Each column is one .npy file, dates as datetime64. Text columns are stored
+as integer codes with their categories in meta.json, so a snapshot of the
+demo portfolio is about 2 MB. Loading memory-maps the files instead of querying the sources,
+so switching the Reporting Period (or comparing two periods) costs a few
+milliseconds.
+
+Usage (after month-end close):
+    python snapshot_store.py "December 2023"
+    python snapshot_store.py "December 2023" --sources path/to/sources
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_sources import create_demo_sources
+from report_data import (
+    MONTHLY_CLOSES,
+    facility_table,
+    load_adjustments,
+    load_customers,
+    load_portfolio,
+    load_provisions,
+    load_risk,
+    report_tables,
+)
+from settings import SNAPSHOTS_DIR, SOURCES_DIR
+from vintage_analysis import (
+    ANNUAL,
+    MONTHLY,
+    VintageTriangle,
+    history_digest,
+    month_number,
+    period_month,
+)
+
+# Bump when the layout changes; older snapshots are then rebuilt
+SNAPSHOT_VERSION = 4
+
+LOADERS = {
+    "exposures": load_portfolio,
+    "customers": load_customers,
+    "ratings": load_risk,
+    "provisions": load_provisions,
+    "adjustments": load_adjustments,
+}
+
+
+def snapshot_dir(period, snapshots_dir=SNAPSHOTS_DIR):
+    return Path(snapshots_dir) / period.replace(" ", "_")
+
+
+def trend_data(period):
+    """Monthly closes up to and including the period's month."""
+    trend = pd.DataFrame(MONTHLY_CLOSES)
+    # "Jul 2023" -> month number of "July 2023"
+    months = np.array(
+        [
+            period_month(datetime.strptime(month, "%b %Y").strftime("%B %Y"))
+            for month in trend["Month"]
+        ]
+    )
+    return trend[months <= period_month(period)].reset_index(drop=True)
+
+
+def build_snapshot(period, directory=SOURCES_DIR, snapshots_dir=SNAPSHOTS_DIR):
+    """Load the sources of a closed period into its snapshot; return its path."""
+    tables = {name: loader(directory) for name, loader in LOADERS.items()}
+    tables["trend"] = trend_data(period)
+    triangles = build_vintages(period, tables["exposures"], snapshots_dir)
+    return write_snapshot(period, tables, snapshots_dir, triangles)
+
+
+def previous_period(period):
+    month = period_month(period) - 1
+    return datetime(1970 + month // 12, month % 12 + 1, 1).strftime("%B %Y")
+
+
+def build_vintages(period, exposures, snapshots_dir=SNAPSHOTS_DIR):
+    """Annual and monthly vintage triangles of a period.
+
+    When the previous month's snapshot has them and the exposures hold the
+    same events up to that month, they are carried forward and only the
+    originations and defaults of the new month are counted. Otherwise (other
+    sources, restated or backdated events) they are recounted.
+    """
+    asof = period_month(period)
+    facility_ids = exposures["facility_id"].to_numpy()
+    originated = month_number(exposures["originated"])
+    defaulted = month_number(exposures["defaulted"])
+    lineage = history_digest(facility_ids, originated, defaulted, asof - 1)
+    previous = snapshot_dir(previous_period(period), snapshots_dir)
+    triangles = []
+    for frequency in (ANNUAL, MONTHLY):
+        try:
+            triangle = VintageTriangle.load(previous / f"vintages.{frequency}.npz")
+        except FileNotFoundError:
+            triangle = VintageTriangle(frequency)
+        if triangle.asof != asof - 1 or triangle.lineage != lineage:
+            triangle = VintageTriangle(frequency)
+        triangle.update(originated, defaulted, asof)
+        triangles.append(triangle)
+    for triangle in triangles:
+        triangle.lineage = history_digest(facility_ids, originated, defaulted, asof)
+    return triangles
+
+
+def load_vintages(period, frequency=ANNUAL, snapshots_dir=SNAPSHOTS_DIR):
+    """VintageTriangle of a period (see vintage_analysis)."""
+    return VintageTriangle.load(
+        snapshot_dir(period, snapshots_dir) / f"vintages.{frequency}.npz"
+    )
+
+
+def write_snapshot(period, tables, snapshots_dir=SNAPSHOTS_DIR, triangles=()):
+    """Write {table: DataFrame} and the vintage triangles as the snapshot of
+    a period."""
+    path = snapshot_dir(period, snapshots_dir)
+    tmp_path = path.with_name(f"{path.name}.partial")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "period": period,
+        "created": datetime.now().isoformat(sep=" ", timespec="seconds"),
+        "tables": {},
+    }
+    for name, df in tables.items():
+        columns = {}
+        for column in df.columns:
+            values = df[column]
+            if values.dtype.kind in "biufM":
+                array = values.to_numpy()
+                columns[column] = {}
+            else:
+                categorical = pd.Categorical(values)
+                categories = list(categorical.categories)
+                array = categorical.codes.astype(
+                    np.int8 if len(categories) < 128 else np.int32
+                )
+                columns[column] = {"categories": categories}
+            np.save(tmp_path / f"{name}.{column}.npy", array)
+        meta["tables"][name] = {"rows": len(df), "columns": columns}
+    for triangle in triangles:
+        triangle.save(tmp_path / f"vintages.{triangle.frequency}.npz")
+    with open(tmp_path / "meta.json", "w") as f:
+        json.dump(meta, f, indent=1)
+
+    # Swap in the new snapshot; readers see either the old or the new one
+    old_path = path.with_name(f"{path.name}.old")
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def read_meta(period, snapshots_dir=SNAPSHOTS_DIR):
+    """meta.json of a period's snapshot, or None if there is no usable one."""
+    try:
+        with open(snapshot_dir(period, snapshots_dir) / "meta.json") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    return meta if meta["version"] == SNAPSHOT_VERSION else None
+
+
+def load_snapshot(period, snapshots_dir=SNAPSHOTS_DIR):
+    """{table: DataFrame} of a period, numeric columns memory-mapped."""
+    meta = read_meta(period, snapshots_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No snapshot of {period}")
+    path = snapshot_dir(period, snapshots_dir)
+    tables = {}
+    for name, table in meta["tables"].items():
+        data = {}
+        for column, info in table["columns"].items():
+            array = np.load(path / f"{name}.{column}.npy", mmap_mode="r")
+            if "categories" in info:
+                data[column] = pd.Categorical.from_codes(array, info["categories"])
+            else:
+                data[column] = array
+        tables[name] = pd.DataFrame(data, copy=False)
+    return tables
+
+
+def snapshot_tables(period, snapshots_dir=SNAPSHOTS_DIR):
+    """The report tables of a period (see report_data), plus "trend"."""
+    inputs = load_snapshot(period, snapshots_dir)
+    tables = report_tables(
+        inputs["exposures"],
+        inputs["customers"],
+        inputs["ratings"],
+        inputs["provisions"],
+        inputs["adjustments"],
+    )
+    tables["trend"] = inputs["trend"]
+    return tables
+
+
+def snapshot_facilities(period, snapshots_dir=SNAPSHOTS_DIR):
+    """Facility-level frame of a period (see report_data.facility_table)."""
+    inputs = load_snapshot(period, snapshots_dir)
+    return facility_table(
+        inputs["exposures"],
+        inputs["customers"],
+        inputs["ratings"],
+        inputs["provisions"],
+        inputs["adjustments"],
+    )
+
+
+def create_demo_snapshots(
+    periods, directory=SOURCES_DIR, snapshots_dir=SNAPSHOTS_DIR, seed=2023
+):
+    """Build the missing snapshots of periods (latest first).
+
+    The latest period is snapshotted from the sources; earlier ones, which
+    closed before the demo sources existed, from demo sources of their own.
+    """
+    for number, period in enumerate(periods):
+        if read_meta(period, snapshots_dir) is not None:
+            continue
+        if number == 0:
+            build_snapshot(period, directory, snapshots_dir)
+            continue
+        with tempfile.TemporaryDirectory() as closed_sources:
+            create_demo_sources(closed_sources, seed - number)
+            build_snapshot(period, closed_sources, snapshots_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot a closed period")
+    parser.add_argument("period", help='e.g. "December 2023"')
+    parser.add_argument("--sources", type=Path, default=SOURCES_DIR)
+    args = parser.parse_args()
+
+    path = build_snapshot(args.period, args.sources)
+    size = sum(entry.stat().st_size for entry in path.iterdir())
+    print(f"{args.period}: {path} ({size / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
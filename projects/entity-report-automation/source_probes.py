@@ -0,0 +1,164 @@
+"""
+Source Probes - concurrent availability checks of the report data sources.
+
+Each source kind has a probe that reads how many records the source holds
+and when it was last updated:
+    - databases: COUNT(*) and MAX(updated_at) of the source table, on a
+      read-only connection that SQLite aborts once the timeout has passed
+    - Excel files: the row count of the sheet (read-only mode, so normally
+      only the stored sheet dimensions are parsed) and the file modification
+      time
+    - SharePoint: the slides in the library directory and the newest one
+run_probes() starts all probes at once on a thread pool and yields each
+result as soon as it is in, so the table fills in source by source instead
+of waiting for the slowest one. A probe still running at the timeout is
+reported unavailable.
+"""
+
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from datetime import datetime
+
+import openpyxl
+
+from data_sources import DATABASE, FILE, SHAREPOINT, SOURCES, source_path
+from settings import SOURCE_PROBE_TIMEOUT, SOURCES_DIR
+
+AVAILABLE, PENDING_REVIEW, UNAVAILABLE = "Available", "Pending Review", "Unavailable"
+
+ProbeResult = namedtuple(
+    "ProbeResult",
+    ["source", "status", "last_updated", "records", "unit", "detail", "elapsed_ms"],
+)
+
+
+class Probe(ABC):
+    """Base class: subclasses implement check() -> (records, last_updated)."""
+
+    unit = "records"
+
+    def __init__(self, source, directory=SOURCES_DIR, timeout=SOURCE_PROBE_TIMEOUT):
+        self.source = source
+        self.path = source_path(source, directory)
+        self.timeout = timeout
+
+    @abstractmethod
+    def check(self, deadline):
+        """Read the source before deadline; return (records, last_updated)."""
+
+    def run(self, deadline):
+        started = time.perf_counter()
+        try:
+            records, last_updated = self.check(deadline)
+        except Exception as e:
+            status, records, last_updated, detail = UNAVAILABLE, None, None, str(e)
+        else:
+            age_hours = (datetime.now() - last_updated).total_seconds() / 3600
+            if age_hours > self.source.max_age:
+                status = PENDING_REVIEW
+                detail = f"Older than {self.source.max_age} hours"
+            else:
+                status, detail = AVAILABLE, ""
+        return ProbeResult(
+            source=self.source,
+            status=status,
+            last_updated=last_updated,
+            records=records,
+            unit=self.unit,
+            detail=detail,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+
+class DatabaseProbe(Probe):
+    def check(self, deadline):
+        if not self.path.exists():
+            raise FileNotFoundError(f"{self.path.name} not found")
+        conn = sqlite3.connect(f"{self.path.as_uri()}?mode=ro", uri=True)
+        try:
+            # A non-zero return makes SQLite interrupt the running statement
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10_000)
+            try:
+                records, last_updated = conn.execute(
+                    f"SELECT COUNT(*), MAX(updated_at) FROM {self.source.table}"
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No response within {self.timeout:g}s") from e
+                raise
+        finally:
+            conn.close()
+        if last_updated is None:
+            raise ValueError(f"{self.source.table} is empty")
+        return records, datetime.fromisoformat(last_updated)
+
+
+class ExcelProbe(Probe):
+    def check(self, deadline):
+        modified = datetime.fromtimestamp(os.path.getmtime(self.path))
+        wb = openpyxl.load_workbook(self.path, read_only=True)
+        try:
+            ws = wb[self.source.table]
+            if ws.max_row is None:
+                # No stored dimensions (e.g. written by a script): count rows
+                ws.calculate_dimension(force=True)
+            records = max(ws.max_row - 1, 0)
+        finally:
+            wb.close()
+        return records, modified
+
+
+class SharePointProbe(Probe):
+    unit = "slides"
+
+    def check(self, deadline):
+        slides = [
+            entry
+            for entry in os.scandir(self.path)
+            if entry.is_file() and entry.name.endswith(".pptx")
+        ]
+        if not slides:
+            raise FileNotFoundError("No slides in the library")
+        newest = max(entry.stat().st_mtime for entry in slides)
+        return len(slides), datetime.fromtimestamp(newest)
+
+
+PROBES = {DATABASE: DatabaseProbe, FILE: ExcelProbe, SHAREPOINT: SharePointProbe}
+
+
+def make_probes(sources=SOURCES, directory=SOURCES_DIR, timeout=SOURCE_PROBE_TIMEOUT):
+    return [PROBES[source.kind](source, directory, timeout) for source in sources]
+
+
+def run_probes(probes):
+    """Run all probes concurrently; yield ProbeResults as they complete."""
+    timeout = max(probe.timeout for probe in probes)
+    deadline = time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="probe")
+    futures = {executor.submit(probe.run, deadline): probe for probe in probes}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            yield future.result()
+    except TimeoutError:
+        for future in pending:
+            probe = futures[future]
+            if future.done():
+                yield future.result()
+            else:
+                yield ProbeResult(
+                    source=probe.source,
+                    status=UNAVAILABLE,
+                    last_updated=None,
+                    records=None,
+                    unit=probe.unit,
+                    detail=f"No response within {timeout:g}s",
+                    elapsed_ms=timeout * 1000,
+                )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The project's modules are imported by name from the project directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
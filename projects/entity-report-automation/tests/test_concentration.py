@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from concentration import concentration
+from data_sources import SECTORS
+
+
+def facilities(seed=7, customers=300):
+    rng = np.random.default_rng(seed)
+    customer_sector = rng.integers(0, len(SECTORS), customers)
+    customer_id = rng.integers(0, customers, 2_000)
+    return pd.DataFrame(
+        {
+            "customer_id": customer_id,
+            "sector": pd.Categorical(
+                np.array(SECTORS)[customer_sector[customer_id]], categories=SECTORS
+            ),
+            "exposure": rng.lognormal(2.0, 1.5, len(customer_id)),
+        }
+    )
+
+
+def assert_same(incremental, full):
+    assert incremental.name_hhi() == pytest.approx(full.name_hhi())
+    assert incremental.sector_hhi() == pytest.approx(full.sector_hhi())
+    assert incremental.indicators() == pytest.approx(full.indicators())
+    pd.testing.assert_frame_equal(incremental.top_names(), full.top_names())
+    pd.testing.assert_frame_equal(incremental.sectors(), full.sectors())
+
+
+def test_update_sector_matches_a_full_rebuild():
+    before = facilities()
+    after = before.copy()
+    largest = before.groupby("customer_id")["exposure"].sum().idxmax()
+    moved = after["customer_id"] == largest
+    source = after.loc[moved, "sector"].iloc[0]
+    target = next(sector for sector in SECTORS if sector != source)
+    # The largest name is reclassified to another sector, another name is
+    # repaid in full
+    after.loc[moved, "sector"] = target
+    repaid_id = after.loc[after["sector"] == target, "customer_id"].iloc[0]
+    repaid = after["customer_id"] == repaid_id
+    after.loc[repaid, "exposure"] = 0.0
+
+    incremental = concentration(before, top_n=10)
+    for sector in (source, target):
+        rows = after[after["sector"] == sector]
+        incremental.update_sector(
+            sector, rows["customer_id"].to_numpy(), rows["exposure"].to_numpy()
+        )
+    full = concentration(after, top_n=10)
+
+    assert_same(incremental, full)
+    assert largest in set(full.top_names()["customer_id"])
+    assert repaid_id not in set(full.top_names()["customer_id"])
+    names = full.sectors().set_index("Sector")["Names"]
+    assert names[target] == (
+        after.loc[(after["sector"] == target) & ~repaid, "customer_id"].nunique()
+    )
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from ifrs9 import ifrs9_table, stage_of, stage_summary
+from report_data import facility_table
+
+
+def sources():
+    exposures = pd.DataFrame(
+        {
+            "facility_id": [1, 2, 3, 4],
+            "customer_id": [10, 11, 12, 13],
+            "segment": ["SME"] * 4,
+            "exposure": [1e6, 2e6, 3e6, 4e6],
+            "dpd": [0, 45, 120, 0],
+        }
+    )
+    customers = pd.DataFrame(
+        {
+            "customer_id": [10, 11, 12, 13],
+            "name": list("ABCD"),
+            "sector": ["Retail Trade"] * 4,
+        }
+    )
+    # Customer 13 has no rating
+    ratings = pd.DataFrame(
+        {
+            "customer_id": [10, 11, 12],
+            "rating": ["A", "BB", "BB"],
+            "previous_rating": ["A", "BBB", "BB"],
+            "pd": [0.01, 0.02, 0.05],
+        }
+    )
+    provisions = pd.DataFrame({"facility_id": [1, 2, 3], "provision": [0.0, 0.0, 9e5]})
+    return exposures, customers, ratings, provisions
+
+
+def test_stage_of_downgrades_and_days_past_due():
+    dpd = np.array([0, 0, 31, 91])
+    rating = np.array([1, 2, 1, 1])
+    previous = np.array([1, 1, 1, 1])
+    assert list(stage_of(dpd, rating, previous)) == [1, 2, 2, 3]
+
+
+def test_report_and_ifrs9_table_stage_facilities_alike():
+    facilities = facility_table(*sources())
+    summary = stage_summary(ifrs9_table(facilities)).set_index("Stage")
+    report = facilities.groupby("stage")["facility_id"].count()
+    assert list(facilities["stage"]) == [1, 2, 3, 1]
+    for stage in (1, 2, 3):
+        assert summary.loc[stage, "Facilities"] == report[stage]
+
+
+def test_unrated_facilities_are_counted():
+    summary = stage_summary(ifrs9_table(facility_table(*sources()))).set_index("Stage")
+    assert summary.loc["Total", "Unrated"] == 1
+    assert summary.loc[1, "Unrated"] == 1
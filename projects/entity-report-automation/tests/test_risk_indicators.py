@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from risk_indicators import (
+    BREACH,
+    KRI_RULES,
+    NO_DATA,
+    OK,
+    WARN,
+    Rule,
+    evaluate,
+    kri_table,
+    parse_rules,
+    parse_threshold,
+)
+
+RULES = parse_rules(
+    {"Below": "< 10", "Below or at": "<= 10", "Above": "> 10", "Above or at": ">= 10"}
+)
+
+
+@pytest.mark.parametrize(
+    "indicator, value, status",
+    [
+        # Exactly at the limit: a strict limit is breached, an inclusive one not
+        ("Below", 10.0, BREACH),
+        ("Below or at", 10.0, WARN),
+        ("Above", 10.0, BREACH),
+        ("Above or at", 10.0, WARN),
+        ("Below", 10.5, BREACH),
+        ("Below or at", 10.5, BREACH),
+        ("Above", 9.5, BREACH),
+        ("Above or at", 9.5, BREACH),
+        # Warning margin: 10% of the limit, 1.0 here
+        ("Below", 9.5, WARN),
+        ("Below", 9.0, OK),
+        ("Below", 8.5, OK),
+        ("Above", 10.5, WARN),
+        ("Above", 11.0, OK),
+    ],
+)
+def test_evaluate_at_and_around_the_limit(indicator, value, status):
+    assert evaluate([indicator], [value], RULES, margin=0.1)[0] == status
+
+
+def test_missing_values_have_no_status():
+    statuses = evaluate(["Below", "Above"], [np.nan, np.nan], RULES, margin=0.1)
+    assert list(statuses) == [NO_DATA, NO_DATA]
+
+
+def test_evaluate_keeps_the_shape_of_its_input():
+    indicators = np.array([["Below", "Above"], ["Above or at", "Below or at"]])
+    values = np.array([[10.0, 12.0], [np.nan, 9.5]])
+    statuses = evaluate(indicators, values, RULES, margin=0.1)
+    assert statuses.tolist() == [[BREACH, OK], [NO_DATA, WARN]]
+
+
+def test_unknown_indicator_is_rejected():
+    with pytest.raises(ValueError, match="No threshold for Sideways"):
+        evaluate(["Below", "Sideways"], [1.0, 1.0], RULES)
+
+
+@pytest.mark.parametrize(
+    "threshold, rule",
+    [
+        ("< 4.0%", Rule("X", "<", 4.0, "%")),
+        ("<=4%", Rule("X", "<=", 4.0, "%")),
+        ("  >= -1.5 ", Rule("X", ">=", -1.5, "")),
+        ("> 60.0 %", Rule("X", ">", 60.0, "%")),
+    ],
+)
+def test_parse_threshold(threshold, rule):
+    assert parse_threshold("X", threshold) == rule
+
+
+@pytest.mark.parametrize(
+    "threshold", ["", "4.0%", "= 4.0%", "=< 4.0", "< four", "< 4.0%%", "< 4.", "<> 4"]
+)
+def test_invalid_threshold_is_rejected(threshold):
+    with pytest.raises(ValueError, match="X: cannot parse threshold"):
+        parse_threshold("X", threshold)
+
+
+def test_kri_table_of_the_report_limits():
+    table = kri_table(
+        {"Covenant Breaches": 2.3, "NPL Ratio": 2.0, "FX Exposure": np.nan}
+    )
+    assert list(table["Threshold"]) == ["< 2.0%", "< 4.0%", "< 25.0%"]
+    assert list(table["Actual"]) == ["2.3%", "2.0%", "-"]
+    assert list(table["Status"]) == [BREACH, OK, NO_DATA]
+    # Covenant Breaches is a strict limit: 2.0% itself is a breach
+    assert evaluate(["Covenant Breaches"], [2.0], KRI_RULES)[0] == BREACH
@@ -0,0 +1,37 @@
+import json
+import threading
+
+from slide_manifest import SlideManifest
+
+
+def test_concurrent_saves_of_one_report_do_not_collide(tmp_path):
+    errors = []
+
+    def build(number):
+        manifest = SlideManifest("December 2023", "Executive Summary", tmp_path)
+        slides = {f"slide-{i}": f"<p>{number}</p>" for i in range(20)}
+        try:
+            for _ in range(20):
+                manifest.save(
+                    {slide_id: str(number) for slide_id in slides},
+                    slides,
+                    dict.fromkeys(slides),
+                )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    manifest = SlideManifest("December 2023", "Executive Summary", tmp_path)
+    # One build's manifest, with the bodies of the same build
+    (number,) = {entry["fingerprint"] for entry in manifest.entries.values()}
+    assert {manifest.body(slide_id) for slide_id in manifest.entries} == {
+        f"<p>{number}</p>"
+    }
+    assert not list(manifest.directory.rglob("*.tmp"))
+    assert json.loads(manifest.path.read_text()) == manifest.entries
@@ -0,0 +1,20 @@
+import snapshot_store
+from snapshot_store import trend_data
+
+
+def test_trend_is_cut_at_the_month_of_the_right_year(monkeypatch):
+    monkeypatch.setattr(
+        snapshot_store,
+        "MONTHLY_CLOSES",
+        {
+            "Month": ["Nov 2022", "Dec 2022", "Nov 2023", "Dec 2023"],
+            "Exposure": [1, 2, 3, 4],
+            "NPL": [1.0, 1.0, 1.0, 1.0],
+        },
+    )
+    assert list(trend_data("November 2023")["Month"]) == [
+        "Nov 2022",
+        "Dec 2022",
+        "Nov 2023",
+    ]
+    assert list(trend_data("December 2022")["Month"]) == ["Nov 2022", "Dec 2022"]
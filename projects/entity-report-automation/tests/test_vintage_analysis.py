@@ -0,0 +1,122 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_sources import create_demo_sources
+from report_data import sources_current
+from snapshot_store import build_vintages, snapshot_dir
+from vintage_analysis import (
+    ANNUAL,
+    MONTHLY,
+    VintageTriangle,
+    month_number,
+    period_month,
+)
+
+DECEMBER = period_month("December 2023")
+
+
+def exposures(seed, facilities=5_000):
+    """Facilities originated 2019-2023, a fifth of them defaulted since."""
+    rng = np.random.default_rng(seed)
+    originated = np.datetime64("2019-01-01") + rng.integers(
+        0, 5 * 365, facilities
+    ).astype("timedelta64[D]")
+    to_default = rng.integers(0, 3 * 365, facilities).astype("timedelta64[D]")
+    defaulted = np.where(
+        rng.random(facilities) < 0.2, originated + to_default, np.datetime64("NaT")
+    )
+    return pd.DataFrame(
+        {
+            "facility_id": np.arange(facilities),
+            "originated": originated.astype("datetime64[ns]"),
+            "defaulted": defaulted.astype("datetime64[ns]"),
+        }
+    )
+
+
+def recount(exposures, asof, frequency=ANNUAL):
+    triangle = VintageTriangle(frequency)
+    triangle.update(
+        month_number(exposures["originated"]),
+        month_number(exposures["defaulted"]),
+        asof,
+    )
+    return triangle
+
+
+@pytest.mark.parametrize("frequency", [ANNUAL, MONTHLY])
+def test_carried_forward_triangle_equals_a_recount(frequency):
+    book = exposures(1)
+    triangle = recount(book, DECEMBER - 1, frequency)
+    triangle.update(
+        month_number(book["originated"]), month_number(book["defaulted"]), DECEMBER
+    )
+    pd.testing.assert_frame_equal(
+        triangle.rates(), recount(book, DECEMBER, frequency).rates()
+    )
+
+
+def test_rates_are_blank_where_the_vintage_is_not_that_old():
+    rates = recount(exposures(1), DECEMBER).rates()
+    assert rates["2023"].iloc[1:].isna().all()
+    assert rates["2019"].notna().all()
+    assert (rates["2019"].diff().dropna() >= 0).all()
+
+
+def test_saved_triangle_loads_with_its_lineage(tmp_path):
+    triangle = recount(exposures(1), DECEMBER)
+    triangle.lineage = "0123456789abcdef"
+    triangle.save(tmp_path / "vintages.annual.npz")
+    loaded = VintageTriangle.load(tmp_path / "vintages.annual.npz")
+    assert loaded.lineage == triangle.lineage
+    assert loaded.asof == DECEMBER
+    pd.testing.assert_frame_equal(loaded.rates(), triangle.rates())
+
+
+def save_previous(triangles, snapshots_dir):
+    path = snapshot_dir("November 2023", snapshots_dir)
+    path.mkdir(parents=True)
+    for triangle in triangles:
+        triangle.save(path / f"vintages.{triangle.frequency}.npz")
+
+
+def test_triangle_of_the_same_history_is_carried_forward(tmp_path):
+    book = exposures(1)
+    save_previous(build_vintages("November 2023", book, tmp_path), tmp_path)
+    annual, _ = build_vintages("December 2023", book, tmp_path)
+    pd.testing.assert_frame_equal(annual.rates(), recount(book, DECEMBER).rates())
+
+
+@pytest.mark.parametrize(
+    "december",
+    [
+        lambda book: exposures(2),  # other sources
+        lambda book: book.assign(  # a default backdated into November
+            defaulted=book["defaulted"].fillna(pd.Timestamp("2023-11-15"))
+        ),
+    ],
+)
+def test_triangle_of_another_history_is_recounted(tmp_path, december):
+    november = exposures(1)
+    save_previous(build_vintages("November 2023", november, tmp_path), tmp_path)
+    book = december(november)
+    annual, monthly = build_vintages("December 2023", book, tmp_path)
+    pd.testing.assert_frame_equal(annual.rates(), recount(book, DECEMBER).rates())
+    pd.testing.assert_frame_equal(
+        monthly.rates(), recount(book, DECEMBER, MONTHLY).rates()
+    )
+
+
+def test_sources_without_the_vintage_columns_are_not_current(tmp_path):
+    create_demo_sources(tmp_path)
+    assert sources_current(tmp_path)
+
+    # The portfolio source as built before it had origination dates
+    conn = sqlite3.connect(tmp_path / "portfolio.db")
+    with conn:
+        conn.execute("ALTER TABLE exposures DROP COLUMN originated")
+    conn.close()
+    assert not sources_current(tmp_path)
@@ -0,0 +1,191 @@
+"""
+Vintage Analysis - cumulative default rates by origination vintage and
+seasoning.
+
+A VintageTriangle counts the facilities originated in each vintage (year or
+month) and their first defaults by seasoning (years or months from
+origination to default; the last row gathers everything after it). The
+counts are filled with np.bincount over integer month numbers, one pass for
+the originations and one for the defaults, so no loop runs per loan.
+
+update() adds only the originations and defaults of the months after the
+ones already counted, so when a new month of performance data arrives the
+triangle of the previous month is carried forward instead of recounted
+(see snapshot_store). A triangle keeps the history_digest() of the events
+it counted; it is only carried forward onto data with the same history,
+since a restated or backdated event in a counted month would be missed. rates() turns the counts into the triangle of the
+report: the cumulative default rate (%) of each vintage after each
+seasoning, blank where the vintage is not that old yet.
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ANNUAL, MONTHLY = "annual", "monthly"
+
+# Months per vintage and per step of seasoning
+SPAN = {ANNUAL: 12, MONTHLY: 1}
+
+# Rows of the triangle; the last one is "and after"
+SEASONINGS = {ANNUAL: 5, MONTHLY: 36}
+
+
+def month_number(dates):
+    """Months since January 1970 of datetime64 values (-1 for NaT)."""
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    return np.where(np.isnat(dates), -1, months)
+
+
+def period_month(period):
+    """Month number of a reporting period such as "December 2023"."""
+    date = datetime.strptime(period, "%B %Y")
+    return (date.year - 1970) * 12 + date.month - 1
+
+
+def history_digest(facility_ids, originated, defaulted, asof):
+    """Order-independent digest of the events up to month asof: each
+    facility originated by then, with its first default if it came by then.
+
+    originated, defaulted: month numbers (see month_number)
+    """
+    originated = np.asarray(originated)
+    counted = (originated >= 0) & (originated <= asof)
+    defaulted = np.asarray(defaulted)[counted]
+    events = pd.DataFrame(
+        {
+            "facility_id": np.asarray(facility_ids)[counted],
+            "originated": originated[counted],
+            "defaulted": np.where(defaulted <= asof, defaulted, -1),
+        }
+    )
+    # Sums of uint64 hashes wrap around; the order of the rows does not matter
+    return f"{pd.util.hash_pandas_object(events, index=False).sum():016x}"
+
+
+def month_label(month):
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+class VintageTriangle:
+    """Originations and first defaults by vintage and seasoning."""
+
+    def __init__(self, frequency=ANNUAL):
+        self.frequency = frequency
+        self.span = SPAN[frequency]
+        self.seasonings = SEASONINGS[frequency]
+        self.first = None  # first vintage, in spans since January 1970
+        self.originated = np.zeros(0, dtype=np.int64)
+        self.defaults = np.zeros((0, self.seasonings), dtype=np.int64)
+        self.asof = -1  # last month counted
+        self.lineage = None  # history_digest() of the events counted
+
+    def update(self, originated, defaulted, asof):
+        """Count the events of the months after self.asof up to asof.
+
+        originated, defaulted: month numbers of every facility (see
+        month_number), -1 for facilities that never defaulted
+        """
+        originated = np.asarray(originated)
+        defaulted = np.asarray(defaulted)
+        new = (originated > self.asof) & (originated <= asof)
+        if self.first is None:
+            if not new.any():
+                return
+            self.first = int(originated[new].min()) // self.span
+        self._extend(asof // self.span - self.first + 1)
+        vintages = len(self.originated)
+
+        vintage = originated // self.span - self.first
+        # Backdated originations before the first vintage are not counted
+        new &= vintage >= 0
+        self.originated += np.bincount(vintage[new], minlength=vintages)
+
+        new = (
+            (defaulted > self.asof)
+            & (defaulted <= asof)
+            & (defaulted >= originated)
+            & (vintage >= 0)
+        )
+        seasoning = np.minimum(
+            (defaulted[new] - originated[new]) // self.span, self.seasonings - 1
+        )
+        self.defaults += np.bincount(
+            vintage[new] * self.seasonings + seasoning,
+            minlength=vintages * self.seasonings,
+        ).reshape(vintages, self.seasonings)
+        self.asof = asof
+
+    def rates(self):
+        """Cumulative default rate (%) with a row per seasoning and a column
+        per vintage; NaN where the vintage has not reached the seasoning."""
+        vintages = np.arange(len(self.originated)) + (self.first or 0)
+        elapsed = self.asof - vintages * self.span
+        reached = elapsed[:, None] >= np.arange(self.seasonings) * self.span
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = self.defaults.cumsum(axis=1) / self.originated[:, None] * 100
+        rates = np.where(reached & (self.originated[:, None] > 0), rates, np.nan)
+        return pd.DataFrame(
+            rates.T,
+            index=self._seasoning_labels(),
+            columns=[self._vintage_label(vintage) for vintage in vintages],
+        )
+
+    def save(self, path):
+        # np.savez adds .npz to names without it
+        tmp_path = f"{path}.partial.npz"
+        np.savez(
+            tmp_path,
+            frequency=self.frequency,
+            first=-1 if self.first is None else self.first,
+            asof=self.asof,
+            lineage=self.lineage or "",
+            originated=self.originated,
+            defaults=self.defaults,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            triangle = cls(str(data["frequency"]))
+            first = int(data["first"])
+            triangle.first = None if first < 0 else first
+            triangle.asof = int(data["asof"])
+            # Triangles saved before lineages were kept have none
+            triangle.lineage = str(data["lineage"]) if "lineage" in data else ""
+            triangle.lineage = triangle.lineage or None
+            triangle.originated = data["originated"]
+            triangle.defaults = data["defaults"]
+        return triangle
+
+    def _extend(self, vintages):
+        missing = vintages - len(self.originated)
+        if missing > 0:
+            self.originated = np.pad(self.originated, (0, missing))
+            self.defaults = np.pad(self.defaults, ((0, missing), (0, 0)))
+
+    def _vintage_label(self, vintage):
+        if self.frequency == ANNUAL:
+            return str(1970 + vintage)
+        return month_label(vintage)
+
+    def _seasoning_labels(self):
+        unit = "Year" if self.frequency == ANNUAL else "Month"
+        labels = [f"{unit} {number}" for number in range(1, self.seasonings + 1)]
+        labels[-1] += "+"
+        return labels
+
+
+def seasoning_exposure(originated, exposure, asof, frequency=ANNUAL):
+    """Exposure of the facilities in each seasoning (row of the triangle)
+    at asof, from their origination month numbers."""
+    span = SPAN[frequency]
+    seasonings = SEASONINGS[frequency]
+    originated = np.asarray(originated)
+    live = (originated >= 0) & (originated <= asof)
+    seasoning = np.minimum((asof - originated[live]) // span, seasonings - 1)
+    return np.bincount(seasoning, np.asarray(exposure)[live], minlength=seasonings)
@@ -3,17 +3,38 @@ Rapid Production Streamlit App - Mockup
 A client-facing application for bank tellers to check customer eligibility.
 """
 
+import re
+import time
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
+from eligibility_snapshot import (
+    CASH_LOAN,
+    CASH_LOAN_LIMITS,
+    CREDIT_CARD,
+    CREDIT_CARD_LIMITS,
+    INVESTMENT_PRODUCTS,
+    MORTGAGE_REFINANCING,
+    PRODUCTS,
+)
+from data_access import PoolExhausted, QueryTimeout
+from services import (
+    get_audit_log,
+    get_backend_loop,
+    get_lookup_service,
+    start_background_services,
+)
+from settings import CURRENT_BRANCH, CURRENT_USER
+
 st.set_page_config(
     page_title="Client Eligibility Check",
     page_icon="🏦",
     layout="wide",
     initial_sidebar_state="collapsed",
 )
+start_background_services()
 
 # Custom CSS for status indicators
 st.markdown(
@@ -57,8 +78,8 @@ with st.sidebar:
     - **Reports** - Generate Reports
     """)
     st.divider()
-    st.caption("User: J.Smith")
-    st.caption("Branch: London Central")
+    st.caption(f"User: {CURRENT_USER}")
+    st.caption(f"Branch: {CURRENT_BRANCH}")
 
 # Main content
 st.title("🏦 Client Eligibility Check")
@@ -84,77 +105,128 @@ with st.form("client_lookup"):
         clear = st.form_submit_button("Clear", use_container_width=True)
 
 # Display results when form is submitted
-if submitted and client_id:
-    with st.spinner("Checking eligibility..."):
-        # Simulate database lookup delay
-        import time
-
-        time.sleep(0.5)
-
-    # Mock client data (always same regardless of input)
-    st.success("Client found in database")
-
-    st.subheader("📋 Client Information")
-
-    # Client details in a table
-    client_data = {
-        "Field": [
-            "Client ID",
-            "Customer Since",
-            "Segment",
-            "Risk Category",
-            "Last Activity",
-        ],
-        "Value": [
-            client_id if client_id else "12345678901",
-            "2019-03-15",
-            "Premium",
-            "Low",
-            "2024-01-18",
-        ],
-    }
-
-    df_client = pd.DataFrame(client_data)
-    st.table(df_client)
-
-    st.divider()
-
-    # Eligibility results
-    st.subheader("📊 Product Eligibility")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown("**Cash Loan**")
-        st.markdown('<div class="status-ok">✓ ELIGIBLE</div>', unsafe_allow_html=True)
-        st.caption("Max amount: 50,000 PLN")
-
-    with col2:
-        st.markdown("**Credit Card**")
-        st.markdown('<div class="status-ok">✓ ELIGIBLE</div>', unsafe_allow_html=True)
-        st.caption("Limit: 15,000 PLN")
-
-    st.markdown("")  # Spacer
-
-    col3, col4 = st.columns(2)
-
-    with col3:
-        st.markdown("**Mortgage Refinancing**")
-        st.markdown(
-            '<div class="status-not-ok">✗ NOT ELIGIBLE</div>', unsafe_allow_html=True
+if submitted and client_id and not re.fullmatch(r"\d{11}", client_id, re.ASCII):
+    get_audit_log().log(
+        CURRENT_USER,
+        CURRENT_BRANCH,
+        client_id,
+        0.0,
+        "Validation",
+        detail="Invalid client ID format",
+    )
+    st.error("Client ID must be exactly 11 digits")
+
+elif submitted and client_id:
+    lookup_service = get_lookup_service()
+    started = time.perf_counter()
+    try:
+        with st.spinner("Checking eligibility..."):
+            result = get_backend_loop().run(lookup_service.lookup(client_id))
+    except (PoolExhausted, QueryTimeout) as e:
+        get_audit_log().log(
+            CURRENT_USER,
+            CURRENT_BRANCH,
+            client_id,
+            (time.perf_counter() - started) * 1000,
+            "Timeout" if isinstance(e, QueryTimeout) else "DB Error",
+            detail=str(e),
         )
-        st.caption("Reason: No active mortgage")
-
-    with col4:
-        st.markdown("**Investment Products**")
-        st.markdown('<div class="status-ok">✓ ELIGIBLE</div>', unsafe_allow_html=True)
-        st.caption("All categories available")
-
-    st.divider()
+        st.error(f"Lookup failed: {e}. Please try again in a moment.")
+        st.stop()
+
+    client = result.client
+    get_audit_log().log(
+        CURRENT_USER,
+        CURRENT_BRANCH,
+        client_id,
+        result.elapsed_ms,
+        "Success" if client is not None else "Not Found",
+        flags=client.flags if client is not None else None,
+        detail=result.source,
+    )
 
-    # Timestamp and audit info
-    st.caption(f"Query timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    st.caption("This query has been logged for audit purposes.")
+    if client is None:
+        st.warning("Client not found")
+    else:
+        st.success("Client found in database")
+
+        st.subheader("📋 Client Information")
+
+        # Client details in a table
+        client_data = {
+            "Field": [
+                "Client ID",
+                "Customer Since",
+                "Segment",
+                "Risk Category",
+                "Last Activity",
+            ],
+            "Value": [
+                client.client_id,
+                client.customer_since.isoformat(),
+                client.segment,
+                client.risk_category,
+                client.last_activity.isoformat(),
+            ],
+        }
+
+        df_client = pd.DataFrame(client_data)
+        st.table(df_client)
+
+        st.divider()
+
+        # Eligibility results
+        st.subheader("📊 Product Eligibility")
+
+        captions = {
+            CASH_LOAN: (
+                f"Max amount: {CASH_LOAN_LIMITS[client.segment]:,} PLN",
+                "Reason: High risk category or arrears",
+            ),
+            CREDIT_CARD: (
+                f"Limit: {CREDIT_CARD_LIMITS[client.segment]:,} PLN",
+                "Reason: High risk or client for less than a year",
+            ),
+            MORTGAGE_REFINANCING: (
+                "Refinancing offer available",
+                "Reason: No active mortgage or risk above Low",
+            ),
+            INVESTMENT_PRODUCTS: (
+                "All categories available",
+                "Reason: Requires Low risk or Premium segment",
+            ),
+        }
+
+        for row in (PRODUCTS[:2], PRODUCTS[2:]):
+            for col, (label, flag) in zip(st.columns(2), row):
+                eligible_caption, reason = captions[flag]
+                with col:
+                    st.markdown(f"**{label}**")
+                    if client.flags & flag:
+                        st.markdown(
+                            '<div class="status-ok">✓ ELIGIBLE</div>',
+                            unsafe_allow_html=True,
+                        )
+                        st.caption(eligible_caption)
+                    else:
+                        st.markdown(
+                            '<div class="status-not-ok">✗ NOT ELIGIBLE</div>',
+                            unsafe_allow_html=True,
+                        )
+                        st.caption(reason)
+
+            st.markdown("")  # Spacer
+
+        st.divider()
+
+        # Timestamp and audit info
+        st.caption(f"Query timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if result.source == "snapshot":
+            built_at = lookup_service.snapshot.built_at.strftime("%Y-%m-%d %H:%M")
+            st.caption(f"Eligibility as of nightly snapshot built {built_at}")
+        else:
+            st.caption("New client - eligibility scored from core banking data")
+        st.caption("This query has been logged for audit purposes.")
 
 elif submitted and not client_id:
     st.error("Please enter a valid Client ID")
@@ -0,0 +1,500 @@
+"""
+Audit Log - durable, append-only log of every client lookup.
+
+Records go to a chain of SQLite segments in WAL mode:
+    - log() only stamps the record and puts it on an in-memory queue, so the
+      request path pays microseconds, not an fsync
+    - a single writer thread group-commits everything queued within
+      flush_interval in one transaction (one fsync per batch)
+    - the active segment is sealed and a new one started once it grows past
+      max_segment_bytes or gets older than max_segment_age
+    - every segment is indexed by timestamp, (user, timestamp) and
+      (branch, timestamp);
+      triggers reject UPDATE and DELETE
+
+Sequence numbers continue across segments, so (seq) orders the whole log.
+Segment files are named audit-<first seq>.db. Records can be backdated
+(log(ts=...)), so the time ranges of segments may overlap: readers take the
+range of each segment from its MIN/MAX(ts) and merge segments by (ts, seq).
+
+A failed commit (a full disk, a seq taken by another writer) is logged and
+retried on a reopened segment; a batch that still fails is kept and retried
+with the next one, and flush() raises AuditWriteError meanwhile. At most
+max_pending records are kept: past that (a disk that stays full) the oldest
+are dropped, counted in `dropped` and logged.
+"""
+
+import heapq
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from settings import (
+    AUDIT_DIR,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_FLUSH_TIMEOUT,
+    AUDIT_MAX_PENDING,
+    AUDIT_SEGMENT_MAX_AGE,
+    AUDIT_SEGMENT_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# Commit attempts of a batch, and the pause before the first retry (doubled
+# for each further one)
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 0.1
+
+# Statuses logged for failed lookups (the others are "Success", "Not Found")
+ERROR_STATUSES = {"Timeout", "DB Error", "Validation"}
+
+COLUMNS = [
+    "seq",
+    "ts",
+    "user",
+    "branch",
+    "client_id",
+    "response_ms",
+    "status",
+    "flags",
+    "detail",
+]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS audit (
+        seq INTEGER PRIMARY KEY,
+        ts TEXT NOT NULL,
+        user TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        client_id TEXT NOT NULL,
+        response_ms REAL NOT NULL,
+        status TEXT NOT NULL,
+        flags INTEGER,
+        detail TEXT NOT NULL DEFAULT ''
+    );
+    CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit (ts);
+    CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON audit (user, ts);
+    CREATE INDEX IF NOT EXISTS idx_audit_branch_ts ON audit (branch, ts);
+    CREATE TRIGGER IF NOT EXISTS audit_no_update BEFORE UPDATE ON audit
+    BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+    CREATE TRIGGER IF NOT EXISTS audit_no_delete BEFORE DELETE ON audit
+    BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+"""
+
+Segment = namedtuple("Segment", ["path", "first_seq", "first_ts", "last_ts"])
+
+
+class AuditWriteError(Exception):
+    """Queued records could not be committed to the audit log."""
+
+
+class FlushRequest:
+    """Put on the queue by flush(); set once the records before it are
+    committed, or with the error that stopped them."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+    def finish(self, error=None):
+        self.error = error
+        self.done.set()
+
+
+def format_ts(value):
+    return value.strftime(TS_FORMAT)
+
+
+def first_seq_of(path):
+    """First sequence number of a segment, taken from its file name."""
+    return int(os.path.basename(path)[len("audit-") : -len(".db")])
+
+
+def connect_readonly(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def segment_rows(path, sql, params=()):
+    """Yield the rows of a query on one segment as dicts."""
+    conn = connect_readonly(path)
+    try:
+        for row in conn.execute(sql, params):
+            yield dict(row)
+    finally:
+        conn.close()
+
+
+class AuditLog:
+    """Segmented, group-committed audit log with a single writer thread."""
+
+    def __init__(
+        self,
+        directory=AUDIT_DIR,
+        flush_interval=AUDIT_FLUSH_INTERVAL,
+        max_segment_bytes=AUDIT_SEGMENT_MAX_BYTES,
+        max_segment_age=AUDIT_SEGMENT_MAX_AGE,
+        max_batch=10_000,
+        max_pending=AUDIT_MAX_PENDING,
+    ):
+        self.directory = str(directory)
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.dropped = 0  # uncommitted records dropped past max_pending
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._sealed = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._observers = []
+        self._pending = []  # records of batches that failed to commit
+
+        self._conn = None
+        self._open_active_segment()
+
+        self._writer = threading.Thread(
+            target=self._write_loop, name="audit-writer", daemon=True
+        )
+        self._writer.start()
+
+    # ----- request path -----
+
+    def log(
+        self,
+        user,
+        branch,
+        client_id,
+        response_ms,
+        status,
+        flags=None,
+        detail="",
+        ts=None,
+    ):
+        """Queue one record. Durable within flush_interval; never blocks."""
+        if self._closed:
+            raise RuntimeError("Audit log is closed")
+        self._queue.put(
+            (
+                format_ts(ts or datetime.now()),
+                user,
+                branch,
+                str(client_id),
+                float(response_ms),
+                status,
+                flags,
+                detail,
+            )
+        )
+
+    def subscribe(self, observer):
+        """Call observer(rows) on the writer thread after every commit."""
+        self._observers.append(observer)
+
+    def flush(self, timeout=AUDIT_FLUSH_TIMEOUT):
+        """Block until every record queued so far has been committed.
+
+        Returns False if that takes longer than timeout (None: no limit);
+        raises AuditWriteError if the writer could not commit them.
+        """
+        request = FlushRequest()
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            return False
+        if request.error is not None:
+            raise AuditWriteError(
+                f"Audit records not committed: {request.error}"
+            ) from request.error
+        return True
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._writer.join(AUDIT_FLUSH_TIMEOUT)
+
+    # ----- writer thread -----
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.directory, f"audit-{first_seq:012d}.db")
+
+    def _list_segment_paths(self):
+        names = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.startswith("audit-") and name.endswith(".db")
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _connect_segment(self, path):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _open_active_segment(self):
+        paths = self._list_segment_paths()
+        path = paths[-1] if paths else self._segment_path(1)
+
+        conn = self._connect_segment(path)
+        last_seq, first_ts = conn.execute(
+            "SELECT MAX(seq), MIN(ts) FROM audit"
+        ).fetchone()
+        with self._lock:
+            self._conn = conn
+            self._active_path = path
+            self._next_seq = (last_seq or first_seq_of(path) - 1) + 1
+            self._active_opened = (
+                datetime.strptime(first_ts, TS_FORMAT).timestamp()
+                if first_ts
+                else time.time()
+            )
+
+    def _should_rotate(self):
+        if self._next_seq == first_seq_of(self._active_path):
+            return False  # never rotate an empty segment
+        if time.time() - self._active_opened >= self.max_segment_age:
+            return True
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size >= self.max_segment_bytes
+
+    def _reopen(self):
+        """Reconnect to the last segment, re-reading the next seq from it."""
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._open_active_segment()
+
+    def _rotate(self):
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+
+        path = self._segment_path(self._next_seq)
+        conn = self._connect_segment(path)
+        with self._lock:
+            self._conn = conn
+            self._active_path = path
+            self._active_opened = time.time()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            records, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, FlushRequest):
+                    waiters.append(item)
+                elif item is None:
+                    stop = True
+                    break
+                else:
+                    records.append(item)
+                if len(records) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            error = None
+            if records or self._pending:
+                batch, self._pending = self._pending + records, []
+                try:
+                    rows = self._commit_with_retry(batch)
+                except Exception as exc:
+                    logger.exception(
+                        "Audit log could not commit %d records; keeping them "
+                        "for the next batch",
+                        len(batch),
+                    )
+                    self._pending = self._keep_pending(batch)
+                    error = exc
+                else:
+                    self._notify(rows)
+            for waiter in waiters:
+                waiter.finish(error)
+            if stop:
+                break
+
+        if self._pending:
+            logger.error(
+                "Audit log closed with %d uncommitted records", len(self._pending)
+            )
+        try:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+        except sqlite3.Error:
+            logger.exception("Audit log could not close its active segment")
+
+    def _keep_pending(self, batch):
+        """The records of a failed batch to retry, the newest max_pending."""
+        excess = len(batch) - self.max_pending
+        if excess <= 0:
+            return batch
+        self.dropped += excess
+        logger.error(
+            "Audit log dropped %d uncommitted records (%d in total) to keep "
+            "at most %d pending",
+            excess,
+            self.dropped,
+            self.max_pending,
+        )
+        return batch[excess:]
+
+    def _commit_with_retry(self, records):
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                return self._commit(records)
+            except (sqlite3.Error, OSError):
+                if attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                logger.warning(
+                    "Audit log commit failed, retrying on a reopened segment",
+                    exc_info=True,
+                )
+            time.sleep(RETRY_DELAY * 2**attempt)
+            try:
+                self._reopen()
+            except (sqlite3.Error, OSError):
+                logger.warning("Audit log could not reopen its segment", exc_info=True)
+
+    def _commit(self, records):
+        if self._should_rotate():
+            self._rotate()
+
+        first_seq = self._next_seq
+        rows = [(first_seq + i, *record) for i, record in enumerate(records)]
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO audit ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+        self._next_seq = first_seq + len(rows)
+        return rows
+
+    def _notify(self, rows):
+        rows = [dict(zip(COLUMNS, row)) for row in rows]
+        for observer in self._observers:
+            try:
+                observer(rows)
+            except Exception:
+                # Derived statistics must never stop the audit trail
+                logger.exception("Audit log observer %r failed", observer)
+
+    # ----- readers -----
+
+    @property
+    def last_seq(self):
+        """Sequence number of the latest committed record (0 if none)."""
+        return self._next_seq - 1
+
+    def segments(self, start=None, end=None):
+        """Segments overlapping [start, end), oldest first."""
+        with self._lock:
+            active_path = self._active_path
+
+        result = []
+        for path in self._list_segment_paths():
+            segment = self._sealed.get(path)
+            if segment is None:
+                conn = connect_readonly(path)
+                first_ts, last_ts = conn.execute(
+                    "SELECT MIN(ts), MAX(ts) FROM audit"
+                ).fetchone()
+                conn.close()
+                segment = Segment(path, first_seq_of(path), first_ts, last_ts)
+                if path != active_path:
+                    self._sealed[path] = segment
+            if segment.first_ts is None:
+                continue
+            if end is not None and segment.first_ts >= format_ts(end):
+                continue
+            if start is not None and segment.last_ts < format_ts(start):
+                continue
+            result.append(segment)
+        return result
+
+    def read(self, start=None, end=None, user=None):
+        """Yield records in [start, end), optionally for a single user."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(format_ts(start))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(format_ts(end))
+        if user is not None:
+            conditions.append("user = ?")
+            params.append(user)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # Segments can overlap in time: merge their ordered rows
+        yield from heapq.merge(
+            *(
+                segment_rows(
+                    segment.path,
+                    f"SELECT * FROM audit {where} ORDER BY ts, seq",
+                    params,
+                )
+                for segment in self.segments(start, end)
+            ),
+            key=lambda row: (row["ts"], row["seq"]),
+        )
+
+    def read_since(self, seq):
+        """Yield records with a sequence number greater than seq, in order."""
+        segments = self.segments()
+        for segment, following in zip(segments, segments[1:] + [None]):
+            # A sealed segment ends just before the next one starts
+            if following is not None and following.first_seq - 1 <= seq:
+                continue
+            conn = connect_readonly(segment.path)
+            try:
+                for row in conn.execute(
+                    "SELECT * FROM audit WHERE seq > ? ORDER BY seq", (seq,)
+                ):
+                    yield dict(row)
+            finally:
+                conn.close()
+
+    def recent(self, limit=20):
+        """The latest records, newest first."""
+        rows = []
+        for segment in reversed(self.segments()):
+            conn = connect_readonly(segment.path)
+            rows.extend(
+                dict(row)
+                for row in conn.execute(
+                    "SELECT * FROM audit ORDER BY seq DESC LIMIT ?",
+                    (limit - len(rows),),
+                )
+            )
+            conn.close()
+            if len(rows) >= limit:
+                break
+        return rows
@@ -0,0 +1,97 @@
+"""
+Benchmark the streaming report export for every format.
+
+Builds a synthetic audit log (one month of User Activity), then exports it to
+Excel, CSV and PDF, each in a fresh process so the peak RSS reported for a
+format is that format's own. Running it for growing row counts shows that
+throughput stays flat and memory does not grow with the report.
+
+Usage:
+    python bench_report_export.py
+    python bench_report_export.py --rows 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from audit_log import AuditLog
+from report_export import EXPORT_FORMATS, export_report
+from reports import REPORT_COLUMNS, iter_report_chunks
+
+REPORT_TYPE = "User Activity Report"
+BRANCHES = ["Warsaw Central", "Krakow Main", "Gdansk Port", "Wroclaw HQ"]
+
+
+def build_log(directory, rows, days=30, seed=1):
+    rng = random.Random(seed)
+    audit_log = AuditLog(directory, flush_interval=0.5)
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / rows
+    for i in range(rows):
+        audit_log.log(
+            f"U{rng.randrange(90):02d}",
+            rng.choice(BRANCHES),
+            f"{rng.randrange(10**10, 10**11)}",
+            rng.lognormvariate(6.6, 0.25),
+            "Success",
+            flags=rng.randrange(16),
+            ts=start + i * step,
+        )
+    audit_log.close()
+    return start, datetime.now()
+
+
+def run_export(directory, format_option, start, end):
+    audit_log = AuditLog(directory)
+    extension, _ = EXPORT_FORMATS[format_option]
+    path = os.path.join(directory, f"bench{extension}")
+
+    started = time.perf_counter()
+    rows = export_report(
+        iter_report_chunks(audit_log, REPORT_TYPE, start, end),
+        REPORT_COLUMNS[REPORT_TYPE],
+        format_option,
+        path,
+        title=REPORT_TYPE,
+    )
+    elapsed = time.perf_counter() - started
+    audit_log.close()
+
+    size = os.path.getsize(path)
+    os.remove(path)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return rows, elapsed, size, peak_rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report export benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args()
+
+    print(
+        f"{'Rows':>10} {'Format':<14} {'Written':>10} {'Seconds':>8} "
+        f"{'Rows/s':>10} {'File MB':>8} {'Peak RSS MB':>12}"
+    )
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            start, end = build_log(directory, rows)
+            for format_option in EXPORT_FORMATS:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    written, elapsed, size, peak_rss_mb = pool.submit(
+                        run_export, directory, format_option, start, end
+                    ).result()
+                print(
+                    f"{rows:>10,} {format_option:<14} {written:>10,} "
+                    f"{elapsed:>8.1f} {written / elapsed:>10,.0f} "
+                    f"{size / 1e6:>8.1f} {peak_rss_mb:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Data Access Layer - pooled, asyncio-driven backend lookups.
+
+Queries run on a bounded pool of connections, each on its own worker thread,
+so a slow backend can neither exhaust the Streamlit server threads nor hang a
+teller's session:
+    - the pool never grows beyond max_size connections
+    - waiting for a free connection is bounded by acquire_timeout
+    - every query is bounded by a per-query timeout (the statement is
+      interrupted on expiry, not just abandoned)
+    - queue waits are recorded so pool pressure shows up in metrics
+
+The core banking database is stood in for by a local SQLite file. Lookups go
+to the nightly eligibility snapshot first and only hit the database for
+clients onboarded since the last snapshot.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+
+from eligibility_snapshot import ClientRecord, score_client
+from settings import DB_ACQUIRE_TIMEOUT, DB_PATH, DB_POOL_SIZE, DB_QUERY_TIMEOUT
+
+
+class PoolExhausted(Exception):
+    """No connection became free within the acquire timeout."""
+
+
+class QueryTimeout(Exception):
+    """A query ran longer than its time limit and was interrupted."""
+
+
+LookupResult = namedtuple("LookupResult", ["client", "source", "elapsed_ms"])
+
+
+class PoolMetrics:
+    """Counters and recent queue waits of a connection pool."""
+
+    def __init__(self, window=1_000):
+        self.acquired = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.opened = 0
+        self._waits_ms = deque(maxlen=window)
+
+    def record_wait(self, wait_ms):
+        self.acquired += 1
+        self._waits_ms.append(wait_ms)
+
+    def snapshot(self):
+        """Return a plain dict, safe to show in the UI."""
+        waits = sorted(self._waits_ms)
+        return {
+            "acquired": self.acquired,
+            "exhausted": self.exhausted,
+            "timeouts": self.timeouts,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "opened": self.opened,
+            "avg_wait_ms": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait_ms": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "max_wait_ms": waits[-1] if waits else 0.0,
+        }
+
+
+class AsyncConnectionPool:
+    """Bounded pool of blocking DB-API connections used from asyncio code."""
+
+    def __init__(self, connect, max_size=DB_POOL_SIZE, acquire_timeout=None):
+        self._connect = connect
+        self.max_size = max_size
+        self.acquire_timeout = (
+            DB_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+        )
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle = []
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_size, thread_name_prefix="db-pool"
+        )
+        self.metrics = PoolMetrics()
+
+    async def acquire(self):
+        started = time.perf_counter()
+        self.metrics.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.exhausted += 1
+            raise PoolExhausted("Connection pool exhausted") from None
+        finally:
+            self.metrics.waiting -= 1
+        self.metrics.record_wait((time.perf_counter() - started) * 1000)
+
+        try:
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                loop = asyncio.get_running_loop()
+                conn = await loop.run_in_executor(self.executor, self._connect)
+                self.metrics.opened += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        self.metrics.in_use += 1
+        return conn
+
+    def release(self, conn, discard=False, running=None):
+        """Return conn to the pool, or close it if discard. running is the
+        executor future of a statement that may still be on conn: the
+        connection is then closed only once the statement has stopped."""
+        self.metrics.in_use -= 1
+        if discard:
+            if running is not None and not running.done():
+                running.add_done_callback(lambda _: conn.close())
+            else:
+                conn.close()
+            self.metrics.opened -= 1
+        else:
+            self._idle.append(conn)
+        self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (sqlite3.DatabaseError, asyncio.CancelledError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Database:
+    """Async query helpers over a pooled SQLite connection."""
+
+    def __init__(self, path=DB_PATH, pool_size=DB_POOL_SIZE, query_timeout=None):
+        self.path = str(path)
+        self.query_timeout = (
+            DB_QUERY_TIMEOUT if query_timeout is None else query_timeout
+        )
+        self.pool = AsyncConnectionPool(self._connect, max_size=pool_size)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def _run(self, fetch, sql, params, timeout):
+        timeout = self.query_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+
+        conn = await self.pool.acquire()
+        future = None
+        discard = False
+        try:
+            future = loop.run_in_executor(
+                self.pool.executor, lambda: fetch(conn.execute(sql, params))
+            )
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                # Stop the statement so the connection can go back to the pool
+                conn.interrupt()
+                self.pool.metrics.timeouts += 1
+                try:
+                    await asyncio.shield(future)
+                except sqlite3.OperationalError:
+                    pass
+                raise QueryTimeout(f"Query exceeded {timeout:g}s limit") from None
+        except asyncio.CancelledError:
+            # The caller gave up first (e.g. an outer wait_for): stop the
+            # statement too, and keep its connection out of the pool
+            conn.interrupt()
+            discard = True
+            raise
+        except sqlite3.DatabaseError:
+            discard = True
+            raise
+        finally:
+            self.pool.release(conn, discard=discard, running=future)
+
+    async def fetch_one(self, sql, params=(), timeout=None):
+        return await self._run(lambda cur: cur.fetchone(), sql, params, timeout)
+
+    async def fetch_all(self, sql, params=(), timeout=None):
+        return await self._run(lambda cur: cur.fetchall(), sql, params, timeout)
+
+    def close(self):
+        self.pool.close()
+
+
+class BackgroundLoop:
+    """An asyncio event loop on a daemon thread, callable from sync code."""
+
+    def __init__(self, name="async-backend"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class ClientLookupService:
+    """Teller lookup path: nightly snapshot first, core banking DB fallback."""
+
+    CLIENT_SQL = """
+        SELECT client_id, customer_since, last_activity, segment,
+               risk_category, has_mortgage, in_arrears
+        FROM clients
+        WHERE client_id = ?
+    """
+
+    def __init__(self, snapshot, database):
+        self.snapshot = snapshot
+        self.database = database
+        self.snapshot_hits = 0
+        self.database_lookups = 0
+
+    async def lookup(self, client_id):
+        started = time.perf_counter()
+
+        self.snapshot.refresh_if_changed()
+        client = self.snapshot.lookup(client_id)
+        source = "snapshot"
+
+        if client is not None:
+            self.snapshot_hits += 1
+        else:
+            self.database_lookups += 1
+            row = await self.database.fetch_one(self.CLIENT_SQL, (int(client_id),))
+            client = self._score_row(row) if row is not None else None
+            source = "database"
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return LookupResult(client=client, source=source, elapsed_ms=elapsed_ms)
+
+    @staticmethod
+    def _score_row(row):
+        client = {
+            "as_of": date.today(),
+            "customer_since": date.fromisoformat(row["customer_since"]),
+            "last_activity": date.fromisoformat(row["last_activity"]),
+            "segment": row["segment"],
+            "risk_category": row["risk_category"],
+            "has_mortgage": bool(row["has_mortgage"]),
+            "in_arrears": bool(row["in_arrears"]),
+        }
+        return ClientRecord(
+            client_id=f"{row['client_id']:011d}",
+            customer_since=client["customer_since"],
+            last_activity=client["last_activity"],
+            flags=score_client(client),
+            segment=client["segment"],
+            risk_category=client["risk_category"],
+        )
+
+
+def create_demo_database(path=DB_PATH):
+    """Create the SQLite stand-in with a few clients onboarded today."""
+    today = date.today()
+    clients = [
+        (70012345678, today, today, "Standard", "Low", 0, 0),
+        (70023456789, today, today, "Premium", "Medium", 1, 0),
+        (70034567890, today - timedelta(days=1), today, "Business", "High", 0, 1),
+    ]
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clients (
+            client_id INTEGER PRIMARY KEY,
+            customer_since TEXT NOT NULL,
+            last_activity TEXT NOT NULL,
+            segment TEXT NOT NULL,
+            risk_category TEXT NOT NULL,
+            has_mortgage INTEGER NOT NULL,
+            in_arrears INTEGER NOT NULL
+        )
+    """)
+    conn.executemany(
+        "INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (client_id, since.isoformat(), last.isoformat(), *rest)
+            for client_id, since, last, *rest in clients
+        ],
+    )
+    conn.commit()
+    conn.close()
@@ -0,0 +1,306 @@
+"""
+Eligibility Snapshot - nightly precomputed product eligibility.
+
+Client data changes only with the nightly ETL sync, so eligibility is scored
+once per night for every client and written to a compact, sorted, fixed-width
+binary file. During the day the app memory-maps the file and finds a client
+with a binary search - no database round trip per lookup.
+
+Usage:
+    python eligibility_snapshot.py
+    python eligibility_snapshot.py --clients 2000000 --output data/eligibility.snap
+
+File layout (little-endian):
+    header  - magic "ELIG", format version, record size, record count,
+              build timestamp (epoch seconds)
+    records - client ID (u64), customer since (u32 ordinal), last activity
+              (u32 ordinal), product bitflags (u8), segment (u8), risk (u8),
+              padding; sorted by client ID
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import random
+import struct
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from settings import DEMO_CLIENT_COUNT, SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ELIG"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+RECORD = struct.Struct("<QIIBBBx")
+CLIENT_ID_KEY = struct.Struct("<Q")
+
+# Product bitflags, in the order they are shown on the lookup page
+CASH_LOAN = 1 << 0
+CREDIT_CARD = 1 << 1
+MORTGAGE_REFINANCING = 1 << 2
+INVESTMENT_PRODUCTS = 1 << 3
+
+PRODUCTS = [
+    ("Cash Loan", CASH_LOAN),
+    ("Credit Card", CREDIT_CARD),
+    ("Mortgage Refinancing", MORTGAGE_REFINANCING),
+    ("Investment Products", INVESTMENT_PRODUCTS),
+]
+
+SEGMENTS = ["Standard", "Premium", "Private Banking", "Business"]
+RISK_CATEGORIES = ["Low", "Medium", "High"]
+
+# Product limits by segment (PLN)
+CASH_LOAN_LIMITS = {
+    "Standard": 20_000,
+    "Premium": 50_000,
+    "Private Banking": 150_000,
+    "Business": 100_000,
+}
+CREDIT_CARD_LIMITS = {
+    "Standard": 5_000,
+    "Premium": 15_000,
+    "Private Banking": 40_000,
+    "Business": 25_000,
+}
+
+# Client IDs used in screenshots and the Admin Panel log, always present
+SAMPLE_CLIENT_IDS = [
+    "12345678901",
+    "98765432101",
+    "55566677788",
+    "11122233344",
+    "99988877766",
+    "44455566677",
+    "33344455566",
+]
+
+ClientRecord = namedtuple(
+    "ClientRecord",
+    [
+        "client_id",
+        "customer_since",
+        "last_activity",
+        "flags",
+        "segment",
+        "risk_category",
+    ],
+)
+
+
+def score_client(client):
+    """Return product eligibility bitflags for a single client."""
+    flags = 0
+    tenure_days = (client["as_of"] - client["customer_since"]).days
+    risk = client["risk_category"]
+
+    if risk != "High" and not client["in_arrears"]:
+        flags |= CASH_LOAN
+    if risk != "High" and tenure_days >= 365:
+        flags |= CREDIT_CARD
+    if client["has_mortgage"] and risk == "Low":
+        flags |= MORTGAGE_REFINANCING
+    if risk == "Low" or client["segment"] in ("Premium", "Private Banking"):
+        flags |= INVESTMENT_PRODUCTS
+
+    return flags
+
+
+def generate_mock_clients(count, as_of=None, seed=42):
+    """Generate a mock nightly client extract (the real one comes from ETL)."""
+    rng = random.Random(seed)
+    as_of = as_of or date.today()
+    first_day = date(2005, 1, 1)
+
+    client_ids = {int(client_id) for client_id in SAMPLE_CLIENT_IDS}
+    while len(client_ids) < count:
+        client_ids.add(rng.randrange(10**10, 10**11))
+
+    for client_id in client_ids:
+        customer_since = first_day + timedelta(
+            days=rng.randrange((as_of - first_day).days)
+        )
+        last_activity = as_of - timedelta(days=int(rng.expovariate(1 / 30)))
+        yield {
+            "client_id": client_id,
+            "as_of": as_of,
+            "customer_since": customer_since,
+            "last_activity": max(last_activity, customer_since),
+            "segment": rng.choices(SEGMENTS, weights=[60, 25, 5, 10])[0],
+            "risk_category": rng.choices(RISK_CATEGORIES, weights=[55, 35, 10])[0],
+            "has_mortgage": rng.random() < 0.3,
+            "in_arrears": rng.random() < 0.05,
+        }
+
+
+def build_snapshot(clients, path=SNAPSHOT_PATH):
+    """Score all clients and atomically write the sorted snapshot file."""
+    records = sorted(
+        (
+            int(client["client_id"]),
+            client["customer_since"].toordinal(),
+            client["last_activity"].toordinal(),
+            score_client(client),
+            SEGMENTS.index(client["segment"]),
+            RISK_CATEGORIES.index(client["risk_category"]),
+        )
+        for client in clients
+    )
+
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                RECORD.size,
+                len(records),
+                int(datetime.now().timestamp()),
+            )
+        )
+        buffer = bytearray(RECORD.size * 65_536)
+        for start in range(0, len(records), 65_536):
+            chunk = records[start : start + 65_536]
+            for i, record in enumerate(chunk):
+                RECORD.pack_into(buffer, i * RECORD.size, *record)
+            f.write(memoryview(buffer)[: len(chunk) * RECORD.size])
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Readers holding the old mapping keep working until they reopen
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+SnapshotView = namedtuple("SnapshotView", ["mapped", "stat", "count", "built_at"])
+
+
+class EligibilitySnapshot:
+    """Read-only, memory-mapped view over a snapshot file.
+
+    One instance is shared by every session. The mapping and its record count
+    are swapped together as one SnapshotView, and a lookup takes the view
+    once, so a refresh never mixes the old file with the new count. The old
+    mapping is not closed on refresh; it is unmapped once the last lookup
+    still reading it drops its reference.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._view = self._map()
+
+    @property
+    def count(self):
+        return self._view.count
+
+    @property
+    def built_at(self):
+        return self._view.built_at
+
+    def _map(self):
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # The mapping keeps its own handle; the file can be closed
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, record_size, count, built_at = HEADER.unpack_from(mapped)
+        except struct.error:
+            mapped.close()
+            raise ValueError(f"Truncated eligibility snapshot: {self.path}") from None
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            mapped.close()
+            raise ValueError(f"Unsupported eligibility snapshot: {self.path}")
+        if len(mapped) != HEADER.size + count * RECORD.size:
+            mapped.close()
+            raise ValueError(f"Truncated eligibility snapshot: {self.path}")
+
+        return SnapshotView(mapped, stat, count, datetime.fromtimestamp(built_at))
+
+    def refresh_if_changed(self):
+        """Remap the file if the nightly job replaced it. Returns True if so."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            current = self._view.stat
+            if (stat.st_ino, stat.st_mtime_ns) == (
+                current.st_ino,
+                current.st_mtime_ns,
+            ):
+                return False
+            try:
+                view = self._map()
+            except (ValueError, BufferError, OSError) as exc:
+                # Half-written or truncated: keep serving the previous mapping
+                logger.warning("Keeping the previous eligibility snapshot: %s", exc)
+                return False
+            self._view = view
+            return True
+
+    def lookup(self, client_id):
+        """Binary-search the snapshot. Returns a ClientRecord or None."""
+        key = int(client_id)
+        view = self._view
+        mapped = view.mapped
+        low, high = 0, view.count
+        while low < high:
+            mid = (low + high) // 2
+            if _key_at(mapped, mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+
+        if low == view.count or _key_at(mapped, low) != key:
+            return None
+
+        _, since, last, flags, segment, risk = RECORD.unpack_from(
+            mapped, HEADER.size + low * RECORD.size
+        )
+        return ClientRecord(
+            client_id=f"{key:011d}",
+            customer_since=date.fromordinal(since),
+            last_activity=date.fromordinal(last),
+            flags=flags,
+            segment=SEGMENTS[segment],
+            risk_category=RISK_CATEGORIES[risk],
+        )
+
+    def close(self):
+        """Unmap the current snapshot (at shutdown, when no lookups run)."""
+        self._view.mapped.close()
+
+    def __len__(self):
+        return self.count
+
+
+def _key_at(mapped, index):
+    return CLIENT_ID_KEY.unpack_from(mapped, HEADER.size + index * RECORD.size)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=DEMO_CLIENT_COUNT)
+    parser.add_argument("--output", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    started = datetime.now()
+    count = build_snapshot(generate_mock_clients(args.clients), args.output)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"Snapshot written to: {args.output}")
+    print(f"Scored {count:,} clients in {elapsed:.1f}s")
+    print(f"File size: {HEADER.size + count * RECORD.size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
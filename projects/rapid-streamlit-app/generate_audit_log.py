@@ -0,0 +1,136 @@
+"""
+Generate a synthetic audit log history for the Admin Panel and Reports pages.
+For mockup screenshot purposes - writes through the real AuditLog.
+
+Usage:
+    python generate_audit_log.py
+    python generate_audit_log.py --days 30 --per-day 1250
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from audit_log import AuditLog
+from eligibility_snapshot import SAMPLE_CLIENT_IDS
+from settings import AUDIT_DIR
+
+BRANCHES = {
+    "Warsaw Central": 0.34,
+    "Krakow Main": 0.25,
+    "Gdansk Port": 0.23,
+    "Wroclaw HQ": 0.13,
+    "Poznan City": 0.05,
+}
+
+SURNAMES = [
+    "KOWALSKI",
+    "NOWAK",
+    "WISNIEWSKI",
+    "WOJCIK",
+    "KAMINSKI",
+    "LEWANDOWSKI",
+    "ZIELINSKI",
+    "SZYMANSKI",
+    "WOZNIAK",
+    "DABROWSKI",
+    "KOZLOWSKI",
+    "JANKOWSKI",
+]
+
+# Queries per hour of the working day - bursts at opening and after lunch
+HOURLY_PROFILE = {
+    8: 6,
+    9: 14,
+    10: 13,
+    11: 10,
+    12: 8,
+    13: 11,
+    14: 10,
+    15: 9,
+    16: 7,
+    17: 3,
+}
+
+ERRORS = [
+    ("Timeout", "Query exceeded 30s limit", 0.002),
+    ("DB Error", "Connection pool exhausted", 0.001),
+    ("Validation", "Invalid client ID format", 0.002),
+]
+
+
+def generate_users(rng, count=89):
+    """Teller IDs with a skewed activity weight (a few heavy users)."""
+    users = []
+    for i in range(count):
+        user = f"{chr(65 + i % 26)}.{SURNAMES[i % len(SURNAMES)]}"
+        if i >= 26:
+            user += str(i // 26)
+        branch = rng.choices(list(BRANCHES), weights=list(BRANCHES.values()))[0]
+        users.append((user, branch, 1 / (i + 5)))
+    return users
+
+
+def generate_records(days, per_day, seed=7):
+    rng = random.Random(seed)
+    users = generate_users(rng)
+    weights = [weight for _, _, weight in users]
+    profile_total = sum(HOURLY_PROFILE.values())
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    for day_offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=day_offset)
+        volume = per_day * (0.35 if day.weekday() >= 5 else rng.uniform(0.8, 1.1))
+
+        timestamps = []
+        for hour, share in HOURLY_PROFILE.items():
+            for _ in range(int(volume * share / profile_total)):
+                timestamps.append(
+                    day + timedelta(hours=hour, seconds=rng.uniform(0, 3600))
+                )
+        timestamps = [ts for ts in sorted(timestamps) if ts <= datetime.now()]
+
+        for ts in timestamps:
+            user, branch, _ = rng.choices(users, weights=weights)[0]
+            client_id = (
+                rng.choice(SAMPLE_CLIENT_IDS)
+                if rng.random() < 0.05
+                else f"{rng.randrange(10**10, 10**11)}"
+            )
+            response_ms = rng.lognormvariate(6.6, 0.25)
+            status, detail, flags = "Success", "snapshot", rng.randrange(16)
+
+            roll = rng.random()
+            for error_status, error_detail, rate in ERRORS:
+                if roll < rate:
+                    status, detail, flags = error_status, error_detail, None
+                    if error_status == "Timeout":
+                        response_ms = 30_000.0
+                    break
+                roll -= rate
+            else:
+                if rng.random() < 0.03:
+                    status, detail, flags = "Not Found", "database", None
+
+            yield user, branch, client_id, response_ms, status, flags, detail, ts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the audit log")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--per-day", type=int, default=1_250)
+    args = parser.parse_args()
+
+    audit_log = AuditLog(AUDIT_DIR)
+    count = 0
+    for *fields, ts in generate_records(args.days, args.per_day):
+        audit_log.log(*fields, ts=ts)
+        count += 1
+    audit_log.close()
+
+    print(f"Audit log written to: {AUDIT_DIR}")
+    print(f"Inserted {count:,} records over {args.days} days.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Health Checks - concurrent system status probes for the Admin Panel.
+
+Each probe is a small class with an async check(). HealthMonitor runs all
+probes concurrently on the backend event loop, each under its own timeout,
+and caches the results for a short TTL. Concurrent refreshes while a check
+is in flight share that check, so many admins reloading the page cost one
+round of probes per TTL.
+"""
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime
+
+from settings import HEALTH_CHECK_TTL, HEALTH_PROBE_TIMEOUT
+
+OK, DEGRADED, DOWN = "ok", "degraded", "down"
+
+ProbeResult = namedtuple(
+    "ProbeResult", ["name", "status", "label", "detail", "latency_ms", "checked_at"]
+)
+
+
+class Probe(ABC):
+    """Base class: subclasses implement check() -> (status, label, detail)."""
+
+    name = "Probe"
+
+    def __init__(self, timeout=HEALTH_PROBE_TIMEOUT):
+        self.timeout = timeout
+
+    @abstractmethod
+    async def check(self):
+        """Probe the component and return (status, label, detail)."""
+
+
+class DatabaseProbe(Probe):
+    name = "Database Connection"
+
+    def __init__(self, database, timeout=HEALTH_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        self.database = database
+
+    async def check(self):
+        await self.database.fetch_one("SELECT 1", timeout=self.timeout)
+        metrics = self.database.pool.metrics.snapshot()
+        detail = (
+            f"Pool {metrics['in_use']}/{self.database.pool.max_size} in use, "
+            f"p95 wait {metrics['p95_wait_ms']:.0f} ms"
+        )
+        if metrics["waiting"] or metrics["in_use"] >= self.database.pool.max_size:
+            return DEGRADED, "Saturated", detail
+        return OK, "Connected", detail
+
+
+class EtlProbe(Probe):
+    """The nightly ETL is healthy if it produced today's snapshot."""
+
+    name = "ETL Pipeline"
+
+    def __init__(self, snapshot_path, max_age_hours=26, timeout=HEALTH_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        self.snapshot_path = snapshot_path
+        self.max_age_hours = max_age_hours
+
+    async def check(self):
+        try:
+            mtime = await asyncio.to_thread(os.path.getmtime, self.snapshot_path)
+        except FileNotFoundError:
+            return DOWN, "No snapshot", "Eligibility snapshot has never been built"
+
+        synced_at = datetime.fromtimestamp(mtime)
+        age_hours = (datetime.now() - synced_at).total_seconds() / 3600
+        detail = f"Last sync: {synced_at.strftime('%Y-%m-%d %I:%M %p')}"
+        if age_hours > 2 * self.max_age_hours:
+            return DOWN, "Stale", detail
+        if age_hours > self.max_age_hours:
+            return DEGRADED, "Delayed", detail
+        return OK, "Running", detail
+
+
+class CacheProbe(Probe):
+    """Share of lookups answered from the snapshot instead of the database."""
+
+    name = "Cache Status"
+
+    def __init__(self, lookup_service, min_hit_rate=0.8, timeout=HEALTH_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        self.lookup_service = lookup_service
+        self.min_hit_rate = min_hit_rate
+
+    async def check(self):
+        hits = self.lookup_service.snapshot_hits
+        total = hits + self.lookup_service.database_lookups
+        if not total:
+            return OK, "Active", "No lookups since startup"
+        hit_rate = hits / total
+        detail = f"Hit rate: {hit_rate:.0%} of {total:,} lookups"
+        if hit_rate < self.min_hit_rate:
+            return DEGRADED, "Low hit rate", detail
+        return OK, "Active", detail
+
+
+class HealthMonitor:
+    def __init__(self, probes, ttl=HEALTH_CHECK_TTL):
+        self.probes = probes
+        self.ttl = ttl
+        self._results = None
+        self._checked_at = 0.0
+        self._in_flight = None
+
+    async def check_all(self):
+        """Cached probe results, refreshing them if older than the TTL."""
+        if self._results is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._results
+
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(self._refresh())
+        try:
+            return await asyncio.shield(self._in_flight)
+        finally:
+            if self._in_flight is not None and self._in_flight.done():
+                self._in_flight = None
+
+    async def _refresh(self):
+        results = await asyncio.gather(*(self._run(probe) for probe in self.probes))
+        self._results = list(results)
+        self._checked_at = time.monotonic()
+        return self._results
+
+    async def _run(self, probe):
+        started = time.perf_counter()
+        try:
+            status, label, detail = await asyncio.wait_for(probe.check(), probe.timeout)
+        except asyncio.TimeoutError:
+            status, label = DOWN, "Timed out"
+            detail = f"No response within {probe.timeout:g}s"
+        except Exception as e:
+            status, label, detail = DOWN, "Error", str(e)
+        return ProbeResult(
+            name=probe.name,
+            status=status,
+            label=label,
+            detail=detail,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            checked_at=datetime.now(),
+        )
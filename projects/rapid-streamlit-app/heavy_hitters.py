@@ -0,0 +1,197 @@
+"""
+Heavy Hitters - Space-Saving top-K trackers for users and branches.
+
+Space-Saving (Metwally, Agrawal & El Abbadi, 2005) keeps at most `capacity`
+counters. An unseen item takes over the counter of the current minimum and
+inherits its count as the error bound, so every item more frequent than
+N / capacity is guaranteed to be tracked. Counters live in a Stream-Summary:
+a linked list of buckets ordered by count, so an update is O(1) and the top K
+are read by walking K items from the highest bucket.
+"""
+
+from datetime import datetime, timedelta
+
+
+class _Bucket:
+    __slots__ = ("count", "items", "lower", "higher")
+
+    def __init__(self, count):
+        self.count = count
+        self.items = {}
+        self.lower = None
+        self.higher = None
+
+
+class SpaceSaving:
+    """Approximate frequency counts of the most common items in a stream."""
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.total = 0
+        self._buckets = {}  # item -> bucket
+        self._errors = {}  # item -> overestimation bound
+        self._lowest = None
+        self._highest = None
+
+    def add(self, item):
+        self.total += 1
+        bucket = self._buckets.get(item)
+        if bucket is not None:
+            self._move_up(item, bucket)
+            return
+
+        if len(self._buckets) < self.capacity:
+            self._errors[item] = 0
+            self._insert_after(item, 1, None)
+            return
+
+        # Evict one item of the minimum count and let the new item take over
+        lowest = self._lowest
+        victim = next(iter(lowest.items))
+        self._detach(victim, lowest)
+        del self._errors[victim]
+        self._errors[item] = lowest.count
+        self._insert_after(item, lowest.count + 1, self._bucket_below(lowest))
+
+    def top(self, k):
+        """The k most frequent items as (item, count, error), highest first."""
+        result = []
+        bucket = self._highest
+        while bucket is not None and len(result) < k:
+            for item in bucket.items:
+                result.append((item, bucket.count, self._errors[item]))
+                if len(result) == k:
+                    break
+            bucket = bucket.lower
+        return result
+
+    def __len__(self):
+        return len(self._buckets)
+
+    # ----- Stream-Summary bookkeeping -----
+
+    def _bucket_below(self, bucket):
+        # The bucket may disappear once emptied, so remember its neighbour
+        return bucket.lower if not bucket.items else bucket
+
+    def _move_up(self, item, bucket):
+        anchor = bucket
+        self._detach(item, bucket)
+        if not bucket.items:
+            anchor = bucket.lower
+        self._insert_after(item, bucket.count + 1, anchor)
+
+    def _insert_after(self, item, count, anchor):
+        """Put item into the bucket of `count` at or just above `anchor`."""
+        higher = anchor.higher if anchor is not None else self._lowest
+        if anchor is not None and anchor.count == count:
+            bucket = anchor
+        elif higher is not None and higher.count == count:
+            bucket = higher
+        else:
+            bucket = _Bucket(count)
+            bucket.lower, bucket.higher = anchor, higher
+            if anchor is not None:
+                anchor.higher = bucket
+            else:
+                self._lowest = bucket
+            if higher is not None:
+                higher.lower = bucket
+            else:
+                self._highest = bucket
+        bucket.items[item] = None
+        self._buckets[item] = bucket
+
+    def _detach(self, item, bucket):
+        del bucket.items[item]
+        del self._buckets[item]
+        if bucket.items:
+            return
+        if bucket.lower is not None:
+            bucket.lower.higher = bucket.higher
+        else:
+            self._lowest = bucket.higher
+        if bucket.higher is not None:
+            bucket.higher.lower = bucket.lower
+        else:
+            self._highest = bucket.lower
+
+    # ----- persistence -----
+
+    def to_dict(self):
+        counters = []
+        bucket = self._lowest
+        while bucket is not None:
+            counters.extend(
+                [item, bucket.count, self._errors[item]] for item in bucket.items
+            )
+            bucket = bucket.higher
+        return {"capacity": self.capacity, "total": self.total, "counters": counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        tracker = cls(data["capacity"])
+        tracker.total = data["total"]
+        # Counters are stored lowest first, so each one lands on top (in the
+        # top bucket itself when it ties with it)
+        for item, count, error in data["counters"]:
+            tracker._errors[item] = error
+            tracker._insert_after(item, count, tracker._highest)
+        return tracker
+
+
+class DailyHeavyHitters:
+    """Space-Saving trackers per day and per dimension (user, branch)."""
+
+    DIMENSIONS = ("user", "branch")
+
+    def __init__(self, capacity=100, retention_days=7):
+        self.capacity = capacity
+        self.retention_days = retention_days
+        self.days = {}
+
+    def add(self, row):
+        day = row["ts"][:10]
+        trackers = self.days.get(day)
+        if trackers is None:
+            trackers = self.days[day] = {
+                dimension: SpaceSaving(self.capacity) for dimension in self.DIMENSIONS
+            }
+        for dimension in self.DIMENSIONS:
+            trackers[dimension].add(row[dimension])
+
+    def top(self, day, dimension, k=5):
+        trackers = self.days.get(day.strftime("%Y-%m-%d"))
+        return trackers[dimension].top(k) if trackers else []
+
+    def prune(self, now=None):
+        cutoff = (
+            (now or datetime.now()) - timedelta(days=self.retention_days)
+        ).strftime("%Y-%m-%d")
+        for day in [day for day in self.days if day < cutoff]:
+            del self.days[day]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "retention_days": self.retention_days,
+            "days": {
+                day: {
+                    dimension: tracker.to_dict()
+                    for dimension, tracker in trackers.items()
+                }
+                for day, trackers in self.days.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        heavy_hitters = cls(data["capacity"], data["retention_days"])
+        heavy_hitters.days = {
+            day: {
+                dimension: SpaceSaving.from_dict(tracker)
+                for dimension, tracker in trackers.items()
+            }
+            for day, trackers in data["days"].items()
+        }
+        return heavy_hitters
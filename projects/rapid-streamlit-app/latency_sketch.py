@@ -0,0 +1,198 @@
+"""
+Latency Sketches - mergeable streaming quantiles of response times.
+
+DDSketch keeps logarithmically sized buckets, so every quantile it returns is
+within relative_accuracy of the true value, sketches of any two time ranges
+merge by adding bucket counts, and memory stays at a few hundred buckets no
+matter how many values were added. HourlyLatency keeps one sketch per hour,
+so p50/p95/p99 of any window is a merge of at most a few dozen sketches
+instead of a rescan of the audit log. The last two days are also kept per
+minute, so a window that starts or ends within an hour (today so far, the
+same hours yesterday) covers exactly its minutes, not the whole hour.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+HOUR_FORMAT = "%Y-%m-%d %H"
+MINUTE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def hour_keys(start, end):
+    """First and last hour keys touched by the window [start, end)."""
+    last = end - timedelta(microseconds=1)
+    return start.strftime(HOUR_FORMAT), last.strftime(HOUR_FORMAT)
+
+
+class DDSketch:
+    """Relative-error quantile sketch (Masson, Rim & Lee, VLDB 2019)."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        if value <= 1e-9:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), or None for an empty sketch."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma**key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(key): count for key, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class HourlyLatency:
+    """One DDSketch per hour, pruned after retention_days, and one per
+    minute, pruned (whole hours at a time) after minute_retention_hours."""
+
+    def __init__(
+        self, relative_accuracy=0.01, retention_days=90, minute_retention_hours=48
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.retention_days = retention_days
+        self.minute_retention_hours = minute_retention_hours
+        self.hours = {}
+        self.minutes = {}
+
+    def add(self, ts, value):
+        # "YYYY-MM-DD HH" and "YYYY-MM-DD HH:MM" prefixes of the audit timestamp
+        for sketches, key in ((self.hours, ts[:13]), (self.minutes, ts[:16])):
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = DDSketch(self.relative_accuracy)
+            sketch.add(value)
+
+    def window(self, start, end):
+        """Merged sketch of [start, end), to the minute where the minutes of
+        its first and last hour are still kept (else to the hour)."""
+        merged = DDSketch(self.relative_accuracy)
+        start_key, last_key = hour_keys(start, end)
+        first_minute = start.strftime(MINUTE_FORMAT)
+        last_minute = (end - timedelta(microseconds=1)).strftime(MINUTE_FORMAT)
+        for hour, sketch in self.hours.items():
+            if not start_key <= hour <= last_key:
+                continue
+            minutes = [f"{hour}:{minute:02d}" for minute in range(60)]
+            partial = minutes[0] < first_minute or minutes[-1] > last_minute
+            if partial and any(key in self.minutes for key in minutes):
+                for key in minutes:
+                    if first_minute <= key <= last_minute and key in self.minutes:
+                        merged.merge(self.minutes[key])
+            else:
+                merged.merge(sketch)
+        return merged
+
+    def hourly_quantiles(self, start, end, quantiles=(0.5, 0.95, 0.99)):
+        """Rows of (hour, count, *quantiles) for every hour with data."""
+        start_key, last_key = hour_keys(start, end)
+        return [
+            (
+                datetime.strptime(hour, HOUR_FORMAT),
+                sketch.count,
+                *(sketch.quantile(q) for q in quantiles),
+            )
+            for hour, sketch in sorted(self.hours.items())
+            if start_key <= hour <= last_key
+        ]
+
+    def prune(self, now=None):
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=self.retention_days)).strftime(HOUR_FORMAT)
+        for hour in [hour for hour in self.hours if hour < cutoff]:
+            del self.hours[hour]
+        # Minutes go by whole hours, so an hour has all its minutes or none
+        cutoff = (now - timedelta(hours=self.minute_retention_hours)).strftime(
+            HOUR_FORMAT
+        )
+        for minute in [minute for minute in self.minutes if minute[:13] < cutoff]:
+            del self.minutes[minute]
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "retention_days": self.retention_days,
+            "minute_retention_hours": self.minute_retention_hours,
+            "hours": {hour: sketch.to_dict() for hour, sketch in self.hours.items()},
+            "minutes": {
+                minute: sketch.to_dict() for minute, sketch in self.minutes.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        latency = cls(
+            data["relative_accuracy"],
+            data["retention_days"],
+            data.get("minute_retention_hours", 48),
+        )
+        latency.hours = {
+            hour: DDSketch.from_dict(sketch) for hour, sketch in data["hours"].items()
+        }
+        # Checkpoints from before the minute sketches have none
+        latency.minutes = {
+            minute: DDSketch.from_dict(sketch)
+            for minute, sketch in data.get("minutes", {}).items()
+        }
+        return latency
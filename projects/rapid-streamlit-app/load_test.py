@@ -0,0 +1,310 @@
+"""
+Load test for the teller lookup path.
+
+Simulates N tellers against the same code the Client Eligibility Check page
+runs, without Streamlit: every teller is a thread (as a Streamlit session
+is) that waits a random think time, hands the lookup to the shared backend
+event loop, blocks for the result and writes the audit record. The snapshot,
+database and audit log are built in a temporary directory.
+
+Latency is measured per lookup as the teller sees it (including the hand-off
+to the event loop) and summarised with a DDSketch. A run can be saved as a
+baseline and later runs compared against it; the comparison exits with
+status 1 when throughput or latency regressed by more than the tolerance.
+
+Usage:
+    python load_test.py --tellers 89 --think-time 1.0 --duration 30
+    python load_test.py --save-baseline baseline.json
+    python load_test.py --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from audit_log import AuditLog
+from data_access import (
+    BackgroundLoop,
+    ClientLookupService,
+    Database,
+    PoolExhausted,
+    QueryTimeout,
+    create_demo_database,
+)
+from eligibility_snapshot import (
+    EligibilitySnapshot,
+    build_snapshot,
+    generate_mock_clients,
+)
+from latency_sketch import DDSketch
+
+# Clients onboarded today, only in the database (see create_demo_database)
+NEW_CLIENT_IDS = ["70012345678", "70023456789", "70034567890"]
+
+# Metrics compared against a baseline: (key, label, higher is better)
+METRICS = [
+    ("throughput", "Throughput (lookups/s)", True),
+    ("p50_ms", "p50 (ms)", False),
+    ("p95_ms", "p95 (ms)", False),
+    ("p99_ms", "p99 (ms)", False),
+]
+
+
+class Teller(threading.Thread):
+    def __init__(self, number, harness, rng):
+        super().__init__(name=f"teller-{number}", daemon=True)
+        self.number = number
+        self.harness = harness
+        self.rng = rng
+
+    def run(self):
+        harness = self.harness
+        if harness.ramp_up:
+            time.sleep(self.rng.uniform(0, harness.ramp_up))
+        while not harness.stop.is_set():
+            think_time = (
+                self.rng.expovariate(1 / harness.think_time)
+                if harness.think_time > 0
+                else 0
+            )
+            if harness.stop.wait(think_time):
+                break
+            harness.lookup(f"T{self.number:03d}", self.rng)
+
+
+class LoadTest:
+    def __init__(
+        self,
+        directory,
+        clients=100_000,
+        think_time=1.0,
+        ramp_up=0.0,
+        new_client_share=0.05,
+        not_found_share=0.02,
+        pool_size=None,
+    ):
+        directory = Path(directory)
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.new_client_share = new_client_share
+        self.not_found_share = not_found_share
+
+        mock_clients = list(generate_mock_clients(clients))
+        self.snapshot_ids = [f"{c['client_id']:011d}" for c in mock_clients]
+        build_snapshot(mock_clients, directory / "eligibility.snap")
+        create_demo_database(directory / "core_banking.db")
+
+        self.loop = BackgroundLoop(name="load-test-backend")
+        database_options = {} if pool_size is None else {"pool_size": pool_size}
+        self.database = Database(directory / "core_banking.db", **database_options)
+        self.service = ClientLookupService(
+            EligibilitySnapshot(directory / "eligibility.snap"), self.database
+        )
+        self.audit_log = AuditLog(directory / "audit")
+
+        self.stop = threading.Event()
+        self.latency = DDSketch()
+        self.outcomes = Counter()
+        self._lock = threading.Lock()
+
+    def pick_client(self, rng):
+        draw = rng.random()
+        if draw < self.new_client_share:
+            return rng.choice(NEW_CLIENT_IDS)
+        if draw < self.new_client_share + self.not_found_share:
+            return f"{rng.randrange(10**10, 10**11):011d}"
+        return rng.choice(self.snapshot_ids)
+
+    def lookup(self, user, rng):
+        """One teller lookup, as the Client Eligibility Check page runs it."""
+        client_id = self.pick_client(rng)
+        started = time.perf_counter()
+        try:
+            result = self.loop.run(self.service.lookup(client_id))
+        except (PoolExhausted, QueryTimeout) as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            status = "Timeout" if isinstance(e, QueryTimeout) else "DB Error"
+            self.audit_log.log(user, "Load Test", client_id, elapsed_ms, status)
+        else:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            status = "Success" if result.client is not None else "Not Found"
+            self.audit_log.log(
+                user,
+                "Load Test",
+                client_id,
+                result.elapsed_ms,
+                status,
+                flags=result.client.flags if result.client is not None else None,
+                detail=result.source,
+            )
+        with self._lock:
+            self.latency.add(elapsed_ms)
+            self.outcomes[status] += 1
+
+    def run(self, tellers, duration, seed=1):
+        rng = random.Random(seed)
+        threads = [
+            Teller(number, self, random.Random(rng.random()))
+            for number in range(1, tellers + 1)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        self.stop.wait(duration)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.audit_log.close()
+        self.database.close()
+        self.loop.stop()
+
+        lookups = sum(self.outcomes.values())
+        return {
+            "lookups": lookups,
+            "seconds": round(elapsed, 2),
+            "throughput": round(lookups / elapsed, 2),
+            "mean_ms": round(self.latency.mean, 3) if lookups else None,
+            "p50_ms": round(self.latency.quantile(0.5), 3) if lookups else None,
+            "p95_ms": round(self.latency.quantile(0.95), 3) if lookups else None,
+            "p99_ms": round(self.latency.quantile(0.99), 3) if lookups else None,
+            "outcomes": dict(self.outcomes),
+            "pool": self.database.pool.metrics.snapshot(),
+        }
+
+
+def compare(baseline, current, tolerance):
+    """Print current vs baseline; return the labels of regressed metrics."""
+    if baseline["config"] != current["config"]:
+        print("Warning: baseline was recorded with a different configuration")
+        print(f"  baseline: {baseline['config']}")
+        print(f"  current:  {current['config']}")
+
+    regressions = []
+    print(f"\n{'Metric':<24} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    for key, label, higher_is_better in METRICS:
+        before = baseline["results"][key]
+        after = current["results"][key]
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(label)
+        print(f"{label:<24} {before:>10,.2f} {after:>10,.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def non_negative(text):
+    value = float(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {text}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teller lookup load test")
+    parser.add_argument("--tellers", type=int, default=89)
+    parser.add_argument(
+        "--think-time",
+        type=non_negative,
+        default=1.0,
+        help="mean seconds between lookups (0 = back to back)",
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--ramp-up",
+        type=float,
+        default=0.0,
+        help="spread teller start over this many seconds (0 = opening burst)",
+    )
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--new-client-share", type=float, default=0.05)
+    parser.add_argument("--not-found-share", type=float, default=0.02)
+    parser.add_argument("--pool-size", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative regression when comparing (0.2 = 20%%)",
+    )
+    args = parser.parse_args()
+
+    config = {
+        "tellers": args.tellers,
+        "think_time": args.think_time,
+        "duration": args.duration,
+        "ramp_up": args.ramp_up,
+        "clients": args.clients,
+        "new_client_share": args.new_client_share,
+        "not_found_share": args.not_found_share,
+        "pool_size": args.pool_size,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Preparing {args.clients:,} clients...")
+        load_test = LoadTest(
+            directory,
+            clients=args.clients,
+            think_time=args.think_time,
+            ramp_up=args.ramp_up,
+            new_client_share=args.new_client_share,
+            not_found_share=args.not_found_share,
+            pool_size=args.pool_size,
+        )
+        print(f"Running {args.tellers} tellers for {args.duration:g}s...")
+        results = load_test.run(args.tellers, args.duration, seed=args.seed)
+
+    print(
+        f"\n{results['lookups']:,} lookups in {results['seconds']}s "
+        f"({results['throughput']:,.1f}/s)"
+    )
+    if results["lookups"]:
+        print(
+            f"Latency ms: mean {results['mean_ms']:.2f}  p50 {results['p50_ms']:.2f}  "
+            f"p95 {results['p95_ms']:.2f}  p99 {results['p99_ms']:.2f}"
+        )
+    print(f"Outcomes: {results['outcomes']}")
+    pool = results["pool"]
+    print(
+        f"DB pool: {pool['acquired']:,} acquired, {pool['exhausted']} exhausted, "
+        f"p95 wait {pool['p95_wait_ms']:.1f} ms"
+    )
+
+    run = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, run, args.tolerance)
+        if regressions:
+            print(f"\nRegressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,67 +5,167 @@ Admin Panel - Usage Statistics and Monitoring
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-import random
+
+from query_volume import resolution_for
+from services import (
+    get_audit_log,
+    get_backend_loop,
+    get_health_monitor,
+    get_telemetry,
+    start_background_services,
+)
 
 st.set_page_config(
     page_title="Admin Panel",
     page_icon="⚙️",
     layout="wide",
 )
+start_background_services()
 
 st.title("⚙️ Admin Panel")
 st.markdown("Monitor application usage and performance metrics.")
 
 st.divider()
 
+audit_log = get_audit_log()
+telemetry = get_telemetry()
+
+now = datetime.now()
+today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
 # Key metrics
 col1, col2, col3, col4 = st.columns(4)
 
+queries_today, errors_today = telemetry.volume_totals(today, now)
+queries_yesterday, errors_yesterday = telemetry.volume_totals(
+    today - timedelta(days=1), now - timedelta(days=1)
+)
+
 with col1:
     st.metric(
         label="Queries Today",
-        value="1,247",
-        delta="↑ 12%",
+        value=f"{queries_today:,}",
+        delta=(
+            f"{(queries_today / queries_yesterday - 1) * 100:+.0f}%"
+            if queries_yesterday
+            else None
+        ),
     )
 
 with col2:
+    active_users = telemetry.active_user_count(now)
+    active_yesterday = telemetry.active_user_count(now - timedelta(days=1))
     st.metric(
         label="Active Users",
-        value="89",
-        delta="↑ 5",
+        value=f"{active_users:,}",
+        delta=f"{active_users - active_yesterday:+d}",
+        help="Users with a lookup today, compared with yesterday at this time",
     )
 
 with col3:
+    # Same minutes yesterday, so the morning rush is compared like for like
+    latency_today = telemetry.latency_window(today, now)
+    latency_yesterday = telemetry.latency_window(
+        today - timedelta(days=1), now - timedelta(days=1)
+    )
+    p95_today = latency_today.quantile(0.95)
+    p95_yesterday = latency_yesterday.quantile(0.95)
+
     st.metric(
-        label="Avg Response Time",
-        value="0.8s",
-        delta="-0.2s",
-        delta_color="inverse"
+        label="p95 Response Time",
+        value=f"{p95_today / 1000:.2f}s" if p95_today is not None else "n/a",
+        delta=(
+            f"{(p95_today - p95_yesterday) / 1000:+.2f}s"
+            if p95_today is not None and p95_yesterday is not None
+            else None
+        ),
+        delta_color="inverse",
+        help="95% of today's lookups were faster than this",
     )
 
 with col4:
+    error_rate = errors_today / queries_today * 100 if queries_today else 0.0
+    error_rate_yesterday = (
+        errors_yesterday / queries_yesterday * 100 if queries_yesterday else 0.0
+    )
     st.metric(
         label="Error Rate",
-        value="0.3%",
-        delta="-0.1%",
+        value=f"{error_rate:.1f}%",
+        delta=f"{error_rate - error_rate_yesterday:+.1f}%",
         delta_color="inverse"
     )
 
 st.divider()
 
 # Usage over time
-st.subheader("📈 Query Volume (Last 7 Days)")
+VOLUME_WINDOWS = {
+    "Last Hour": timedelta(hours=1),
+    "Last 24 Hours": timedelta(days=1),
+    "Last 7 Days": timedelta(days=7),
+    "Last 30 Days": timedelta(days=30),
+    "Last 90 Days": timedelta(days=90),
+}
+DEFAULT_VOLUME_WINDOW = "Last 7 Days"
+
+
+@st.fragment(run_every="30s")
+def query_volume_chart():
+    """Re-reads only the pre-aggregated buckets, not the audit log."""
+    # Deselecting the active option leaves None: show the default window
+    window = st.session_state.get("volume_window") or DEFAULT_VOLUME_WINDOW
+    st.subheader(f"📈 Query Volume ({window})")
+    st.segmented_control(
+        "Window",
+        options=list(VOLUME_WINDOWS),
+        key="volume_window",
+        default=DEFAULT_VOLUME_WINDOW,
+        label_visibility="collapsed",
+    )
+
+    end = datetime.now()
+    if window.endswith("Days"):
+        # Whole calendar days, today included
+        end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+        end += timedelta(days=1)
+    start = end - VOLUME_WINDOWS[window]
+    resolution = resolution_for(start, end)
+    labels = {"minute": "%H:%M", "hour": "%m/%d %H:00", "day": "%m/%d"}
+
+    chart_data = pd.DataFrame(
+        telemetry.volume_series(start, end, resolution),
+        columns=["Date", "Queries", "Errors"],
+    )
+    chart_data["Date"] = chart_data["Date"].dt.strftime(labels[resolution])
 
-# Generate mock data for chart
-dates = [(datetime.now() - timedelta(days=i)).strftime("%m/%d") for i in range(6, -1, -1)]
-queries = [890, 1102, 987, 1245, 1189, 1320, 1247]
+    st.bar_chart(chart_data.set_index("Date")[["Queries"]])
+    st.caption(f"{chart_data['Queries'].sum():,} queries, one bar per {resolution}")
 
-chart_data = pd.DataFrame({
-    "Date": dates,
-    "Queries": queries
-})
 
-st.bar_chart(chart_data.set_index("Date"))
+query_volume_chart()
+
+st.divider()
+
+# Response time percentiles, from the hourly latency sketches
+st.subheader("⏱️ Response Time Percentiles (Today)")
+
+col1, col2, col3 = st.columns(3)
+for col, label, q in [(col1, "p50", 0.5), (col2, "p95", 0.95), (col3, "p99", 0.99)]:
+    value = latency_today.quantile(q)
+    col.metric(label, f"{value:,.0f} ms" if value is not None else "n/a")
+
+hourly = telemetry.hourly_latency(today, now)
+if hourly:
+    latency_data = pd.DataFrame(
+        hourly, columns=["Hour", "Queries", "p50", "p95", "p99"]
+    )
+    latency_data["Hour"] = latency_data["Hour"].dt.strftime("%H:00")
+    st.line_chart(latency_data.set_index("Hour")[["p50", "p95", "p99"]])
+    st.caption(
+        f"Response time (ms) per hour from {latency_today.count:,} lookups "
+        "(streaming sketch, ±1% relative accuracy)"
+    )
+else:
+    st.caption("No lookups logged today yet.")
 
 st.divider()
 
@@ -75,52 +175,13 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.subheader("📋 Recent Queries")
 
+    recent = audit_log.recent(limit=7)
     log_data = {
-        "Timestamp": [
-            "2024-01-19 14:32:15",
-            "2024-01-19 14:31:58",
-            "2024-01-19 14:31:42",
-            "2024-01-19 14:31:28",
-            "2024-01-19 14:31:05",
-            "2024-01-19 14:30:51",
-            "2024-01-19 14:30:33",
-        ],
-        "User": [
-            "J.KOWALSKI",
-            "M.NOWAK",
-            "A.WISNIEWSKI",
-            "K.WOJCIK",
-            "J.KOWALSKI",
-            "P.KAMINSKI",
-            "M.NOWAK",
-        ],
-        "Client ID": [
-            "98765432101",
-            "12345678901",
-            "55566677788",
-            "11122233344",
-            "99988877766",
-            "44455566677",
-            "33344455566",
-        ],
-        "Response (ms)": [
-            "823",
-            "756",
-            "912",
-            "689",
-            "801",
-            "734",
-            "867",
-        ],
-        "Status": [
-            "Success",
-            "Success",
-            "Success",
-            "Success",
-            "Success",
-            "Success",
-            "Error",
-        ]
+        "Timestamp": [row["ts"][:19] for row in recent],
+        "User": [row["user"] for row in recent],
+        "Client ID": [row["client_id"] for row in recent],
+        "Response (ms)": [round(row["response_ms"]) for row in recent],
+        "Status": [row["status"] for row in recent],
     }
 
     df_log = pd.DataFrame(log_data)
@@ -129,9 +190,10 @@ with col1:
 with col2:
     st.subheader("👥 Top Users Today")
 
+    top_users = telemetry.top(today, "user", k=5)
     users_data = {
-        "User": ["J.KOWALSKI", "M.NOWAK", "A.WISNIEWSKI", "K.WOJCIK", "P.KAMINSKI"],
-        "Queries": [156, 142, 128, 115, 98]
+        "User": [user for user, _, _ in top_users],
+        "Queries": [count for _, count, _ in top_users]
     }
 
     df_users = pd.DataFrame(users_data)
@@ -140,32 +202,35 @@ with col2:
     st.divider()
 
     st.subheader("🏢 Branch Activity")
+    top_branches = telemetry.top(today, "branch", k=5)
     branch_data = {
-        "Branch": ["Warsaw Central", "Krakow Main", "Gdansk Port", "Wroclaw HQ"],
-        "Queries": [423, 312, 287, 225]
+        "Branch": [branch for branch, _, _ in top_branches],
+        "Queries": [count for _, count, _ in top_branches]
     }
 
     df_branch = pd.DataFrame(branch_data)
     st.dataframe(df_branch, use_container_width=True, hide_index=True)
 
+    # Space-Saving counts can only overestimate, by at most the error bound
+    max_error = max((error for _, _, error in top_users + top_branches), default=0)
+    if max_error:
+        st.caption(f"Approximate counts (may overstate by up to {max_error})")
+
 st.divider()
 
 # System status
 st.subheader("🖥️ System Status")
 
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.markdown("**Database Connection**")
-    st.markdown("🟢 Connected")
-    st.caption("Last check: 2 min ago")
+STATUS_ICONS = {"ok": "🟢", "degraded": "🟡", "down": "🔴"}
 
-with col2:
-    st.markdown("**ETL Pipeline**")
-    st.markdown("🟢 Running")
-    st.caption("Last sync: 06:00 AM")
+probe_results = get_backend_loop().run(get_health_monitor().check_all())
 
-with col3:
-    st.markdown("**Cache Status**")
-    st.markdown("🟢 Active")
-    st.caption("Hit rate: 94%")
+for col, result in zip(st.columns(len(probe_results)), probe_results):
+    with col:
+        st.markdown(f"**{result.name}**")
+        st.markdown(f"{STATUS_ICONS[result.status]} {result.label}")
+        st.caption(result.detail)
+        st.caption(
+            f"Probe: {result.latency_ms:.1f} ms, "
+            f"checked {result.checked_at.strftime('%H:%M:%S')}"
+        )
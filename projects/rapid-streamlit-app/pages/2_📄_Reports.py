@@ -6,11 +6,26 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
+from report_export import EXPORT_FORMATS
+from report_jobs import DONE, QUEUED, RUNNING, TooManyJobs
+from report_scheduler import CronSchedule
+from report_query import ALL_BRANCHES, describe_filters, make_filters
+from reports import REPORT_COLUMNS, count_rows, date_range, report_page
+from services import (
+    get_audit_log,
+    get_report_cache,
+    get_report_jobs,
+    get_report_scheduler,
+    start_background_services,
+)
+from settings import CURRENT_USER
+
 st.set_page_config(
     page_title="Reports",
     page_icon="📄",
     layout="centered",
 )
+start_background_services()
 
 st.title("📄 Generate Reports")
 st.markdown("Export usage data and eligibility check reports.")
@@ -22,13 +37,7 @@ st.subheader("📊 Report Configuration")
 
 report_type = st.selectbox(
     "Report Type",
-    options=[
-        "Daily Usage Summary",
-        "User Activity Report",
-        "Eligibility Statistics",
-        "Error Log Export",
-        "Branch Performance"
-    ]
+    options=list(REPORT_COLUMNS)
 )
 
 col1, col2 = st.columns(2)
@@ -53,8 +62,8 @@ col1, col2 = st.columns(2)
 with col1:
     branch_filter = st.multiselect(
         "Branch",
-        options=["All Branches", "Warsaw Central", "Krakow Main", "Gdansk Port", "Wroclaw HQ", "Poznan City"],
-        default=["All Branches"]
+        options=[ALL_BRANCHES, "Warsaw Central", "Krakow Main", "Gdansk Port", "Wroclaw HQ", "Poznan City"],
+        default=[ALL_BRANCHES]
     )
 
 with col2:
@@ -73,80 +82,239 @@ st.divider()
 
 # Generate button
 if st.button("📥 Generate Report", type="primary", use_container_width=True):
-    with st.spinner("Generating report..."):
-        import time
-        time.sleep(1)
+    start, end = date_range(start_date, end_date)
+    filters = make_filters(branch_filter, user_filter)
+    try:
+        job_id = get_report_jobs().submit(
+            CURRENT_USER, report_type, format_option, start, end, filters
+        )
+    except ValueError as e:
+        st.error(f"❌ {e}")
+    except TooManyJobs as e:
+        st.warning(f"⚠️ {e}. Wait for one to finish before starting another.")
+    else:
+        st.session_state["selected_job"] = job_id
+        st.toast(f"Report queued (job {job_id})")
+
+
+def job_scope(job):
+    """Period and filters of a job, e.g. "2024-01-01 – 2024-01-07 · Krakow Main"."""
+    scope = f"{job.start:%Y-%m-%d} – {job.end - timedelta(days=1):%Y-%m-%d}"
+    if describe_filters(job.filters):
+        scope += f" · {describe_filters(job.filters)}"
+    return scope
+
+
+@st.fragment(run_every="2s")
+def report_jobs():
+    """Progress of this user's reports, refreshed without rerunning the page."""
+    jobs = get_report_jobs().jobs_for(CURRENT_USER)
+    if not jobs:
+        return
+
+    st.subheader("🗂️ My Reports")
+    for job in jobs:
+        with st.container(border=True):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(f"**{job.report_type}** · {job.format_option} · {job_scope(job)}")
+                if job.status == QUEUED:
+                    st.caption("⏳ Queued")
+                elif job.status == RUNNING:
+                    st.caption(
+                        f"⚙️ Generating… {job.rows_written:,} rows written "
+                        f"({job.elapsed:.0f}s)"
+                    )
+                elif job.status == DONE:
+                    st.caption(
+                        f"✅ {job.rows_written:,} rows in {job.elapsed:.1f}s · "
+                        f"finished {job.finished_at:%Y-%m-%d %H:%M}"
+                    )
+                else:
+                    st.caption(f"❌ Failed: {job.error}")
+            with col2:
+                if job.status == DONE:
+                    try:
+                        with open(get_report_jobs().path_of(job), "rb") as f:
+                            st.download_button(
+                                label="⬇️ Download",
+                                data=f,
+                                file_name=job.file_name,
+                                mime=job.mime,
+                                key=f"download_{job.job_id}",
+                                use_container_width=True,
+                            )
+                    except FileNotFoundError:
+                        # Expired after the jobs were listed
+                        st.caption("File no longer available")
+
+            if job.job_id != st.session_state.get("selected_job"):
+                if st.button("👁️ Preview", key=f"preview_{job.job_id}"):
+                    st.session_state["selected_job"] = job.job_id
+                    st.rerun()
+
+
+PREVIEW_PAGE_SIZE = 25
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def report_size(report_type, start, end, filters):
+    return count_rows(
+        get_audit_log(),
+        report_type,
+        start,
+        end,
+        cache=get_report_cache(),
+        filters=filters,
+    )
 
-    st.success("Report generated successfully!")
 
-    # Show preview
+@st.fragment
+def report_preview(job):
+    """One page of the full report; paging reruns only this fragment."""
     st.subheader("📋 Report Preview")
+    st.caption(f"{job.report_type} · {job_scope(job)}")
 
-    if report_type == "Daily Usage Summary":
-        preview_data = {
-            "Date": ["2024-01-19", "2024-01-18", "2024-01-17", "2024-01-16", "2024-01-15"],
-            "Total Queries": [1247, 1320, 1189, 1245, 987],
-            "Unique Users": [89, 92, 85, 88, 78],
-            "Avg Response (ms)": [823, 812, 856, 798, 834],
-            "Error Count": [4, 2, 5, 3, 6]
-        }
-    elif report_type == "User Activity Report":
-        preview_data = {
-            "User ID": ["J.KOWALSKI", "M.NOWAK", "A.WISNIEWSKI", "K.WOJCIK", "P.KAMINSKI"],
-            "Total Queries": [1245, 1102, 987, 876, 765],
-            "Eligible Results": [1089, 956, 845, 756, 678],
-            "Not Eligible": [156, 146, 142, 120, 87],
-            "Branch": ["Warsaw Central", "Krakow Main", "Gdansk Port", "Warsaw Central", "Wroclaw HQ"]
-        }
-    elif report_type == "Eligibility Statistics":
-        preview_data = {
-            "Product": ["Cash Loan", "Credit Card", "Mortgage Refinancing", "Investment Products", "Insurance"],
-            "Queries": [2456, 1987, 892, 1234, 567],
-            "Eligible %": ["78.3%", "82.1%", "34.5%", "91.2%", "88.7%"],
-            "Not Eligible %": ["21.7%", "17.9%", "65.5%", "8.8%", "11.3%"],
-            "Trend": ["↑", "↑", "↓", "→", "↑"]
-        }
-    else:
-        preview_data = {
-            "Timestamp": ["2024-01-19 14:32:15", "2024-01-19 12:15:42", "2024-01-18 16:45:33"],
-            "Type": ["Timeout", "DB Error", "Validation"],
-            "User": ["M.NOWAK", "K.WOJCIK", "A.WISNIEWSKI"],
-            "Details": ["Query exceeded 30s limit", "Connection pool exhausted", "Invalid client ID format"]
-        }
-
-    df_preview = pd.DataFrame(preview_data)
-    st.dataframe(df_preview, use_container_width=True, hide_index=True)
-
-    st.caption(f"Showing first 5 rows of {len(df_preview) * 20} total records")
-
-    # Download button
-    st.download_button(
-        label="⬇️ Download Full Report",
-        data=b"mock_report_content",
-        file_name=f"report_{report_type.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True
+    # Cursors of the pages visited so far; the last one is the current page
+    cursors = st.session_state.setdefault(f"preview_cursors_{job.job_id}", [None])
+    rows, next_cursor = report_page(
+        get_audit_log(),
+        job.report_type,
+        job.start,
+        job.end,
+        after=cursors[-1],
+        page_size=PREVIEW_PAGE_SIZE,
+        cache=get_report_cache(),
+        filters=job.filters,
     )
+    total, exact = report_size(job.report_type, job.start, job.end, job.filters)
+
+    st.dataframe(
+        pd.DataFrame(rows, columns=job.columns),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    first_row = (len(cursors) - 1) * PREVIEW_PAGE_SIZE + 1
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        st.button(
+            "◀ Previous",
+            on_click=cursors.pop,
+            disabled=len(cursors) == 1,
+            use_container_width=True,
+        )
+    with col2:
+        if rows:
+            shown = f"Rows {first_row:,}–{first_row + len(rows) - 1:,}"
+            if exact:
+                st.caption(f"{shown} of {total:,} total records")
+            else:
+                st.caption(f"{shown} of ~{total:,} total records (estimated)")
+        else:
+            st.caption("No records in this period")
+    with col3:
+        st.button(
+            "Next ▶",
+            on_click=cursors.append,
+            args=(next_cursor,),
+            disabled=next_cursor is None,
+            use_container_width=True,
+        )
+
+
+report_jobs()
+
+selected_job = get_report_jobs().get(st.session_state.get("selected_job"))
+if selected_job is not None:
+    report_preview(selected_job)
 
 st.divider()
 
 # Scheduled reports section
 st.subheader("📅 Scheduled Reports")
 
-st.info("Configure automatic report generation and delivery.")
+st.info("Scheduled reports are delivered to the outbox for the mail relay to send.")
 
-scheduled_data = {
-    "Report": ["Daily Usage Summary", "Weekly User Activity", "Monthly Eligibility Stats"],
-    "Frequency": ["Daily @ 07:00", "Weekly (Monday)", "Monthly (1st)"],
-    "Recipients": ["team@bank.pl", "managers@bank.pl", "analytics@bank.pl"],
-    "Status": ["Active", "Active", "Paused"]
-}
+scheduler = get_report_scheduler()
+schedules = scheduler.schedules()
 
-df_scheduled = pd.DataFrame(scheduled_data)
+df_scheduled = pd.DataFrame(
+    {
+        "Report": [s["name"] for s in schedules],
+        "Frequency": [CronSchedule(s["cron"]).describe() for s in schedules],
+        "Recipients": [s["recipients"] for s in schedules],
+        "Status": ["Active" if s["active"] else "Paused" for s in schedules],
+        "Next Run": [s["next_fire"][:16].replace("T", " ") if s["active"] else "—" for s in schedules],
+        "Last Run": [
+            f"{s['last_run'][:16].replace('T', ' ')} ({s['last_status']})" if s["last_run"] else "—"
+            for s in schedules
+        ],
+        "Avg Duration": [
+            f"{s['avg_duration_s']:.1f}s" if s["avg_duration_s"] is not None else "—"
+            for s in schedules
+        ],
+    }
+)
 st.dataframe(df_scheduled, use_container_width=True, hide_index=True)
 
+# Failed runs are retried automatically; show them until a run succeeds
+for s in schedules:
+    if s["last_status"] == "failed":
+        st.warning(f"⚠️ {s['name']}: last run failed ({s['last_error']}). Failed runs are retried automatically, see the run history.")
+
 col1, col2 = st.columns(2)
 with col1:
-    st.button("➕ Add Scheduled Report", use_container_width=True)
+    with st.popover("➕ Add Scheduled Report", use_container_width=True):
+        with st.form("add_schedule", border=False):
+            name = st.text_input("Name", placeholder="e.g. Weekly Branch Performance")
+            new_report_type = st.selectbox("Report", options=list(REPORT_COLUMNS))
+            cron = st.text_input(
+                "Schedule (cron: minute hour day month weekday)",
+                value="0 7 * * *",
+                help="0 7 * * * = daily at 07:00, 0 7 * * 1 = Mondays, 0 7 1 * * = 1st of the month",
+            )
+            recipients = st.text_input("Recipients (comma separated)")
+            new_format = st.radio("Format", options=list(EXPORT_FORMATS), horizontal=True)
+            if st.form_submit_button("Add", type="primary"):
+                try:
+                    scheduler.add(
+                        name or new_report_type, new_report_type, cron, recipients, new_format
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.rerun()
 with col2:
-    st.button("✏️ Manage Schedules", use_container_width=True)
+    with st.popover("✏️ Manage Schedules", use_container_width=True):
+        selected = st.selectbox(
+            "Schedule",
+            options=schedules,
+            format_func=lambda s: s["name"],
+        )
+        if selected:
+            col_a, col_b = st.columns(2)
+            with col_a:
+                label = "⏸️ Pause" if selected["active"] else "▶️ Resume"
+                if st.button(label, use_container_width=True):
+                    scheduler.set_active(selected["schedule_id"], not selected["active"])
+                    st.rerun()
+            with col_b:
+                if st.button("🗑️ Remove", use_container_width=True):
+                    scheduler.remove(selected["schedule_id"])
+                    st.rerun()
+
+history = scheduler.history(limit=20)
+if history:
+    names = {s["schedule_id"]: s["name"] for s in schedules}
+    with st.expander("🕒 Run history"):
+        df_history = pd.DataFrame(
+            {
+                "Report": [names.get(run["schedule_id"], "(removed)") for run in history],
+                "Scheduled For": [run["scheduled_for"][:16].replace("T", " ") for run in history],
+                "Duration (s)": [round(run["duration_s"], 1) for run in history],
+                "Rows": [run["rows"] for run in history],
+                "Status": [run["status"] if not run["error"] else f"failed: {run['error']}" for run in history],
+            }
+        )
+        st.dataframe(df_history, use_container_width=True, hide_index=True)
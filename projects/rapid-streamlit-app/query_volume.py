@@ -0,0 +1,116 @@
+"""
+Query Volume - pre-aggregated query counters in time buckets.
+
+Every audit record increments a per-minute counter. Over time, counters are
+compacted into coarser buckets (minutes into hours after two days, hours into
+days after five weeks), so the whole history fits in a few thousand buckets.
+A chart for any window from one hour to 90 days is read from these buckets,
+with a cost that depends on the retention settings only - not on how many
+queries were logged or how long the app has been running.
+
+Bucket keys are prefixes of the audit timestamp ("YYYY-MM-DD HH:MM" for a
+minute, "YYYY-MM-DD HH" for an hour, "YYYY-MM-DD" for a day), so compacting a
+bucket is just truncating its key.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from audit_log import ERROR_STATUSES
+
+Tier = namedtuple("Tier", ["name", "key_format", "key_length", "step", "keep"])
+
+TIERS = [
+    Tier("minute", "%Y-%m-%d %H:%M", 16, timedelta(minutes=1), timedelta(days=2)),
+    Tier("hour", "%Y-%m-%d %H", 13, timedelta(hours=1), timedelta(days=35)),
+    Tier("day", "%Y-%m-%d", 10, timedelta(days=1), timedelta(days=400)),
+]
+TIER_BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+def floor_to(value, tier):
+    """Start of the bucket of `tier` that contains `value`."""
+    return datetime.strptime(value.strftime(tier.key_format), tier.key_format)
+
+
+def resolution_for(start, end, now=None):
+    """Finest bucket size that is still kept for the window and fits a chart."""
+    now = now or datetime.now()
+    span = end - start
+    if span <= timedelta(hours=2) and now - start <= TIERS[0].keep:
+        return "minute"
+    if span <= timedelta(days=2) and now - start <= TIERS[1].keep:
+        return "hour"
+    return "day"
+
+
+class QueryVolume:
+    def __init__(self):
+        self.buckets = {tier.name: {} for tier in TIERS}
+
+    def add(self, row):
+        counter = self.buckets["minute"].setdefault(row["ts"][:16], [0, 0])
+        counter[0] += 1
+        counter[1] += row["status"] in ERROR_STATUSES
+
+    def compact(self, now=None):
+        """Fold expired buckets into the next coarser tier, drop the oldest."""
+        now = now or datetime.now()
+        for tier, coarser in zip(TIERS, TIERS[1:] + [None]):
+            cutoff = (now - tier.keep).strftime(tier.key_format)
+            buckets = self.buckets[tier.name]
+            for key in [key for key in buckets if key < cutoff]:
+                queries, errors = buckets.pop(key)
+                if coarser is None:
+                    continue
+                target = self.buckets[coarser.name].setdefault(
+                    key[: coarser.key_length], [0, 0]
+                )
+                target[0] += queries
+                target[1] += errors
+
+    def series(self, start, end, resolution):
+        """(bucket start, queries, errors) for every bucket of the window."""
+        tier = TIER_BY_NAME[resolution]
+        counts = {}
+        bucket = floor_to(start, tier)
+        while bucket < end:
+            counts[bucket.strftime(tier.key_format)] = [0, 0]
+            bucket += tier.step
+
+        # Finer tiers roll up into the requested buckets; coarser ones can't
+        for finer in TIERS[: TIERS.index(tier) + 1]:
+            for key, (queries, errors) in self.buckets[finer.name].items():
+                counter = counts.get(key[: tier.key_length])
+                if counter is not None:
+                    counter[0] += queries
+                    counter[1] += errors
+
+        return [
+            (datetime.strptime(key, tier.key_format), queries, errors)
+            for key, (queries, errors) in counts.items()
+        ]
+
+    def totals(self, start, end):
+        """Total queries and errors of [start, end), from the finest buckets
+        kept: to the minute over the last two days, so today so far and the
+        same time yesterday cover the same minutes."""
+        queries = errors = 0
+        last = end - timedelta(microseconds=1)
+        for tier in TIERS:
+            first_key = start.strftime(tier.key_format)
+            last_key = last.strftime(tier.key_format)
+            for key, (count, error_count) in self.buckets[tier.name].items():
+                if first_key <= key <= last_key:
+                    queries += count
+                    errors += error_count
+        return queries, errors
+
+    def to_dict(self):
+        return {"buckets": self.buckets}
+
+    @classmethod
+    def from_dict(cls, data):
+        volume = cls()
+        volume.buckets.update(data["buckets"])
+        return volume
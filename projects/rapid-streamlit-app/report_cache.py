@@ -0,0 +1,202 @@
+"""
+Report Cache - per-day partitions of summary report results.
+
+Summary reports are computed as one partial result per calendar day and the
+partials are merged into the final rows. Each partial is cached under
+(report_type, filters, day), so a range shifted by a day recomputes one day
+and reuses the rest.
+
+Records are normally stamped with the current time, so a day that has
+ended rarely changes again:
+    - a partition computed after its day ended is complete and kept until it
+      has gone unused for REPORT_CACHE_RETENTION
+    - a partition of a day still in progress (today) is only reused for
+      REPORT_CACHE_PARTIAL_TTL seconds, then recomputed
+    - records can be backdated, though: attach() subscribes the cache to the
+      audit log, and every committed record drops the complete partitions of
+      its day. The sequence number of the last record seen is stored with
+      the partitions, so records committed while the cache was not attached
+      are caught up on the next attach()
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from settings import (
+    REPORT_CACHE_PARTIAL_TTL,
+    REPORT_CACHE_PATH,
+    REPORT_CACHE_RETENTION,
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS partitions (
+        report_type TEXT NOT NULL,
+        filters TEXT NOT NULL,
+        day TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        complete INTEGER NOT NULL,
+        computed_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (report_type, filters, day)
+    );
+    CREATE TABLE IF NOT EXISTS state (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+"""
+
+# A day counts as ended once records stamped before midnight have surely been
+# committed by the audit log writer
+SETTLE_TIME = timedelta(minutes=1)
+
+# Seconds between saves of the last seen sequence number while no record
+# lands in a finished day
+WATERMARK_INTERVAL = 60.0
+
+
+class ReportCache:
+    def __init__(
+        self,
+        path=REPORT_CACHE_PATH,
+        partial_ttl=REPORT_CACHE_PARTIAL_TTL,
+        retention=REPORT_CACHE_RETENTION,
+    ):
+        self.path = str(path)
+        self.partial_ttl = partial_ttl
+        self.retention = retention
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._generations = {}  # day -> records seen in it while attached
+        self._last_seq = None
+        self._saved_at = 0.0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self.purge()
+
+    def attach(self, audit_log, batch_size=10_000):
+        """Invalidate days that receive records from now on, after catching up
+        on the records committed since the cache last saw one."""
+        audit_log.subscribe(self.observe)
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = 'last_seq'"
+        ).fetchone()
+        if row is None:
+            # Nothing is known about the partitions' age: start from scratch
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM partitions")
+            self._save_last_seq(audit_log.last_seq)
+            return
+
+        batch = []
+        for record in audit_log.read_since(row[0]):
+            batch.append(record)
+            if len(batch) == batch_size:
+                self.observe(batch)
+                batch = []
+        self.observe(batch)
+
+    def observe(self, rows):
+        """Drop the complete partitions of the days the records fall in."""
+        if not rows:
+            return
+        days = {row["ts"][:10] for row in rows}
+        last_seq = max(row["seq"] for row in rows)
+        finished = {day for day in days if day < datetime.now().strftime("%Y-%m-%d")}
+        with self._lock:
+            for day in days:
+                self._generations[day] = self._generations.get(day, 0) + 1
+            if finished:
+                with self._conn:
+                    self._conn.executemany(
+                        "DELETE FROM partitions WHERE day = ? AND complete = 1",
+                        [(day,) for day in finished],
+                    )
+        if finished or time.monotonic() - self._saved_at >= WATERMARK_INTERVAL:
+            self._save_last_seq(last_seq)
+        else:
+            self._last_seq = max(self._last_seq or 0, last_seq)
+
+    def _save_last_seq(self, last_seq):
+        with self._lock, self._conn:
+            self._last_seq = max(self._last_seq or 0, last_seq)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state VALUES ('last_seq', ?)",
+                (self._last_seq,),
+            )
+            self._saved_at = time.monotonic()
+
+    def partition(self, report_type, filters, day, compute):
+        """Cached partial result of one day, computing it on a miss.
+
+        compute() must return a JSON-serialisable value.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT payload, complete, computed_at FROM partitions
+                WHERE report_type = ? AND filters = ? AND day = ?
+                """,
+                (report_type, filters, day.isoformat()),
+            ).fetchone()
+            if row is not None:
+                payload, complete, computed_at = row
+                if complete or now - computed_at < self.partial_ttl:
+                    self.hits += 1
+                    with self._conn:
+                        self._conn.execute(
+                            """
+                            UPDATE partitions SET last_used = ?
+                            WHERE report_type = ? AND filters = ? AND day = ?
+                            """,
+                            (now, report_type, filters, day.isoformat()),
+                        )
+                    return json.loads(payload)
+            self.misses += 1
+
+        # Decide completeness before reading, so records committed while
+        # computing can only belong to a partition marked incomplete
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        complete = datetime.now() >= day_end + SETTLE_TIME
+        with self._lock:
+            generation = self._generations.get(day.isoformat(), 0)
+        value = compute()
+
+        with self._lock, self._conn:
+            # A record landed in the day while computing: it may be missing
+            if self._generations.get(day.isoformat(), 0) != generation:
+                complete = False
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO partitions
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    report_type,
+                    filters,
+                    day.isoformat(),
+                    json.dumps(value),
+                    int(complete),
+                    now,
+                    now,
+                ),
+            )
+        return value
+
+    def purge(self):
+        """Drop partitions unused for longer than the retention."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM partitions WHERE last_used < ?",
+                (time.time() - self.retention,),
+            )
+
+    def close(self):
+        if self._last_seq is not None:
+            self._save_last_seq(self._last_seq)
+        self._conn.close()
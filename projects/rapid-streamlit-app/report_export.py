@@ -0,0 +1,164 @@
+"""
+Report Export - streaming writers for Excel, CSV and PDF.
+
+Writers consume the chunk iterator of reports.iter_report_chunks() and write
+each chunk straight to disk, so memory use depends on the chunk size, not on
+the report length:
+    - CSV uses the csv module on a buffered file
+    - Excel uses an openpyxl write-only workbook (rows are serialised as they
+      are appended); sheets roll over at Excel's row limit. openpyxl uses
+      lxml when it is installed, which makes this roughly 30% faster
+    - PDF draws page by page with reportlab and stops at PDF_MAX_ROWS, since
+      a multi-million-row PDF is neither useful nor cheap to build
+"""
+
+import csv
+import os
+from datetime import datetime
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+EXCEL_MAX_ROWS = 1_048_576
+PDF_MAX_ROWS = 20_000
+
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": (
+        ".xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "CSV (.csv)": (".csv", "text/csv"),
+    "PDF Report": (".pdf", "application/pdf"),
+}
+
+
+def write_csv(chunks, columns, path, title="Report", progress=None):
+    rows_written = 0
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows_written += len(chunk)
+            if progress:
+                progress(rows_written)
+    return rows_written
+
+
+def write_xlsx(chunks, columns, path, title="Report", progress=None):
+    wb = openpyxl.Workbook(write_only=True)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(
+        start_color="2c5282", end_color="2c5282", fill_type="solid"
+    )
+
+    def new_sheet(number):
+        ws = wb.create_sheet(title=title[:28] if number == 1 else f"Page {number}")
+        header = []
+        for name in columns:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.font = header_font
+            cell.fill = header_fill
+            header.append(cell)
+        ws.append(header)
+        return ws
+
+    sheet_number, sheet_rows = 1, 1
+    ws = new_sheet(sheet_number)
+    rows_written = 0
+    for chunk in chunks:
+        for row in chunk:
+            if sheet_rows == EXCEL_MAX_ROWS:
+                sheet_number += 1
+                ws, sheet_rows = new_sheet(sheet_number), 1
+            ws.append(row)
+            sheet_rows += 1
+        rows_written += len(chunk)
+        if progress:
+            progress(rows_written)
+
+    wb.save(path)
+    return rows_written
+
+
+def write_pdf(chunks, columns, path, title="Report", progress=None):
+    page_width, page_height = landscape(A4)
+    margin, line_height = 36, 13
+    column_width = (page_width - 2 * margin) / len(columns)
+    rows_per_page = int((page_height - 2 * margin - 50) / line_height)
+
+    pdf = canvas.Canvas(path, pagesize=landscape(A4))
+    page = 0
+
+    def start_page():
+        nonlocal page
+        page += 1
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(margin, page_height - margin, title)
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(
+            page_width - margin,
+            page_height - margin,
+            f"Generated {datetime.now().strftime('%Y-%m-%d %H:%M')} - page {page}",
+        )
+        pdf.setFont("Helvetica-Bold", 8)
+        y = page_height - margin - 30
+        for i, name in enumerate(columns):
+            pdf.drawString(margin + i * column_width, y, name)
+        pdf.setFont("Helvetica", 8)
+        return y - line_height
+
+    y = start_page()
+    rows_written, page_rows, truncated = 0, 0, False
+    for chunk in chunks:
+        for row in chunk:
+            if rows_written == PDF_MAX_ROWS:
+                truncated = True
+                break
+            if page_rows == rows_per_page:
+                pdf.showPage()
+                y, page_rows = start_page(), 0
+            for i, value in enumerate(row):
+                pdf.drawString(margin + i * column_width, y, str(value)[:40])
+            y -= line_height
+            page_rows += 1
+            rows_written += 1
+        if progress:
+            progress(rows_written)
+        if truncated:
+            break
+
+    if truncated:
+        pdf.setFont("Helvetica-Oblique", 8)
+        pdf.drawString(
+            margin,
+            margin / 2,
+            f"PDF limited to the first {PDF_MAX_ROWS:,} rows - "
+            "export to Excel or CSV for the full report.",
+        )
+    pdf.save()
+    return rows_written
+
+
+WRITERS = {
+    "Excel (.xlsx)": write_xlsx,
+    "CSV (.csv)": write_csv,
+    "PDF Report": write_pdf,
+}
+
+
+def export_report(chunks, columns, format_option, path, title, progress=None):
+    """Write the report to `path` atomically. Returns the number of rows."""
+    tmp_path = f"{path}.partial"
+    writer = WRITERS[format_option]
+    try:
+        rows = writer(chunks, columns, tmp_path, title=title, progress=progress)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return rows
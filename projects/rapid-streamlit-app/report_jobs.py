@@ -0,0 +1,270 @@
+"""
+Report Jobs - background report generation on a local worker pool.
+
+Submitting a report returns a job ID straight away; the export runs on a
+small thread pool and the page polls the job for progress. Limits:
+    - at most REPORT_WORKERS exports run at once, the rest wait in the queue
+    - one user may have at most REPORT_JOBS_PER_USER jobs queued or running;
+      the limit must be below the number of workers, so a single user cannot
+      take every worker
+Finished files stay in the export directory with a JSON sidecar describing
+the job, so they can still be downloaded after a restart, until they are
+older than REPORT_RETENTION.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from report_export import EXPORT_FORMATS, export_report
+from report_query import NO_FILTERS, ReportFilters
+from reports import REPORT_COLUMNS, iter_report_chunks
+from settings import (
+    EXPORT_DIR,
+    REPORT_JOBS_PER_USER,
+    REPORT_RETENTION,
+    REPORT_WORKERS,
+)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATUSES = {QUEUED, RUNNING}
+
+
+class TooManyJobs(Exception):
+    """The user already has the maximum number of reports in progress."""
+
+
+class ReportJob:
+    """State of one export; updated by its worker, read by the page."""
+
+    FIELDS = [
+        "job_id",
+        "user",
+        "report_type",
+        "format_option",
+        "start",
+        "end",
+        "filters",
+        "file_name",
+        "status",
+        "rows_written",
+        "error",
+        "submitted_at",
+        "started_at",
+        "finished_at",
+    ]
+
+    def __init__(
+        self, job_id, user, report_type, format_option, start, end, filters=None
+    ):
+        self.job_id = job_id
+        self.user = user
+        self.report_type = report_type
+        self.format_option = format_option
+        self.start = start
+        self.end = end
+        self.filters = filters or NO_FILTERS
+        extension, _ = EXPORT_FORMATS[format_option]
+        self.file_name = (
+            f"report_{report_type.lower().replace(' ', '_')}_"
+            f"{datetime.now().strftime('%Y%m%d')}{extension}"
+        )
+        self.status = QUEUED
+        self.rows_written = 0
+        self.error = None
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def mime(self):
+        return EXPORT_FORMATS[self.format_option][1]
+
+    @property
+    def columns(self):
+        return REPORT_COLUMNS[self.report_type]
+
+    @property
+    def elapsed(self):
+        """Seconds spent running so far (or in total, once finished)."""
+        if self.started_at is None:
+            return 0.0
+        finished_at = self.finished_at or datetime.now()
+        return (finished_at - self.started_at).total_seconds()
+
+    def to_dict(self):
+        state = {field: getattr(self, field) for field in self.FIELDS}
+        for field in ("start", "end", "submitted_at", "started_at", "finished_at"):
+            if state[field] is not None:
+                state[field] = state[field].isoformat()
+        state["filters"] = self.filters._asdict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        job = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(job, field, state.get(field))
+        for field in ("start", "end", "submitted_at", "started_at", "finished_at"):
+            if state[field] is not None:
+                setattr(job, field, datetime.fromisoformat(state[field]))
+        filters = state.get("filters")
+        job.filters = (
+            ReportFilters(tuple(filters["branches"]), filters["user"])
+            if filters
+            else NO_FILTERS
+        )
+        return job
+
+
+class ReportJobQueue:
+    def __init__(
+        self,
+        audit_log,
+        export_dir=EXPORT_DIR,
+        workers=REPORT_WORKERS,
+        per_user_limit=REPORT_JOBS_PER_USER,
+        retention=REPORT_RETENTION,
+        cache=None,
+    ):
+        if per_user_limit >= workers:
+            raise ValueError(
+                f"per_user_limit ({per_user_limit}) must be below workers ({workers})"
+            )
+        self.audit_log = audit_log
+        self.cache = cache
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.per_user_limit = per_user_limit
+        self.retention = retention
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="report-job"
+        )
+        self._load_finished()
+
+    def submit(self, user, report_type, format_option, start, end, filters=None):
+        """Queue an export and return its job ID."""
+        if start >= end:
+            raise ValueError("The start date must not be after the end date")
+        with self._lock:
+            active = sum(
+                1
+                for job in self._jobs.values()
+                if job.user == user and job.status in ACTIVE_STATUSES
+            )
+            if active >= self.per_user_limit:
+                raise TooManyJobs(
+                    f"{active} reports already in progress "
+                    f"(limit {self.per_user_limit} per user)"
+                )
+            job = ReportJob(
+                uuid.uuid4().hex[:12],
+                user,
+                report_type,
+                format_option,
+                start,
+                end,
+                filters,
+            )
+            self._jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job)
+        return job.job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, user):
+        """The user's jobs, newest first."""
+        self.expire()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.user == user]
+        return sorted(jobs, key=lambda job: job.submitted_at, reverse=True)
+
+    def path_of(self, job):
+        extension, _ = EXPORT_FORMATS[job.format_option]
+        return self.export_dir / f"{job.job_id}{extension}"
+
+    def expire(self):
+        """Delete finished jobs (and their files) older than the retention."""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [
+                job
+                for job in self._jobs.values()
+                if job.finished_at is not None
+                and job.finished_at.timestamp() < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            self._remove_files(job)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----- worker side -----
+
+    def _run(self, job):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.rows_written = export_report(
+                iter_report_chunks(
+                    self.audit_log,
+                    job.report_type,
+                    job.start,
+                    job.end,
+                    cache=self.cache,
+                    filters=job.filters,
+                ),
+                job.columns,
+                job.format_option,
+                self.path_of(job),
+                title=job.report_type,
+                progress=lambda rows: setattr(job, "rows_written", rows),
+            )
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = datetime.now()
+        if job.status == DONE:
+            self._write_sidecar(job)
+
+    # ----- persistence of finished jobs -----
+
+    def _sidecar_path(self, job_id):
+        return self.export_dir / f"{job_id}.json"
+
+    def _write_sidecar(self, job):
+        path = self._sidecar_path(job.job_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def _load_finished(self):
+        for sidecar in self.export_dir.glob("*.json"):
+            with open(sidecar) as f:
+                job = ReportJob.from_dict(json.load(f))
+            if self.path_of(job).exists():
+                self._jobs[job.job_id] = job
+            else:
+                sidecar.unlink()
+        self.expire()
+
+    def _remove_files(self, job):
+        for path in (self.path_of(job), self._sidecar_path(job.job_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
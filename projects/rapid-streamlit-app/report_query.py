@@ -0,0 +1,89 @@
+"""
+Report Query - the Reports page filters as parameterized SQL.
+
+Filters are applied inside SQLite, against the audit segment indexes, rather
+than after loading rows:
+    - the date range always bounds ts, so idx_audit_ts can be used
+    - a user filter selects idx_audit_user_ts (user = ?, then the ts range)
+    - a branch filter selects idx_audit_branch_ts; "All Branches" (or no
+      selection) adds no condition at all
+Values are always bound as parameters, never formatted into the SQL.
+tests/test_report_query.py checks the query plans of every filter
+combination.
+"""
+
+import json
+from collections import namedtuple
+
+from audit_log import format_ts
+
+ALL_BRANCHES = "All Branches"
+
+ReportFilters = namedtuple("ReportFilters", ["branches", "user"])
+
+NO_FILTERS = ReportFilters(branches=(), user=None)
+
+
+def make_filters(branch_selection=(), user=""):
+    """Filters from the page widgets; empty values mean no restriction."""
+    branches = tuple(sorted(set(branch_selection)))
+    if ALL_BRANCHES in branches:
+        branches = ()
+    return ReportFilters(branches=branches, user=(user or "").strip() or None)
+
+
+def filters_key(filters):
+    """Stable text form of the filters, used in cache keys."""
+    if filters is None or filters == NO_FILTERS:
+        return ""
+    return json.dumps(filters._asdict(), sort_keys=True)
+
+
+def describe_filters(filters):
+    if filters is None or filters == NO_FILTERS:
+        return ""
+    parts = []
+    if filters.branches:
+        parts.append(", ".join(filters.branches))
+    if filters.user:
+        parts.append(f"user {filters.user}")
+    return " · ".join(parts)
+
+
+class AuditQuery:
+    """WHERE clause and parameters of one report query over the audit table."""
+
+    def __init__(self, start, end, filters=None):
+        self.conditions = ["ts >= ?", "ts < ?"]
+        self.params = [format_ts(start), format_ts(end)]
+        filters = filters or NO_FILTERS
+        if filters.user:
+            self.where("user = ?", filters.user)
+        if len(filters.branches) == 1:
+            self.where("branch = ?", filters.branches[0])
+        elif filters.branches:
+            placeholders = ", ".join("?" * len(filters.branches))
+            self.where(f"branch IN ({placeholders})", *filters.branches)
+
+    def where(self, condition, *params):
+        """Add a condition (ANDed with the others). Returns the query."""
+        if condition:
+            self.conditions.append(condition)
+            self.params.extend(params)
+        return self
+
+    def filter_expression(self):
+        """(expression, params) of the conditions besides the date range."""
+        return " AND ".join(self.conditions[2:]) or "1", self.params[2:]
+
+    @property
+    def clause(self):
+        return "WHERE " + " AND ".join(self.conditions)
+
+    def sql(self, select, suffix=""):
+        return f"SELECT {select} FROM audit {self.clause} {suffix}".strip()
+
+
+def explain(conn, sql, params):
+    """The detail lines of SQLite's EXPLAIN QUERY PLAN for a statement."""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
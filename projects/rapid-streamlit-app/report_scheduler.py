@@ -0,0 +1,557 @@
+"""
+Report Scheduler - persisted, cron-like scheduling of report deliveries.
+
+Schedules and their run history live in a small SQLite file, so a restart
+neither forgets a schedule nor the runs it still owes:
+    - each schedule is a five-field cron expression (minute hour day month
+      weekday); a run covers the whole days since the previous occurrence,
+      e.g. "0 7 * * 1" delivers last Monday-Sunday every Monday at 07:00
+    - occurrences missed while the server was down are caught up in order on
+      the next tick, up to SCHEDULER_MAX_CATCH_UP per schedule
+    - every schedule fires at a fixed offset of up to SCHEDULER_JITTER
+      seconds after its nominal time, so the 07:00 reports do not all hit
+      the audit log at once
+    - different schedules run in parallel on a worker pool; runs of the same
+      schedule stay sequential
+    - each run's duration, row count and outcome are kept in the history
+    - a failed run is retried after SCHEDULER_RETRY_DELAY, doubling the delay
+      each time, up to SCHEDULER_ATTEMPTS attempts; later occurrences of the
+      schedule wait for it. After the last attempt the occurrence is given up
+      and stays in the history as failed
+
+Delivery goes to a local outbox: one directory per run with the report file
+and a message.json (recipients, subject, body) written last, so a mail relay
+only ever picks up complete messages.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from time import perf_counter
+
+from report_export import EXPORT_FORMATS, export_report
+from reports import REPORT_COLUMNS, iter_report_chunks
+from settings import (
+    OUTBOX_DIR,
+    SCHEDULER_ATTEMPTS,
+    SCHEDULER_DB_PATH,
+    SCHEDULER_JITTER,
+    SCHEDULER_MAX_CATCH_UP,
+    SCHEDULER_RETRY_DELAY,
+    SCHEDULER_TICK,
+    SCHEDULER_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = [
+    "Sunday",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS schedules (
+        schedule_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        report_type TEXT NOT NULL,
+        cron TEXT NOT NULL,
+        format_option TEXT NOT NULL,
+        recipients TEXT NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1,
+        last_fire TEXT NOT NULL,
+        next_fire TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY,
+        schedule_id INTEGER NOT NULL,
+        scheduled_for TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        duration_s REAL NOT NULL,
+        status TEXT NOT NULL,
+        rows INTEGER NOT NULL DEFAULT 0,
+        outbox_path TEXT,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_schedule ON runs (schedule_id, run_id);
+"""
+
+# The schedules shown on the Reports page before any were configured
+DEFAULT_SCHEDULES = [
+    ("Daily Usage Summary", "Daily Usage Summary", "0 7 * * *", "team@bank.pl", True),
+    (
+        "Weekly User Activity",
+        "User Activity Report",
+        "0 7 * * 1",
+        "managers@bank.pl",
+        True,
+    ),
+    (
+        "Monthly Eligibility Stats",
+        "Eligibility Statistics",
+        "0 7 1 * *",
+        "analytics@bank.pl",
+        False,
+    ),
+]
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day-of-month month weekday.
+
+    Fields accept *, numbers, ranges (1-5), lists (1,15) and steps (*/15).
+    Weekdays run 0-6 from Sunday (7 is Sunday too). As in cron, when both
+    day-of-month and weekday are restricted a day matching either fires.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 cron fields, got {len(fields)}")
+        self.expression = " ".join(fields)
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        self._times = sorted(
+            time(hour, minute) for hour in self.hours for minute in self.minutes
+        )
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment):
+        """First firing time strictly after moment."""
+        day = moment.date()
+        for _ in range(5 * 366):
+            if self._day_matches(day):
+                for at in self._times:
+                    candidate = datetime.combine(day, at)
+                    if candidate > moment:
+                        return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def previous(self, moment):
+        """Last firing time strictly before moment."""
+        day = moment.date()
+        for _ in range(5 * 366):
+            if self._day_matches(day):
+                for at in reversed(self._times):
+                    candidate = datetime.combine(day, at)
+                    if candidate < moment:
+                        return candidate
+            day -= timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def describe(self):
+        """Short label for the Reports page, e.g. "Weekly (Monday) @ 07:00"."""
+        minute, hour, day, month, weekday = self.expression.split()
+        if not (minute.isdigit() and hour.isdigit() and month == "*"):
+            return self.expression
+        at = f"{int(hour):02d}:{int(minute):02d}"
+        if day == "*" and weekday == "*":
+            return f"Daily @ {at}"
+        if day == "*" and weekday.isdigit():
+            return f"Weekly ({WEEKDAYS[int(weekday) % 7]}) @ {at}"
+        if day.isdigit() and weekday == "*":
+            return f"Monthly ({_ordinal(int(day))}) @ {at}"
+        return self.expression
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        match = re.fullmatch(r"(\*|\d+(?:-\d+)?)(?:/(\d+))?", part)
+        if not match:
+            raise ValueError(f"Invalid cron field '{text}'")
+        span, step = match.group(1), int(match.group(2) or 1)
+        if span == "*":
+            first, last = low, high
+        elif "-" in span:
+            first, last = (int(value) for value in span.split("-"))
+        else:
+            first = last = int(span)
+        if not low <= first <= last <= high or step < 1:
+            raise ValueError(f"Cron field '{text}' outside {low}-{high}")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+def _ordinal(day):
+    suffix = (
+        "th"
+        if 10 <= day % 100 <= 20
+        else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    )
+    return f"{day}{suffix}"
+
+
+def report_window(last_fire, fire):
+    """Period a run covers: the whole days since the previous occurrence."""
+    start = datetime.combine(last_fire.date(), time.min)
+    end = datetime.combine(fire.date(), time.min)
+    if start == end:
+        # Several occurrences a day: cover exactly the time between them
+        return last_fire, fire
+    return start, end
+
+
+def jitter_of(schedule_id, spread=SCHEDULER_JITTER):
+    """Fixed per-schedule delay, so the offset survives restarts."""
+    return timedelta(seconds=random.Random(schedule_id).uniform(0, spread))
+
+
+class ReportScheduler:
+    def __init__(
+        self,
+        audit_log,
+        path=SCHEDULER_DB_PATH,
+        outbox_dir=OUTBOX_DIR,
+        workers=SCHEDULER_WORKERS,
+        tick=SCHEDULER_TICK,
+        max_catch_up=SCHEDULER_MAX_CATCH_UP,
+        attempts=SCHEDULER_ATTEMPTS,
+        retry_delay=SCHEDULER_RETRY_DELAY,
+        cache=None,
+    ):
+        self.audit_log = audit_log
+        self.cache = cache
+        self.path = str(path)
+        self.outbox_dir = Path(outbox_dir)
+        self.outbox_dir.mkdir(parents=True, exist_ok=True)
+        self.tick = tick
+        self.max_catch_up = max_catch_up
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._running = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="report-schedule"
+        )
+        self._stop = threading.Event()
+
+        with self._db() as conn:
+            conn.executescript(SCHEMA)
+            empty = conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0] == 0
+        if empty:
+            for name, report_type, cron, recipients, active in DEFAULT_SCHEDULES:
+                self.add(name, report_type, cron, recipients, active=active)
+
+        self._thread = threading.Thread(
+            target=self._loop, name="report-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ----- schedule management (called from the page) -----
+
+    def add(
+        self,
+        name,
+        report_type,
+        cron,
+        recipients,
+        format_option="Excel (.xlsx)",
+        active=True,
+    ):
+        if report_type not in REPORT_COLUMNS:
+            raise ValueError(f"Unknown report type '{report_type}'")
+        schedule = CronSchedule(cron)
+        next_fire = schedule.next_after(datetime.now())
+        with self._db() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO schedules (name, report_type, cron, format_option,
+                    recipients, active, last_fire, next_fire)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    name,
+                    report_type,
+                    schedule.expression,
+                    format_option,
+                    recipients,
+                    int(active),
+                    schedule.previous(next_fire).isoformat(),
+                    next_fire.isoformat(),
+                ),
+            )
+        return cursor.lastrowid
+
+    def set_active(self, schedule_id, active):
+        """Pause or resume. Resuming does not catch up the paused period."""
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT cron FROM schedules WHERE schedule_id = ?", (schedule_id,)
+            ).fetchone()
+            schedule = CronSchedule(row["cron"])
+            next_fire = schedule.next_after(datetime.now())
+            conn.execute(
+                """
+                UPDATE schedules SET active = ?, last_fire = ?, next_fire = ?
+                WHERE schedule_id = ?
+                """,
+                (
+                    int(active),
+                    schedule.previous(next_fire).isoformat(),
+                    next_fire.isoformat(),
+                    schedule_id,
+                ),
+            )
+
+    def remove(self, schedule_id):
+        with self._db() as conn:
+            conn.execute("DELETE FROM schedules WHERE schedule_id = ?", (schedule_id,))
+
+    def schedules(self):
+        """All schedules with their latest run and average duration."""
+        with self._db() as conn:
+            rows = conn.execute("""
+                SELECT s.*, (
+                    SELECT MAX(started_at) FROM runs r
+                    WHERE r.schedule_id = s.schedule_id
+                ) AS last_run, (
+                    SELECT status FROM runs r
+                    WHERE r.schedule_id = s.schedule_id
+                    ORDER BY run_id DESC LIMIT 1
+                ) AS last_status, (
+                    SELECT error FROM runs r
+                    WHERE r.schedule_id = s.schedule_id
+                    ORDER BY run_id DESC LIMIT 1
+                ) AS last_error, (
+                    SELECT AVG(duration_s) FROM (
+                        SELECT duration_s FROM runs r
+                        WHERE r.schedule_id = s.schedule_id AND status = 'done'
+                        ORDER BY run_id DESC LIMIT 10
+                    )
+                ) AS avg_duration_s
+                FROM schedules s ORDER BY s.schedule_id
+                """).fetchall()
+        return [dict(row) for row in rows]
+
+    def history(self, schedule_id=None, limit=50):
+        """Most recent runs, newest first."""
+        sql = "SELECT * FROM runs"
+        params = ()
+        if schedule_id is not None:
+            sql += " WHERE schedule_id = ?"
+            params = (schedule_id,)
+        sql += " ORDER BY run_id DESC LIMIT ?"
+        with self._db() as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----- scheduler thread -----
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception:
+                logger.exception("Report scheduler tick failed")
+            self._stop.wait(self.tick)
+
+    def run_due(self, now=None):
+        """Start every schedule that has an occurrence due."""
+        now = now or datetime.now()
+        for schedule_id in self.due(now):
+            with self._lock:
+                if schedule_id in self._running:
+                    continue
+                self._running.add(schedule_id)
+            self._executor.submit(self._run_schedule, schedule_id, now)
+
+    def due(self, now=None):
+        """IDs of the active schedules with an occurrence (or retry) due."""
+        now = now or datetime.now()
+        with self._db() as conn:
+            # Failed attempts at the pending occurrence delay its retry
+            rows = conn.execute("""
+                SELECT s.schedule_id, s.next_fire, COUNT(r.run_id) AS failures,
+                    MAX(r.started_at) AS last_failure
+                FROM schedules s LEFT JOIN runs r
+                    ON r.schedule_id = s.schedule_id
+                    AND r.scheduled_for = s.next_fire AND r.status = 'failed'
+                WHERE s.active = 1
+                GROUP BY s.schedule_id
+                """).fetchall()
+
+        for row in rows:
+            schedule_id = row["schedule_id"]
+            due_at = datetime.fromisoformat(row["next_fire"]) + jitter_of(schedule_id)
+            if row["failures"]:
+                retry_at = datetime.fromisoformat(row["last_failure"]) + timedelta(
+                    seconds=self.retry_delay * 2 ** (row["failures"] - 1)
+                )
+                due_at = max(due_at, retry_at)
+            if due_at <= now:
+                yield schedule_id
+
+    def _run_schedule(self, schedule_id, now):
+        try:
+            with self._db() as conn:
+                row = conn.execute(
+                    "SELECT * FROM schedules WHERE schedule_id = ?", (schedule_id,)
+                ).fetchone()
+            if row is None:
+                return
+            schedule = CronSchedule(row["cron"])
+            last_fire = datetime.fromisoformat(row["last_fire"])
+            fire = datetime.fromisoformat(row["next_fire"])
+
+            # Occurrences due by now, oldest first; only the newest
+            # max_catch_up are delivered after a long outage
+            due = []
+            while fire <= now:
+                due.append((last_fire, fire))
+                last_fire, fire = fire, schedule.next_after(fire)
+            skipped = len(due) - self.max_catch_up
+            if skipped > 0:
+                logger.warning(
+                    "Schedule %s: skipping %d missed runs", row["name"], skipped
+                )
+                due = due[skipped:]
+
+            for previous_fire, occurrence in due:
+                if not self._deliver(row, previous_fire, occurrence):
+                    failures = self._failures(schedule_id, occurrence)
+                    if failures < self.attempts:
+                        return  # retried on a later tick, after the delay
+                    logger.error(
+                        "Schedule %s: giving up on the %s run after %d attempts",
+                        row["name"],
+                        occurrence.isoformat(),
+                        failures,
+                    )
+                with self._db() as conn:
+                    conn.execute(
+                        """
+                        UPDATE schedules SET last_fire = ?, next_fire = ?
+                        WHERE schedule_id = ?
+                        """,
+                        (
+                            occurrence.isoformat(),
+                            schedule.next_after(occurrence).isoformat(),
+                            schedule_id,
+                        ),
+                    )
+        finally:
+            with self._lock:
+                self._running.discard(schedule_id)
+
+    def _failures(self, schedule_id, occurrence):
+        """Failed attempts at one occurrence of a schedule."""
+        with self._db() as conn:
+            return conn.execute(
+                """
+                SELECT COUNT(*) FROM runs
+                WHERE schedule_id = ? AND scheduled_for = ? AND status = 'failed'
+                """,
+                (schedule_id, occurrence.isoformat()),
+            ).fetchone()[0]
+
+    def _deliver(self, schedule, previous_fire, occurrence):
+        """Export one occurrence into the outbox and record the run.
+
+        Returns whether the delivery succeeded.
+        """
+        start, end = report_window(previous_fire, occurrence)
+        report_type = schedule["report_type"]
+        extension, mime = EXPORT_FORMATS[schedule["format_option"]]
+        run_dir = self.outbox_dir / (
+            f"{occurrence:%Y%m%d-%H%M}_{schedule['schedule_id']}_"
+            f"{report_type.lower().replace(' ', '_')}"
+        )
+        run_dir.mkdir(parents=True, exist_ok=True)
+        file_name = f"{report_type.lower().replace(' ', '_')}_{start:%Y%m%d}{extension}"
+
+        started_at = datetime.now()
+        started = perf_counter()
+        rows, status, error = 0, "done", None
+        try:
+            rows = export_report(
+                iter_report_chunks(
+                    self.audit_log, report_type, start, end, cache=self.cache
+                ),
+                REPORT_COLUMNS[report_type],
+                schedule["format_option"],
+                run_dir / file_name,
+                title=report_type,
+            )
+            last_day = end - timedelta(days=1) if end.time() == time.min else end
+            period = f"{start:%Y-%m-%d}"
+            if last_day.date() != start.date():
+                period += f" to {last_day:%Y-%m-%d}"
+            message = {
+                "to": [r.strip() for r in schedule["recipients"].split(",")],
+                "subject": f"{schedule['name']} - {period}",
+                "body": (
+                    f"{report_type} for {start:%Y-%m-%d %H:%M} to "
+                    f"{end:%Y-%m-%d %H:%M}: {rows:,} rows attached."
+                ),
+                "attachment": file_name,
+                "mime": mime,
+                "scheduled_for": occurrence.isoformat(),
+            }
+            tmp_path = run_dir / "message.json.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(message, f, indent=2)
+            os.replace(tmp_path, run_dir / "message.json")
+        except Exception as e:
+            logger.exception("Scheduled report %s failed", schedule["name"])
+            status, error = "failed", str(e)
+
+        with self._db() as conn:
+            conn.execute(
+                """
+                INSERT INTO runs (schedule_id, scheduled_for, started_at,
+                    duration_s, status, rows, outbox_path, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    schedule["schedule_id"],
+                    occurrence.isoformat(),
+                    started_at.isoformat(timespec="seconds"),
+                    perf_counter() - started,
+                    status,
+                    rows,
+                    str(run_dir),
+                    error,
+                ),
+            )
+        return status == "done"
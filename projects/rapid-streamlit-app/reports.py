@@ -0,0 +1,445 @@
+"""
+Report definitions over the audit log.
+
+Row reports (User Activity, Error Log) stream matching audit records in
+chunks straight from the segment indexes. Summary reports (Daily Usage,
+Branch Performance, Eligibility Statistics) are grouped inside SQLite one day
+at a time and the per-day partials merged in Python, so no report ever holds
+the raw log in memory and finished days can be served from a ReportCache.
+
+Every report takes optional ReportFilters (branches, user); they are applied
+in the SQL of each segment query, see report_query.
+"""
+
+import heapq
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from audit_log import ERROR_STATUSES, connect_readonly, format_ts
+from eligibility_snapshot import PRODUCTS
+from report_query import AuditQuery, filters_key
+from settings import EXPORT_CHUNK_SIZE
+
+REPORT_COLUMNS = {
+    "Daily Usage Summary": [
+        "Date",
+        "Total Queries",
+        "Unique Users",
+        "Avg Response (ms)",
+        "Error Count",
+    ],
+    "User Activity Report": [
+        "Timestamp",
+        "User",
+        "Branch",
+        "Client ID",
+        "Response (ms)",
+        "Status",
+        "Eligible Products",
+    ],
+    "Eligibility Statistics": ["Product", "Queries", "Eligible %", "Not Eligible %"],
+    "Error Log Export": ["Timestamp", "Type", "User", "Branch", "Client ID", "Details"],
+    "Branch Performance": [
+        "Branch",
+        "Total Queries",
+        "Unique Users",
+        "Avg Response (ms)",
+        "Error Count",
+    ],
+}
+
+ROW_REPORTS = {"User Activity Report", "Error Log Export"}
+
+# Runs of seqs sampled when a count is estimated
+ESTIMATE_SLICES = 20
+
+_ERROR_LIST = ", ".join(f"'{status}'" for status in sorted(ERROR_STATUSES))
+
+
+def date_range(start_date, end_date):
+    """Turn the inclusive date inputs of the page into a [start, end) window."""
+    return (
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    )
+
+
+def product_names(flags):
+    if flags is None:
+        return ""
+    return ", ".join(label for label, flag in PRODUCTS if flags & flag)
+
+
+def iter_report_chunks(
+    audit_log, report_type, start, end, chunk_size=None, cache=None, filters=None
+):
+    """Yield lists of report rows (tuples in REPORT_COLUMNS order).
+
+    Row reports always stream from the log; summary reports reuse the day
+    partitions held in `cache` (a ReportCache), if given.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    if report_type in ROW_REPORTS:
+        yield from _iter_row_report(
+            audit_log, report_type, start, end, chunk_size, filters
+        )
+    else:
+        rows = summary_rows(audit_log, report_type, start, end, cache, filters)
+        for offset in range(0, len(rows), chunk_size):
+            yield rows[offset : offset + chunk_size]
+
+
+def report_sql(report_type, start, end, filters=None):
+    """(sql, params) of the statement run on each segment for a report."""
+    if report_type in ROW_REPORTS:
+        columns, condition = ROW_QUERIES[report_type]
+        query = AuditQuery(start, end, filters).where(condition)
+        return query.sql(columns, "ORDER BY ts, seq"), query.params
+
+    query = AuditQuery(start, end, filters)
+    if report_type == "Eligibility Statistics":
+        columns = ", ".join(f"SUM(flags & {flag} != 0)" for _, flag in PRODUCTS)
+        query.where("flags IS NOT NULL")
+        return query.sql(f"COUNT(*), {columns}"), query.params
+
+    select = (
+        f"{USAGE_KEYS[report_type]} AS key, user, COUNT(*), SUM(response_ms), "
+        f"SUM(status IN ({_ERROR_LIST}))"
+    )
+    return query.sql(select, "GROUP BY key, user"), query.params
+
+
+# ----- row reports -----
+
+# report type -> (selected columns, condition on top of the filters)
+ROW_QUERIES = {
+    "User Activity Report": (
+        "ts, user, branch, client_id, response_ms, status, flags",
+        None,
+    ),
+    "Error Log Export": (
+        "ts, status, user, branch, client_id, detail",
+        f"status IN ({_ERROR_LIST})",
+    ),
+}
+
+
+def _iter_row_report(audit_log, report_type, start, end, chunk_size, filters):
+    sql, params = report_sql(report_type, start, end, filters)
+    # Backdated records can make segments overlap in time, so their ordered
+    # rows are merged (ties keep the segments' seq order)
+    rows = heapq.merge(
+        *(
+            _segment_cursor(segment.path, sql, params, chunk_size)
+            for segment in audit_log.segments(start, end)
+        ),
+        key=lambda row: row[0],
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield [_format_row(report_type, row) for row in chunk]
+
+
+def _segment_cursor(path, sql, params, chunk_size):
+    """Yield the rows of a query on one segment, fetched chunk_size at a time."""
+    conn = connect_readonly(path)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def _format_row(report_type, row):
+    if report_type == "User Activity Report":
+        ts, user, branch, client_id, response_ms, status, flags = row
+        return (
+            ts[:19],
+            user,
+            branch,
+            client_id,
+            round(response_ms),
+            status,
+            product_names(flags),
+        )
+    ts, *rest = row
+    return (ts[:19], *rest)
+
+
+# ----- preview pages -----
+#
+# The Reports page shows one page of the full result at a time. Row reports
+# are paged with a keyset on (ts, seq), the order of the export, so every page
+# is an index seek however deep into the report it is. Summary reports are
+# small and come from the day partitions, so they are sliced in memory.
+
+
+def report_page(
+    audit_log,
+    report_type,
+    start,
+    end,
+    after=None,
+    page_size=25,
+    cache=None,
+    filters=None,
+):
+    """One page of a report as (rows, cursor of the next page or None).
+
+    Pass the returned cursor as `after` to fetch the following page.
+    """
+    if report_type not in ROW_REPORTS:
+        offset = after or 0
+        rows = summary_rows(audit_log, report_type, start, end, cache, filters)
+        next_offset = offset + page_size
+        return rows[offset:next_offset], (
+            next_offset if next_offset < len(rows) else None
+        )
+
+    columns, condition = ROW_QUERIES[report_type]
+    after_ts, after_seq = after or (format_ts(start), 0)
+    query = (
+        AuditQuery(start, end, filters)
+        .where(condition)
+        .where("ts >= ? AND (ts > ? OR seq > ?)", after_ts, after_ts, after_seq)
+    )
+    sql = query.sql(f"seq, {columns}", "ORDER BY ts, seq LIMIT ?")
+
+    # Segments can overlap in time: take the first rows of each one that may
+    # hold some, by when they start, until the next starts past a full page
+    rows = []
+    segments = sorted(audit_log.segments(start, end), key=lambda s: s.first_ts)
+    for segment in segments:
+        if len(rows) > page_size and segment.first_ts > rows[page_size]["ts"]:
+            break
+        if segment.last_ts < after_ts:
+            continue
+        conn = connect_readonly(segment.path)
+        try:
+            rows.extend(conn.execute(sql, (*query.params, page_size + 1)))
+        finally:
+            conn.close()
+        rows.sort(key=lambda row: (row["ts"], row["seq"]))
+        del rows[page_size + 1 :]
+
+    page = rows[:page_size]
+    cursor = (page[-1]["ts"], page[-1]["seq"]) if len(rows) > page_size else None
+    return [_format_row(report_type, tuple(row)[1:]) for row in page], cursor
+
+
+def count_rows(
+    audit_log, report_type, start, end, scan_limit=200_000, cache=None, filters=None
+):
+    """Number of report rows as (count, exact).
+
+    Counting reads at most scan_limit rows per segment, found through the
+    indexes of the filters. Past that, the count is estimated from the
+    sequence numbers spanning the date range and the share of matching rows
+    in a sample of about scan_limit rows, taken in ESTIMATE_SLICES runs of
+    consecutive seqs spread evenly over that span.
+    """
+    if report_type not in ROW_REPORTS:
+        rows = summary_rows(audit_log, report_type, start, end, cache, filters)
+        return len(rows), True
+
+    _, condition = ROW_QUERIES[report_type]
+    # Rows are found through the index of the filters, the report condition
+    # (if any) is checked on each of them
+    query = AuditQuery(start, end, filters)
+    count_sql = f"""
+        SELECT COUNT(*), SUM(hit) FROM (
+            {query.sql(f"({condition or 1}) AS hit", "LIMIT ?")}
+        )
+    """
+    # For estimates: share of the rows in a run of seqs that fall in the
+    # date range and match everything, read by primary key
+    match = AuditQuery(start, end, filters).where(condition)
+    sample_sql = f"""
+        SELECT COUNT(*), SUM(hit) FROM (
+            SELECT ({" AND ".join(match.conditions)}) AS hit FROM audit
+            WHERE seq BETWEEN ? AND ? ORDER BY seq LIMIT ?
+        )
+    """
+    span_query = AuditQuery(start, end)
+    span_sql = {
+        direction: span_query.sql(
+            "seq", f"ORDER BY ts {direction}, seq {direction} LIMIT 1"
+        )
+        for direction in ("ASC", "DESC")
+    }
+    slice_limit = max(scan_limit // ESTIMATE_SLICES, 1)
+
+    total, exact = 0, True
+    for segment in audit_log.segments(start, end):
+        conn = connect_readonly(segment.path)
+        try:
+            scanned, matched = conn.execute(
+                count_sql, (*query.params, scan_limit)
+            ).fetchone()
+            if scanned < scan_limit:
+                total += matched or 0
+                continue
+
+            first_seq, last_seq = sorted(
+                conn.execute(span_sql[direction], span_query.params).fetchone()[0]
+                for direction in ("ASC", "DESC")
+            )
+            span = last_seq - first_seq + 1
+            sampled = sample_matched = 0
+            for number in range(ESTIMATE_SLICES):
+                low = first_seq + span * number // ESTIMATE_SLICES
+                high = first_seq + span * (number + 1) // ESTIMATE_SLICES - 1
+                if high < low:
+                    continue
+                rows, hits = conn.execute(
+                    sample_sql, (*match.params, low, high, slice_limit)
+                ).fetchone()
+                sampled += rows
+                sample_matched += hits or 0
+            total += round(sample_matched / sampled * span) if sampled else 0
+            exact = False
+        finally:
+            conn.close()
+    return total, exact
+
+
+# ----- summary reports -----
+#
+# A summary report is computed as one partial per day (or per leftover piece
+# of a day at the ends of the range), the partials merged, then formatted.
+# Partials are plain JSON values so whole days can be cached.
+
+
+def _day_pieces(start, end):
+    """Split [start, end) at midnights into (day or None, start, end).
+
+    The day is given for whole calendar days, the only cacheable pieces.
+    """
+    pieces = []
+    piece_start = start
+    while piece_start < end:
+        midnight = datetime.combine(piece_start.date() + timedelta(days=1), time.min)
+        piece_end = min(midnight, end)
+        whole_day = piece_start.time() == time.min and piece_end == midnight
+        pieces.append(
+            (piece_start.date() if whole_day else None, piece_start, piece_end)
+        )
+        piece_start = piece_end
+    return pieces
+
+
+# Grouping key of the usage reports
+USAGE_KEYS = {
+    "Daily Usage Summary": "substr(ts, 1, 10)",
+    "Branch Performance": "branch",
+}
+
+
+def _usage_partial(audit_log, report_type, start, end, filters):
+    """{key: [queries, total response ms, errors, users]} for the piece."""
+    sql, params = report_sql(report_type, start, end, filters)
+    groups = {}
+    for segment in audit_log.segments(start, end):
+        conn = connect_readonly(segment.path)
+        try:
+            for key, user, count, total_ms, errors in conn.execute(sql, params):
+                group = groups.setdefault(key, [0, 0.0, 0, []])
+                group[0] += count
+                group[1] += total_ms
+                group[2] += errors
+                group[3].append(user)
+        finally:
+            conn.close()
+    return groups
+
+
+def _merge_usage(partials):
+    groups = {}
+    for partial in partials:
+        for key, (count, total_ms, errors, users) in partial.items():
+            group = groups.setdefault(key, [0, 0.0, 0, set()])
+            group[0] += count
+            group[1] += total_ms
+            group[2] += errors
+            group[3].update(users)
+    return groups
+
+
+def _daily_usage_rows(partials):
+    groups = _merge_usage(partials)
+    return [
+        (day, count, len(users), round(total_ms / count), errors)
+        for day, (count, total_ms, errors, users) in sorted(
+            groups.items(), reverse=True
+        )
+    ]
+
+
+def _branch_performance_rows(partials):
+    groups = _merge_usage(partials)
+    return sorted(
+        (
+            (branch, count, len(users), round(total_ms / count), errors)
+            for branch, (count, total_ms, errors, users) in groups.items()
+        ),
+        key=lambda row: row[1],
+        reverse=True,
+    )
+
+
+def _eligibility_partial(audit_log, report_type, start, end, filters):
+    """[queries, eligible count per product] for the piece."""
+    sql, params = report_sql(report_type, start, end, filters)
+    totals = [0] * (len(PRODUCTS) + 1)
+    for segment in audit_log.segments(start, end):
+        conn = connect_readonly(segment.path)
+        try:
+            row = conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+        totals = [total + (value or 0) for total, value in zip(totals, row)]
+    return totals
+
+
+def _eligibility_rows(partials):
+    totals = [sum(values) for values in zip(*partials)] or [0] * (len(PRODUCTS) + 1)
+    queries, *eligible = totals
+    rows = []
+    for (label, _), eligible_count in zip(PRODUCTS, eligible):
+        share = eligible_count / queries * 100 if queries else 0.0
+        rows.append((label, queries, f"{share:.1f}%", f"{100 - share:.1f}%"))
+    return rows
+
+
+# report type -> (partial of a piece, rows from the partials)
+SUMMARY_REPORTS = {
+    "Daily Usage Summary": (_usage_partial, _daily_usage_rows),
+    "Eligibility Statistics": (_eligibility_partial, _eligibility_rows),
+    "Branch Performance": (_usage_partial, _branch_performance_rows),
+}
+
+
+def summary_rows(audit_log, report_type, start, end, cache=None, filters=None):
+    """Rows of a summary report, reusing cached days when a cache is given."""
+    compute, finish = SUMMARY_REPORTS[report_type]
+    partials = []
+    for day, piece_start, piece_end in _day_pieces(start, end):
+        if cache is not None and day is not None:
+            partial = cache.partition(
+                report_type,
+                filters_key(filters),
+                day,
+                lambda: compute(
+                    audit_log, report_type, piece_start, piece_end, filters
+                ),
+            )
+        else:
+            partial = compute(audit_log, report_type, piece_start, piece_end, filters)
+        partials.append(partial)
+    return finish(partials)
@@ -0,0 +1,119 @@
+"""
+Process-wide resources shared by the app pages.
+Everything here is created once per Streamlit server via st.cache_resource.
+"""
+
+import streamlit as st
+
+from audit_log import AuditLog
+from data_access import (
+    BackgroundLoop,
+    ClientLookupService,
+    Database,
+    create_demo_database,
+)
+from eligibility_snapshot import (
+    EligibilitySnapshot,
+    build_snapshot,
+    generate_mock_clients,
+)
+from health_checks import CacheProbe, DatabaseProbe, EtlProbe, HealthMonitor
+from report_cache import ReportCache
+from report_jobs import ReportJobQueue
+from report_scheduler import ReportScheduler
+from settings import (
+    AUDIT_DIR,
+    DATA_DIR,
+    DB_PATH,
+    DEMO_CLIENT_COUNT,
+    EXPORT_DIR,
+    OUTBOX_DIR,
+    REPORT_CACHE_PATH,
+    SCHEDULER_DB_PATH,
+    SNAPSHOT_PATH,
+    TELEMETRY_PATH,
+)
+from telemetry import Telemetry
+
+
+@st.cache_resource
+def get_snapshot():
+    """Open the nightly eligibility snapshot (building a demo one if missing)."""
+    if not SNAPSHOT_PATH.exists():
+        build_snapshot(generate_mock_clients(DEMO_CLIENT_COUNT), SNAPSHOT_PATH)
+    return EligibilitySnapshot(SNAPSHOT_PATH)
+
+
+@st.cache_resource
+def get_backend_loop():
+    """Event loop thread that runs all async backend calls."""
+    return BackgroundLoop()
+
+
+@st.cache_resource
+def get_database():
+    """Pooled connection to the core banking database."""
+    if not DB_PATH.exists():
+        create_demo_database(DB_PATH)
+    return Database(DB_PATH)
+
+
+@st.cache_resource
+def get_lookup_service():
+    return ClientLookupService(get_snapshot(), get_database())
+
+
+@st.cache_resource
+def get_telemetry():
+    """Live statistics, restored from the last checkpoint."""
+    return Telemetry.load(TELEMETRY_PATH)
+
+
+@st.cache_resource
+def get_audit_log():
+    """The single audit log writer of this server process."""
+    audit_log = AuditLog(AUDIT_DIR)
+    get_telemetry().attach(audit_log)
+    return audit_log
+
+
+@st.cache_resource
+def get_health_monitor():
+    """Shared by all sessions, so probe results are cached server-wide."""
+    return HealthMonitor(
+        [
+            DatabaseProbe(get_database()),
+            EtlProbe(SNAPSHOT_PATH),
+            CacheProbe(get_lookup_service()),
+        ]
+    )
+
+
+@st.cache_resource
+def get_report_cache():
+    """Per-day partitions of summary reports, shared by all report runs;
+    backdated audit records invalidate the days they land in."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    cache = ReportCache(REPORT_CACHE_PATH)
+    cache.attach(get_audit_log())
+    return cache
+
+
+@st.cache_resource
+def get_report_jobs():
+    """Worker pool that generates reports in the background."""
+    return ReportJobQueue(get_audit_log(), EXPORT_DIR, cache=get_report_cache())
+
+
+@st.cache_resource
+def get_report_scheduler():
+    """Delivers scheduled reports to the outbox; catches up missed runs."""
+    return ReportScheduler(
+        get_audit_log(), SCHEDULER_DB_PATH, OUTBOX_DIR, cache=get_report_cache()
+    )
+
+
+def start_background_services():
+    """Start the server's background workers from whichever page is opened
+    first, so scheduled reports run without anyone visiting Reports."""
+    get_report_scheduler()
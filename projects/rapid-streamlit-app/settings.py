@@ -0,0 +1,68 @@
+"""
+Shared settings for the Rapid Streamlit App and its batch jobs.
+"""
+
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+DATA_DIR = APP_DIR / "data"
+
+# Signed-in teller (fixed until the app sits behind the bank's SSO)
+CURRENT_USER = "J.Smith"
+CURRENT_BRANCH = "London Central"
+
+# Nightly eligibility snapshot (rebuilt after the 06:00 ETL sync)
+SNAPSHOT_PATH = DATA_DIR / "eligibility.snap"
+DEMO_CLIENT_COUNT = 100_000
+
+# Core banking database (SQLite stand-in) and its connection pool
+DB_PATH = DATA_DIR / "core_banking.db"
+DB_POOL_SIZE = 8
+DB_ACQUIRE_TIMEOUT = 2.0
+DB_QUERY_TIMEOUT = 30.0
+
+# Audit log (group commit interval and longest flush() wait in seconds,
+# segment rotation limits, most uncommitted records kept while commits fail)
+AUDIT_DIR = DATA_DIR / "audit"
+AUDIT_FLUSH_INTERVAL = 0.05
+AUDIT_FLUSH_TIMEOUT = 10.0
+AUDIT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+AUDIT_SEGMENT_MAX_AGE = 24 * 60 * 60
+AUDIT_MAX_PENDING = 200_000
+
+# Live statistics derived from the audit log (persisted between restarts)
+TELEMETRY_PATH = DATA_DIR / "telemetry.json"
+TELEMETRY_CHECKPOINT_INTERVAL = 10.0
+
+# Admin Panel health probes
+HEALTH_CHECK_TTL = 15.0
+HEALTH_PROBE_TIMEOUT = 2.0
+
+# Report exports (rows per chunk read from the audit log and written out)
+EXPORT_DIR = DATA_DIR / "exports"
+EXPORT_CHUNK_SIZE = 10_000
+
+# Background report jobs (worker threads, jobs in progress per user - below
+# the workers, so one user always leaves a worker free - seconds finished
+# files are kept for download)
+REPORT_WORKERS = 3
+REPORT_JOBS_PER_USER = 2
+REPORT_RETENTION = 7 * 24 * 60 * 60
+
+# Scheduled reports (seconds between checks, max spread of start times,
+# schedules run in parallel, missed runs caught up per schedule, attempts at
+# one run and seconds before the first retry, doubled for every next one)
+SCHEDULER_DB_PATH = DATA_DIR / "scheduler.db"
+OUTBOX_DIR = DATA_DIR / "outbox"
+SCHEDULER_TICK = 30.0
+SCHEDULER_JITTER = 10 * 60
+SCHEDULER_WORKERS = 3
+SCHEDULER_MAX_CATCH_UP = 7
+SCHEDULER_ATTEMPTS = 3
+SCHEDULER_RETRY_DELAY = 5 * 60
+
+# Summary report partitions (seconds today's partial day is reused, seconds an
+# unused finished day is kept)
+REPORT_CACHE_PATH = DATA_DIR / "report_cache.db"
+REPORT_CACHE_PARTIAL_TTL = 60.0
+REPORT_CACHE_RETENTION = 90 * 24 * 60 * 60
@@ -0,0 +1,174 @@
+"""
+Telemetry - live usage statistics derived from the audit log.
+
+Telemetry subscribes to the audit log writer and folds every committed batch
+into compact in-memory structures, so the Admin Panel never rescans history.
+State is checkpointed to a JSON file together with the last applied audit
+sequence number; on restart the missing tail of the log is replayed.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from audit_log import format_ts
+from heavy_hitters import DailyHeavyHitters
+from latency_sketch import HourlyLatency
+from query_volume import QueryVolume
+from settings import TELEMETRY_CHECKPOINT_INTERVAL, TELEMETRY_PATH
+
+# Statuses that never reached the backend and have no meaningful latency
+NO_LATENCY_STATUSES = {"Validation"}
+
+STATE_KEYS = {"last_seq", "latency", "heavy_hitters", "volume", "active_users"}
+
+
+class ActiveUsers:
+    """First lookup time of every user per day, kept for retention_days."""
+
+    def __init__(self, retention_days=2):
+        self.retention_days = retention_days
+        self.days = {}  # "YYYY-MM-DD" -> {user: first audit timestamp}
+
+    def add(self, row):
+        users = self.days.setdefault(row["ts"][:10], {})
+        first = users.get(row["user"])
+        if first is None or row["ts"] < first:
+            users[row["user"]] = row["ts"]
+
+    def count(self, until):
+        """Users with a lookup on the day of `until`, before `until`."""
+        users = self.days.get(until.strftime("%Y-%m-%d"), {})
+        until = format_ts(until)
+        return sum(1 for first in users.values() if first < until)
+
+    def prune(self, now=None):
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        for day in [day for day in self.days if day < cutoff.strftime("%Y-%m-%d")]:
+            del self.days[day]
+
+    def to_dict(self):
+        return {"retention_days": self.retention_days, "days": self.days}
+
+    @classmethod
+    def from_dict(cls, data):
+        active_users = cls(data["retention_days"])
+        active_users.days = data["days"]
+        return active_users
+
+
+class Telemetry:
+    def __init__(
+        self, path=TELEMETRY_PATH, checkpoint_interval=TELEMETRY_CHECKPOINT_INTERVAL
+    ):
+        self.path = str(path)
+        self.checkpoint_interval = checkpoint_interval
+        self.latency = HourlyLatency()
+        self.heavy_hitters = DailyHeavyHitters()
+        self.volume = QueryVolume()
+        self.active_users = ActiveUsers()
+        self.last_seq = 0
+        self._lock = threading.RLock()
+        self._last_checkpoint = time.monotonic()
+
+    @classmethod
+    def load(cls, path=TELEMETRY_PATH):
+        telemetry = cls(path)
+        if os.path.exists(telemetry.path):
+            with open(telemetry.path) as f:
+                state = json.load(f)
+            # A checkpoint from an older version lacks some statistics;
+            # start from scratch and rebuild everything from the audit log
+            if set(state) == STATE_KEYS:
+                telemetry.last_seq = state["last_seq"]
+                telemetry.latency = HourlyLatency.from_dict(state["latency"])
+                telemetry.heavy_hitters = DailyHeavyHitters.from_dict(
+                    state["heavy_hitters"]
+                )
+                telemetry.volume = QueryVolume.from_dict(state["volume"])
+                telemetry.active_users = ActiveUsers.from_dict(state["active_users"])
+        return telemetry
+
+    def attach(self, audit_log):
+        """Replay records missed since the last checkpoint, then follow live."""
+        with self._lock:
+            audit_log.subscribe(self.observe)
+            batch = []
+            for row in audit_log.read_since(self.last_seq):
+                batch.append(row)
+                if len(batch) == 10_000:
+                    self.observe(batch)
+                    batch = []
+            self.observe(batch)
+            self.checkpoint()
+
+    def observe(self, rows):
+        with self._lock:
+            for row in rows:
+                if row["seq"] <= self.last_seq:
+                    continue  # already applied during catch-up
+                self._apply(row)
+                self.last_seq = row["seq"]
+
+            if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+
+    def _apply(self, row):
+        if row["status"] not in NO_LATENCY_STATUSES:
+            self.latency.add(row["ts"], row["response_ms"])
+        self.heavy_hitters.add(row)
+        self.volume.add(row)
+        self.active_users.add(row)
+
+    def checkpoint(self):
+        with self._lock:
+            self.latency.prune()
+            self.heavy_hitters.prune()
+            self.volume.compact()
+            self.active_users.prune()
+            payload = json.dumps(
+                {
+                    "last_seq": self.last_seq,
+                    "latency": self.latency.to_dict(),
+                    "heavy_hitters": self.heavy_hitters.to_dict(),
+                    "volume": self.volume.to_dict(),
+                    "active_users": self.active_users.to_dict(),
+                }
+            )
+            self._last_checkpoint = time.monotonic()
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    # ----- readers (called from page scripts) -----
+
+    def latency_window(self, start, end):
+        with self._lock:
+            return self.latency.window(start, end)
+
+    def hourly_latency(self, start, end, quantiles=(0.5, 0.95, 0.99)):
+        with self._lock:
+            return self.latency.hourly_quantiles(start, end, quantiles)
+
+    def top(self, day, dimension, k=5):
+        """Top k users or branches of a day as (name, count, error)."""
+        with self._lock:
+            return self.heavy_hitters.top(day, dimension, k)
+
+    def volume_series(self, start, end, resolution):
+        with self._lock:
+            return self.volume.series(start, end, resolution)
+
+    def volume_totals(self, start, end):
+        """(queries, errors) logged in [start, end)."""
+        with self._lock:
+            return self.volume.totals(start, end)
+
+    def active_user_count(self, until):
+        """Users with a lookup since midnight of `until`, before `until`."""
+        with self._lock:
+            return self.active_users.count(until)
@@ -0,0 +1,114 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import audit_log
+from audit_log import AuditLog, AuditWriteError
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "RETRY_DELAY", 0.001)
+    log = AuditLog(tmp_path, flush_interval=0.001)
+    yield log
+    log.close()
+
+
+def lookup(log, client_id, ts=None):
+    log.log("jkowalski", "Warsaw Central", client_id, 12.5, "Success", ts=ts)
+
+
+def test_records_are_committed_in_seq_order(log):
+    for client_id in range(5):
+        lookup(log, client_id)
+    assert log.flush() is True
+    assert [row["client_id"] for row in log.read()] == ["0", "1", "2", "3", "4"]
+    assert [row["seq"] for row in log.recent(2)] == [5, 4]
+
+
+def test_writer_recovers_from_a_seq_taken_by_another_writer(log, tmp_path):
+    lookup(log, 1)
+    log.flush()
+    # Another process appends to the same segment behind the writer's back
+    (path,) = tmp_path.glob("audit-*.db")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO audit (seq, ts, user, branch, client_id, response_ms,"
+            " status) VALUES (2, '2024-01-01 00:00:00.000000', 'x', 'y', 'z',"
+            " 1, 'Success')"
+        )
+    conn.close()
+
+    lookup(log, 3)
+    assert log.flush() is True
+    assert [row["seq"] for row in log.read_since(0)] == [1, 2, 3]
+
+
+def test_failed_commit_is_reported_and_retried(log, monkeypatch):
+    commit = log._commit
+
+    def full_disk(records):
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(log, "_commit", full_disk)
+    lookup(log, 1)
+    with pytest.raises(AuditWriteError):
+        log.flush()
+
+    monkeypatch.setattr(log, "_commit", commit)
+    lookup(log, 2)
+    assert log.flush() is True
+    assert [row["client_id"] for row in log.read()] == ["1", "2"]
+
+
+def test_backdated_records_are_read_in_time_order(tmp_path):
+    log = AuditLog(tmp_path, flush_interval=0.001, max_segment_age=0)
+    now = datetime(2024, 3, 1, 12)
+    lookup(log, "late", ts=now)
+    log.flush()
+    # Rotates to a new segment that starts before the previous one ends
+    lookup(log, "early", ts=now - timedelta(hours=1))
+    log.close()
+
+    assert len(log.segments()) == 2
+    assert [row["client_id"] for row in log.read()] == ["early", "late"]
+
+
+def test_records_pending_while_commits_fail_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "RETRY_DELAY", 0.001)
+    log = AuditLog(tmp_path, flush_interval=0.001, max_pending=3)
+    commit = log._commit
+
+    def full_disk(records):
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(log, "_commit", full_disk)
+    for client_id in range(5):
+        lookup(log, client_id)
+        with pytest.raises(AuditWriteError):
+            log.flush()
+    assert log.dropped == 2
+
+    monkeypatch.setattr(log, "_commit", commit)
+    log.close()
+    assert [row["client_id"] for row in log.read()] == ["2", "3", "4"]
+
+
+def test_read_since_skips_sealed_segments_before_seq(tmp_path, monkeypatch):
+    log = AuditLog(tmp_path, flush_interval=0.001, max_segment_age=0)
+    for client_id in range(3):
+        lookup(log, client_id)
+        log.flush()
+    log.close()
+    first, second, _ = log.segments()
+
+    opened = []
+    connect = audit_log.connect_readonly
+    monkeypatch.setattr(
+        audit_log, "connect_readonly", lambda path: opened.append(path) or connect(path)
+    )
+    assert [row["seq"] for row in log.read_since(2)] == [3]
+    assert first.path not in opened and second.path not in opened
+    assert [row["seq"] for row in log.read_since(1)] == [2, 3]
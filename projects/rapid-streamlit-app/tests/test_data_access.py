@@ -0,0 +1,44 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from data_access import Database, QueryTimeout
+
+ENDLESS_SQL = """
+    WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter)
+    SELECT count(*) FROM counter
+"""
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "core.db"
+    sqlite3.connect(path).close()
+    database = Database(path, pool_size=1, query_timeout=5)
+    yield database
+    database.close()
+
+
+def test_query_timeout_interrupts_the_statement(database):
+    async def scenario():
+        with pytest.raises(QueryTimeout):
+            await database.fetch_one(ENDLESS_SQL, timeout=0.1)
+        return await database.fetch_one("SELECT 1")
+
+    assert tuple(asyncio.run(scenario())) == (1,)
+    assert database.pool.metrics.timeouts == 1
+
+
+def test_cancelled_caller_does_not_return_a_busy_connection(database):
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(database.fetch_one(ENDLESS_SQL), 0.1)
+        # The only slot is free again and the next query gets a fresh,
+        # idle connection instead of the interrupted one
+        return await asyncio.wait_for(database.fetch_one("SELECT 1"), 2)
+
+    assert tuple(asyncio.run(scenario())) == (1,)
+    metrics = database.pool.metrics
+    assert metrics.in_use == 0
+    assert metrics.opened == 1
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import pytest
+
+from eligibility_snapshot import (
+    EligibilitySnapshot,
+    build_snapshot,
+    generate_mock_clients,
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "eligibility.snap"
+    build_snapshot(generate_mock_clients(500), path)
+    return path
+
+
+def replace_with(path, data):
+    tmp_path = f"{path}.new"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def test_lookup_finds_every_client(snapshot_path):
+    snapshot = EligibilitySnapshot(snapshot_path)
+    for client in generate_mock_clients(500):
+        assert snapshot.lookup(client["client_id"]) is not None
+    assert snapshot.lookup("00000000000") is None
+
+
+@pytest.mark.parametrize("size", [0, 3, -5])
+def test_refresh_keeps_mapping_over_partial_file(snapshot_path, size):
+    snapshot = EligibilitySnapshot(snapshot_path)
+    count = snapshot.count
+    data = snapshot_path.read_bytes()
+    replace_with(snapshot_path, data[:size])
+
+    assert snapshot.refresh_if_changed() is False
+    assert snapshot.count == count
+    client = next(generate_mock_clients(500))
+    assert snapshot.lookup(client["client_id"]) is not None
+
+    replace_with(snapshot_path, data)
+    assert snapshot.refresh_if_changed() is True
+
+
+def test_lookups_during_refresh_see_one_consistent_file(snapshot_path):
+    snapshot = EligibilitySnapshot(snapshot_path)
+    small = snapshot_path.read_bytes()
+    build_snapshot(generate_mock_clients(2_000), snapshot_path)
+    large = snapshot_path.read_bytes()
+    replace_with(snapshot_path, small)
+    snapshot.refresh_if_changed()
+    clients = [client["client_id"] for client in generate_mock_clients(500)]
+
+    errors = []
+    stop = threading.Event()
+
+    def teller():
+        while not stop.is_set():
+            try:
+                for client_id in clients:
+                    assert snapshot.lookup(client_id) is not None
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=teller) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for number in range(50):
+        replace_with(snapshot_path, large if number % 2 == 0 else small)
+        os.utime(snapshot_path, ns=(number, number))
+        assert snapshot.refresh_if_changed() is True
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert snapshot.count == 500
@@ -0,0 +1,48 @@
+from heavy_hitters import DailyHeavyHitters, SpaceSaving
+
+
+def tracker_of(items, capacity=100):
+    tracker = SpaceSaving(capacity)
+    for item in items:
+        tracker.add(item)
+    return tracker
+
+
+def counts(tracker):
+    return [(item, count) for item, count, _ in tracker.top(len(tracker))]
+
+
+def test_top_items_are_ordered_by_count():
+    tracker = tracker_of("abacabad")
+    assert counts(tracker)[:2] == [("a", 4), ("b", 2)]
+    assert tracker.total == 8
+
+
+def test_restored_tracker_keeps_ties_in_one_bucket():
+    restored = SpaceSaving.from_dict(tracker_of("aabbc").to_dict())
+    for item in "accc":
+        restored.add(item)
+
+    assert counts(restored) == [("c", 4), ("a", 3), ("b", 2)]
+    assert counts(restored) == counts(tracker_of("aabbcaccc"))
+    assert restored._lowest.count == 2
+
+
+def test_restored_tracker_evicts_the_least_frequent_item():
+    original = tracker_of("aaabbc", capacity=3)
+    restored = SpaceSaving.from_dict(original.to_dict())
+    for tracker in (original, restored):
+        tracker.add("d")
+    assert counts(restored) == counts(original)
+    assert dict((item, error) for item, _, error in restored.top(3))["d"] == 1
+
+
+def test_daily_trackers_round_trip():
+    heavy_hitters = DailyHeavyHitters(capacity=10)
+    for user in ["a", "b", "a"]:
+        heavy_hitters.add(
+            {"ts": "2024-03-05 10:00:00.000000", "user": user, "branch": "Warsaw"}
+        )
+    restored = DailyHeavyHitters.from_dict(heavy_hitters.to_dict())
+    assert restored.days["2024-03-05"]["user"].top(1) == [("a", 2, 0)]
+    assert restored.days["2024-03-05"]["branch"].top(1) == [("Warsaw", 3, 0)]
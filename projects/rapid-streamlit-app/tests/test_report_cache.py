@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from audit_log import AuditLog
+from report_cache import ReportCache
+from reports import summary_rows
+
+YESTERDAY = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(
+    days=1
+)
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AuditLog(tmp_path / "audit", flush_interval=0.001)
+    yield log
+    log.close()
+
+
+def lookup(log, ts):
+    log.log("jkowalski", "Warsaw Central", 1, 12.5, "Success", ts=ts)
+    log.flush()
+
+
+def queries_yesterday(log, cache):
+    rows = summary_rows(
+        log, "Daily Usage Summary", YESTERDAY, YESTERDAY + timedelta(days=1), cache
+    )
+    return sum(row[1] for row in rows)
+
+
+def test_backdated_record_invalidates_its_day(log, tmp_path):
+    cache = ReportCache(tmp_path / "cache.db")
+    cache.attach(log)
+    lookup(log, YESTERDAY + timedelta(hours=9))
+    assert queries_yesterday(log, cache) == 1
+    assert queries_yesterday(log, cache) == 1
+    assert cache.hits == 1
+
+    lookup(log, YESTERDAY + timedelta(hours=10))
+    assert queries_yesterday(log, cache) == 2
+    cache.close()
+    log.close()
+
+
+def test_records_missed_while_detached_are_caught_up(log, tmp_path):
+    cache = ReportCache(tmp_path / "cache.db")
+    cache.attach(log)
+    lookup(log, YESTERDAY + timedelta(hours=9))
+    assert queries_yesterday(log, cache) == 1
+    cache.close()
+    log.close()
+
+    # Written by a process that had no cache attached
+    log = AuditLog(tmp_path / "audit", flush_interval=0.001)
+    lookup(log, YESTERDAY + timedelta(hours=10))
+    cache = ReportCache(tmp_path / "cache.db")
+    cache.attach(log)
+    assert queries_yesterday(log, cache) == 2
+    cache.close()
+    log.close()
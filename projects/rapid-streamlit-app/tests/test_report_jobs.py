@@ -0,0 +1,52 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import report_jobs
+from report_jobs import RUNNING, ReportJobQueue, TooManyJobs
+from reports import date_range
+
+
+def wait_for_status(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id).status != status:
+        assert time.monotonic() < deadline, f"job {job_id} never became {status}"
+        time.sleep(0.01)
+
+
+def test_one_user_cannot_take_every_worker(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(
+        report_jobs, "export_report", lambda *args, **kwargs: release.wait(5) and 0
+    )
+    queue = ReportJobQueue(None, tmp_path, workers=3, per_user_limit=2)
+    start, end = date_range(date(2024, 1, 1), date(2024, 1, 7))
+
+    def submit(user):
+        return queue.submit(user, "Daily Usage Summary", "CSV (.csv)", start, end)
+
+    try:
+        for job_id in [submit("jkowalski"), submit("jkowalski")]:
+            wait_for_status(queue, job_id, RUNNING)
+        with pytest.raises(TooManyJobs):
+            submit("jkowalski")
+        # The worker left free still runs another user's report
+        wait_for_status(queue, submit("anowak"), RUNNING)
+    finally:
+        release.set()
+        queue.close()
+
+
+def test_per_user_limit_must_be_below_the_workers(tmp_path):
+    with pytest.raises(ValueError):
+        ReportJobQueue(None, tmp_path, workers=2, per_user_limit=2)
+
+
+def test_reversed_date_range_is_rejected(tmp_path):
+    queue = ReportJobQueue(None, tmp_path)
+    start, end = date_range(date(2024, 1, 8), date(2024, 1, 1))
+    with pytest.raises(ValueError):
+        queue.submit("jkowalski", "Daily Usage Summary", "CSV (.csv)", start, end)
+    assert queue.jobs_for("jkowalski") == []
@@ -0,0 +1,146 @@
+"""Every filter combination must search an audit index, never scan the table."""
+
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import reports
+from audit_log import SCHEMA, AuditLog, connect_readonly, format_ts
+from report_query import ALL_BRANCHES, NO_FILTERS, explain, make_filters
+from reports import (
+    ESTIMATE_SLICES,
+    REPORT_COLUMNS,
+    ROW_REPORTS,
+    count_rows,
+    report_page,
+    report_sql,
+)
+
+START = datetime(2026, 1, 1)
+END = START + timedelta(days=7)
+BRANCHES = ["Warsaw Central", "Krakow Main", "Gdansk Port", "Wroclaw HQ"]
+
+# Filters and the indexes the planner may pick for them. Without a branch
+# filter, Branch Performance may skip-scan the branch index (it groups by
+# branch); with several branches the ts index can win, as it also yields the
+# ORDER BY
+PLAN_CASES = {
+    "no filters": (NO_FILTERS, {"idx_audit_ts", "idx_audit_branch_ts"}),
+    "All Branches": (
+        make_filters([ALL_BRANCHES, "Krakow Main"]),
+        {"idx_audit_ts", "idx_audit_branch_ts"},
+    ),
+    "one branch": (make_filters(["Krakow Main"]), {"idx_audit_branch_ts"}),
+    "two branches": (
+        make_filters(["Krakow Main", "Gdansk Port"]),
+        {"idx_audit_branch_ts", "idx_audit_ts"},
+    ),
+    "user": (make_filters([], "U17"), {"idx_audit_user_ts"}),
+    "user and branch": (make_filters(["Krakow Main"], "U17"), {"idx_audit_user_ts"}),
+}
+
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    """An audit log of one analysed segment with a week of lookups."""
+    directory = tmp_path_factory.mktemp("audit")
+    conn = sqlite3.connect(directory / "audit-000000000001.db")
+    conn.executescript(SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT INTO audit (ts, user, branch, client_id, response_ms, status)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    format_ts(START + timedelta(minutes=i)),
+                    f"U{i % 90:02d}",
+                    BRANCHES[i % len(BRANCHES)],
+                    f"{i:011d}",
+                    700.0,
+                    "Success",
+                )
+                for i in range(50_000)
+            ),
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+    log = AuditLog(directory)
+    yield log
+    log.close()
+
+
+class PlanRecorder:
+    """Read-only segment connection that records the plan of every query."""
+
+    def __init__(self, path, plans):
+        self.conn = connect_readonly(path)
+        self.plans = plans
+
+    def execute(self, sql, params=()):
+        self.plans.append(explain(self.conn, sql, params))
+        return self.conn.execute(sql, params)
+
+    def close(self):
+        self.conn.close()
+
+
+@pytest.fixture
+def plans(monkeypatch):
+    plans = []
+    monkeypatch.setattr(reports, "connect_readonly", lambda p: PlanRecorder(p, plans))
+    return plans
+
+
+def assert_searches(plan, indexes):
+    assert any(
+        re.search(f"USING (COVERING )?INDEX {index} ", line)
+        for line in plan
+        for index in indexes
+    ), plan
+    assert not any(line.startswith("SCAN audit") for line in plan), plan
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+@pytest.mark.parametrize("report_type", REPORT_COLUMNS)
+def test_report_sql_searches_an_index(log, case, report_type):
+    filters, indexes = PLAN_CASES[case]
+    (segment,) = log.segments()
+    conn = connect_readonly(segment.path)
+    try:
+        plan = explain(conn, *report_sql(report_type, START, END, filters))
+    finally:
+        conn.close()
+    assert_searches(plan, indexes)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+@pytest.mark.parametrize("report_type", ROW_REPORTS)
+def test_report_pages_search_an_index(log, plans, case, report_type):
+    filters, indexes = PLAN_CASES[case]
+    rows, cursor = report_page(log, report_type, START, END, filters=filters)
+    report_page(log, report_type, START, END, after=cursor, filters=filters)
+    assert plans
+    for plan in plans:
+        assert_searches(plan, indexes)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+@pytest.mark.parametrize("report_type", ROW_REPORTS)
+def test_counting_searches_an_index(log, plans, case, report_type):
+    filters, indexes = PLAN_CASES[case]
+    # A scan limit below the matching rows also runs the estimate queries:
+    # the seq span of the date range through the ts index, then runs of
+    # seqs across it by primary key
+    count_rows(log, report_type, START, END, scan_limit=100, filters=filters)
+    count_plan, *estimate_plans = plans
+    assert_searches(count_plan, indexes)
+    if not estimate_plans:
+        return  # fewer matching rows than the scan limit: counted exactly
+    span_asc, span_desc, *sample_plans = estimate_plans
+    for plan in (span_asc, span_desc):
+        assert_searches(plan, {"idx_audit_ts"})
+    assert len(sample_plans) == ESTIMATE_SLICES
+    for plan in sample_plans:
+        assert any("USING INTEGER PRIMARY KEY" in line for line in plan), plan
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from report_scheduler import ReportScheduler, jitter_of
+
+RETRY_DELAY = timedelta(days=2)  # longer than the wait for the first run
+
+
+class UnavailableAuditLog:
+    def __getattr__(self, name):
+        raise OSError("audit log unavailable")
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = ReportScheduler(
+        UnavailableAuditLog(),
+        tmp_path / "scheduler.db",
+        tmp_path / "outbox",
+        tick=3600,
+        attempts=2,
+        retry_delay=RETRY_DELAY.total_seconds(),
+    )
+    yield scheduler
+    scheduler.close()
+
+
+def schedule_of(scheduler, schedule_id):
+    return next(s for s in scheduler.schedules() if s["schedule_id"] == schedule_id)
+
+
+def test_failed_run_is_retried_after_the_delay_then_given_up(scheduler):
+    schedule_id = scheduler.add(
+        "Daily", "Daily Usage Summary", "0 7 * * *", "a@b.pl", "CSV (.csv)"
+    )
+    fire = schedule_of(scheduler, schedule_id)["next_fire"]
+    now = datetime.fromisoformat(fire) + jitter_of(schedule_id)
+    assert schedule_id in scheduler.due(now)
+
+    scheduler._run_schedule(schedule_id, now)
+    schedule = schedule_of(scheduler, schedule_id)
+    assert schedule["next_fire"] == fire
+    assert schedule["last_status"] == "failed"
+    assert "audit log unavailable" in schedule["last_error"]
+
+    # Retried only once the delay has passed since the failed attempt
+    failed_at = datetime.fromisoformat(scheduler.history()[0]["started_at"])
+    assert schedule_id not in scheduler.due(now)
+    assert schedule_id in scheduler.due(failed_at + RETRY_DELAY + timedelta(seconds=1))
+
+    # The last attempt fails too: the occurrence is given up
+    scheduler._run_schedule(schedule_id, now)
+    assert schedule_of(scheduler, schedule_id)["next_fire"] > fire
+    runs = scheduler.history(schedule_id)
+    assert [run["status"] for run in runs] == ["failed", "failed"]
+
+
+def test_successful_run_advances_the_schedule(scheduler):
+    scheduler._deliver = lambda *args: True
+    schedule_id = scheduler.add(
+        "Daily", "Daily Usage Summary", "0 7 * * *", "a@b.pl", "CSV (.csv)"
+    )
+    fire = schedule_of(scheduler, schedule_id)["next_fire"]
+
+    scheduler._run_schedule(schedule_id, datetime.fromisoformat(fire))
+    assert schedule_of(scheduler, schedule_id)["next_fire"] > fire
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from audit_log import AuditLog
+from reports import count_rows
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AuditLog(tmp_path, flush_interval=0.001)
+    yield log
+    log.close()
+
+
+def test_estimate_samples_the_whole_date_range(log):
+    # Errors only in the last fifth of the week
+    for i in range(10_000):
+        log.log(
+            f"U{i % 90:02d}",
+            "Warsaw Central",
+            f"{i:011d}",
+            12.5,
+            "Timeout" if i >= 8_000 else "Success",
+            ts=START + timedelta(minutes=i),
+        )
+    log.flush()
+
+    end = START + timedelta(days=7)
+    total, exact = count_rows(log, "Error Log Export", START, end, scan_limit=1_000)
+    assert not exact
+    assert total == pytest.approx(2_000, rel=0.1)
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from audit_log import format_ts
+from latency_sketch import HourlyLatency
+from query_volume import QueryVolume
+from telemetry import ActiveUsers
+
+NOW = datetime(2024, 3, 5, 10, 30)
+
+
+def row(ts, user="jkowalski", status="Success"):
+    return {"ts": format_ts(ts), "user": user, "status": status}
+
+
+def test_latency_window_is_trimmed_to_the_minute():
+    latency = HourlyLatency()
+    latency.add(format_ts(NOW - timedelta(minutes=5)), 100.0)
+    latency.add(format_ts(NOW + timedelta(minutes=10)), 5_000.0)
+
+    window = latency.window(NOW.replace(hour=0, minute=0), NOW)
+    assert window.count == 1
+    assert window.max == 100.0
+    # A whole hour still comes from the hourly sketch
+    assert (
+        latency.window(NOW.replace(minute=0), NOW.replace(hour=11, minute=0)).count == 2
+    )
+
+
+def test_latency_window_falls_back_to_hours_once_minutes_are_pruned():
+    latency = HourlyLatency()
+    latency.add(format_ts(NOW), 100.0)
+    latency.prune(now=NOW + timedelta(days=3))
+    assert not latency.minutes
+    assert latency.window(NOW - timedelta(minutes=1), NOW).count == 1
+    restored = HourlyLatency.from_dict(latency.to_dict())
+    assert restored.window(NOW.replace(minute=0), NOW).count == 1
+
+
+def test_volume_totals_cover_the_same_minutes():
+    volume = QueryVolume()
+    yesterday = NOW - timedelta(days=1)
+    for ts in (yesterday - timedelta(minutes=1), yesterday + timedelta(minutes=20)):
+        volume.add(row(ts, status="Timeout"))
+    day_start = yesterday.replace(hour=0, minute=0)
+    assert volume.totals(day_start, yesterday) == (1, 1)
+    assert volume.totals(day_start, day_start + timedelta(days=1)) == (2, 2)
+
+
+def test_active_users_count_first_lookups_before_the_time():
+    active_users = ActiveUsers()
+    active_users.add(row(NOW - timedelta(hours=2), "a"))
+    active_users.add(row(NOW + timedelta(hours=1), "a"))
+    active_users.add(row(NOW + timedelta(hours=1), "b"))
+    active_users.add(row(NOW - timedelta(days=1, hours=1), "c"))
+
+    assert active_users.count(NOW) == 1
+    assert active_users.count(NOW + timedelta(hours=2)) == 2
+    assert active_users.count(NOW - timedelta(days=1)) == 1
+
+    active_users.prune(now=NOW + timedelta(days=2))
+    assert list(active_users.days) == [NOW.strftime("%Y-%m-%d")]